@@ -0,0 +1,131 @@
+import sys
+import time
+import numpy as np
+
+# --- CONFIGURAZIONE ---
+ALBERI_PER_AGGIORNAMENTO = 10   # Alberi aggiunti alla foresta a ogni aggiornamento
+MAX_CAMPIONI_RECENTI = 5000     # Campioni etichettati recenti riusati (insieme ai nuovi) negli aggiornamenti
+
+
+def estendi_codifica(le, etichette):
+    """
+    LabelEncoder con le classi di 'le' più le eventuali colture nuove in 'etichette'
+    (ordine alfabetico, lo stesso di un fit da zero).
+    Restituisce (nuovo_le, posizioni) con posizioni[i] = nuovo codice della vecchia classe i.
+    """
+    from sklearn.preprocessing import LabelEncoder
+    nuovo = LabelEncoder().fit(np.concatenate([le.classes_, np.asarray(etichette, dtype=object)]))
+    return nuovo, nuovo.transform(le.classes_)
+
+
+def _rimappa_albero(albero, colonne, n_classi):
+    """
+    Ricostruisce il Tree di sklearn con la distribuzione delle foglie su 'n_classi'
+    colonne: la vecchia colonna j diventa colonne[j], le classi mai viste valgono 0.
+    """
+    from sklearn.tree._tree import Tree
+    stato = albero.tree_.__getstate__()
+    valori = np.zeros((stato['node_count'], albero.n_outputs_, n_classi))
+    valori[:, :, colonne] = stato['values']
+    tree = Tree(albero.n_features_in_, np.array([n_classi] * albero.n_outputs_, dtype=np.intp), albero.n_outputs_)
+    tree.__setstate__(dict(stato, values=valori))
+    albero.tree_ = tree
+    albero.n_classes_ = n_classi
+    albero.classes_ = np.arange(n_classi, dtype=albero.classes_.dtype)
+
+
+def rimappa_modello(modello, posizioni, n_classi):
+    """
+    Porta un DecisionTree o RandomForest addestrato su codici 0..k-1 nella codifica
+    estesa di estendi_codifica: la classe con codice c diventa posizioni[c].
+    Le predizioni (come nomi di coltura) restano identiche. Modifica il modello sul posto.
+    """
+    colonne = np.asarray(posizioni)[modello.classes_.astype(np.intp)]
+    for albero in getattr(modello, 'estimators_', [modello]):
+        _rimappa_albero(albero, colonne, n_classi)
+    modello.classes_ = np.arange(n_classi, dtype=modello.classes_.dtype)
+    modello.n_classes_ = n_classi
+    return modello
+
+
+def cresci_foresta(foresta, X, y, n_alberi=ALBERI_PER_AGGIORNAMENTO, max_alberi=None, seed=None):
+    """
+    Crescita "warm start" di un RandomForest: aggiunge 'n_alberi' alberi addestrati
+    solo su (X, y), con y già codificato sulle classi della foresta, e con 'max_alberi'
+    ritira i più vecchi. Il costo dipende da len(X), non dai dati del primo addestramento.
+    Modifica la foresta sul posto.
+    """
+    from sklearn.base import clone
+    nuova = clone(foresta).set_params(n_estimators=n_alberi, warm_start=False, random_state=seed)
+    nuova.fit(X, y)
+    # Un lotto piccolo può non contenere tutte le colture: allineiamo le colonne dei nuovi alberi
+    rimappa_modello(nuova, np.arange(foresta.n_classes_), foresta.n_classes_)
+
+    alberi = foresta.estimators_ + nuova.estimators_
+    if max_alberi is not None:
+        alberi = alberi[-max_alberi:]
+    foresta.estimators_ = alberi
+    foresta.n_estimators = len(alberi)
+    return foresta
+
+
+if __name__ == "__main__":
+    import copy
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder
+    from caricamento_dati import carica_dataset, separa_feature_target
+
+    # Simulazione: il modello in produzione non conosce due colture e l'ultima parte
+    # del dataset arriva a blocchi settimanali di lotti etichettati dagli agronomi.
+    DATASET_PATH = sys.argv[1] if len(sys.argv) > 1 else 'Train_Dataset_Clean.csv'
+    X, y = separa_feature_target(carica_dataset(DATASET_PATH))
+    X, y = X.to_numpy(), np.asarray(y.astype(str), dtype=object)
+    rng = np.random.default_rng(42)
+    ordine = rng.permutation(len(X))
+    X, y = X[ordine], y[ordine]
+    n_test = len(X) // 5
+    X_test, y_test, X, y = X[:n_test], y[:n_test], X[n_test:], y[n_test:]
+
+    nuove = np.unique(y)[-2:]
+    iniziali = ~np.isin(y, nuove) & (np.arange(len(y)) < len(y) // 2)
+    le = LabelEncoder().fit(y[iniziali])
+    foresta = RandomForestClassifier(n_estimators=50, random_state=42).fit(X[iniziali], le.transform(y[iniziali]))
+
+    def accuratezza(modello, codifica):
+        return float(np.mean(codifica.classes_[modello.predict(X_test)] == y_test))
+
+    print(f"--- AGGIORNAMENTO ONLINE (colture nuove: {', '.join(nuove)}) ---")
+    print(f"[ML] Modello iniziale: {iniziali.sum()} campioni, accuratezza {accuratezza(foresta, le):.4f}")
+
+    # 1. La rimappatura non cambia le predizioni
+    le_esteso, posizioni = estendi_codifica(le, nuove)
+    prima = le.classes_[foresta.predict(X_test)]
+    rimappata = rimappa_modello(copy.deepcopy(foresta), posizioni, len(le_esteso.classes_))
+    if not np.array_equal(prima, le_esteso.classes_[rimappata.predict(X_test)]):
+        print("[ERRORE] La rimappatura delle classi ha cambiato le predizioni.")
+        sys.exit(1)
+    print("[OK] Rimappatura delle classi: predizioni identiche.")
+
+    # 2. Aggiornamenti settimanali contro riaddestramento completo
+    X_recenti, y_recenti = X[:0], y[:0]
+    visti = iniziali.copy()
+    for settimana, blocco in enumerate(np.array_split(np.flatnonzero(~iniziali), 4), start=1):
+        t0 = time.perf_counter()
+        le_esteso, posizioni = estendi_codifica(le, y[blocco])
+        if len(le_esteso.classes_) != len(le.classes_):
+            rimappa_modello(foresta, posizioni, len(le_esteso.classes_))
+            le = le_esteso
+        X_recenti = np.concatenate([X_recenti, X[blocco]])[-MAX_CAMPIONI_RECENTI:]
+        y_recenti = np.concatenate([y_recenti, y[blocco]])[-MAX_CAMPIONI_RECENTI:]
+        cresci_foresta(foresta, X_recenti, le.transform(y_recenti), max_alberi=80, seed=settimana)
+        t_agg = time.perf_counter() - t0
+
+        visti[blocco] = True
+        t0 = time.perf_counter()
+        le_completo = LabelEncoder().fit(y[visti])
+        completo = RandomForestClassifier(n_estimators=50, random_state=42).fit(
+            X[visti], le_completo.transform(y[visti]))
+        t_completo = time.perf_counter() - t0
+        print(f"  settimana {settimana}: +{len(blocco)} lotti | aggiornamento {t_agg:.2f} s "
+              f"({len(foresta.estimators_)} alberi) acc. {accuratezza(foresta, le):.4f} | "
+              f"riaddestramento {t_completo:.2f} s acc. {accuratezza(completo, le_completo):.4f}")
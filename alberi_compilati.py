@@ -0,0 +1,200 @@
+import sys
+import time
+import numpy as np
+
+# Stesso tipo usato internamente da sklearn per le feature durante l'attraversamento
+DTYPE_FEATURE = np.float32
+FOGLIA = -2  # Valore di tree_.feature nei nodi foglia (sklearn.tree._tree.TREE_UNDEFINED)
+# Fino a questo numero di righe si attraversa con un ciclo Python su liste (poche
+# decine di us per riga); oltre, l'avanzamento vettoriale NumPy ammortizza l'overhead.
+MAX_RIGHE_SCALARE = 16
+
+
+class AlberiCompilati:
+    """
+    Motore di inferenza per DecisionTree e RandomForest "appiattiti" in array NumPy
+    contigui: tutti i nodi di tutti gli alberi stanno negli stessi vettori
+    (feature, soglia, figlio sinistro/destro, distribuzione delle classi nelle foglie).
+    Senza la validazione dell'input e l'overhead per chiamata di sklearn:
+    - poche righe (es. reasoning_pipeline): ciclo Python sulle liste dei nodi;
+    - batch: tutte le righe avanzano su tutti gli alberi insieme, un livello per iterazione.
+    I risultati sono identici a predict / predict_proba dello stimatore originale.
+    Sui batch molto grandi l'attraversamento Cython di sklearn resta più veloce
+    (vedi benchmark in fondo al file).
+    """
+
+    def __init__(self, feature, soglie, sinistro, destro, nan_a_sinistra, valori, radici, classi):
+        self.feature = feature
+        self.soglie = soglie
+        self.sinistro = sinistro
+        self.destro = destro
+        self.nan_a_sinistra = nan_a_sinistra
+        self.valori = valori
+        self.radici = radici
+        self.classes_ = classi
+        self.n_features = int(feature.max()) + 1 if (feature >= 0).any() else 0
+        self._liste = None
+
+    @classmethod
+    def da_modello(cls, modello):
+        """Esporta un DecisionTreeClassifier o RandomForestClassifier addestrato."""
+        alberi = [m.tree_ for m in getattr(modello, 'estimators_', [modello])]
+        if any(t.n_outputs != 1 for t in alberi):
+            raise ValueError("Sono supportati solo modelli a singolo output")
+
+        feature, soglie, sinistro, destro, nan_sx, valori, radici = [], [], [], [], [], [], []
+        scostamento = 0
+        for t in alberi:
+            foglie = t.children_left == -1
+            indici = np.arange(t.node_count)
+            radici.append(scostamento)
+            feature.append(t.feature)
+            soglie.append(t.threshold)
+            # Le foglie puntano a sé stesse: l'attraversamento può iterare a profondità fissa
+            sinistro.append(np.where(foglie, indici, t.children_left) + scostamento)
+            destro.append(np.where(foglie, indici, t.children_right) + scostamento)
+            nan_sx.append(t.missing_go_to_left.astype(bool))
+            # Normalizzazione identica a DecisionTreeClassifier.predict_proba
+            v = t.value[:, 0, :].astype(np.float64)
+            normalizzatore = v.sum(axis=1, keepdims=True)
+            normalizzatore[normalizzatore == 0.0] = 1.0
+            valori.append(v / normalizzatore)
+            scostamento += t.node_count
+
+        return cls(feature=np.ascontiguousarray(np.concatenate(feature), dtype=np.intp),
+                   soglie=np.ascontiguousarray(np.concatenate(soglie), dtype=np.float64),
+                   sinistro=np.ascontiguousarray(np.concatenate(sinistro), dtype=np.intp),
+                   destro=np.ascontiguousarray(np.concatenate(destro), dtype=np.intp),
+                   nan_a_sinistra=np.concatenate(nan_sx),
+                   valori=np.ascontiguousarray(np.concatenate(valori)),
+                   radici=np.array(radici, dtype=np.intp),
+                   classi=np.asarray(modello.classes_))
+
+    # --- PERSISTENZA ---
+
+    def salva(self, path):
+        np.savez(path, feature=self.feature, soglie=self.soglie, sinistro=self.sinistro,
+                 destro=self.destro, nan_a_sinistra=self.nan_a_sinistra, valori=self.valori,
+                 radici=self.radici, classi=self.classes_)
+
+    @classmethod
+    def carica(cls, path):
+        with np.load(path, allow_pickle=False) as dati:
+            return cls(dati['feature'], dati['soglie'], dati['sinistro'], dati['destro'],
+                       dati['nan_a_sinistra'], dati['valori'], dati['radici'], dati['classi'])
+
+    # --- INFERENZA ---
+
+    def foglie(self, X):
+        """Indice (globale) della foglia raggiunta da ogni riga in ogni albero: forma (n, n_alberi)."""
+        X = np.asarray(X, dtype=DTYPE_FEATURE)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[0] <= MAX_RIGHE_SCALARE:
+            return self._foglie_scalare(X)
+        righe = np.repeat(np.arange(X.shape[0]), len(self.radici))
+        nodi = np.tile(self.radici, X.shape[0])
+
+        attivi = np.flatnonzero(self.feature[nodi] != FOGLIA)
+        while attivi.size:
+            nodo = nodi[attivi]
+            valore = X[righe[attivi], self.feature[nodo]]
+            # Confronto float32 <= float64 come in sklearn; i NaN seguono missing_go_to_left
+            a_sinistra = np.where(np.isnan(valore), self.nan_a_sinistra[nodo], valore <= self.soglie[nodo])
+            nodo = np.where(a_sinistra, self.sinistro[nodo], self.destro[nodo])
+            nodi[attivi] = nodo
+            attivi = attivi[self.feature[nodo] != FOGLIA]
+        return nodi.reshape(X.shape[0], len(self.radici))
+
+    def _foglie_scalare(self, X):
+        """Attraversamento nodo per nodo su liste Python (float Python = double, come in sklearn)."""
+        if self._liste is None:
+            self._liste = (self.feature.tolist(), self.soglie.tolist(), self.sinistro.tolist(),
+                           self.destro.tolist(), self.nan_a_sinistra.tolist(), self.radici.tolist())
+        feature, soglie, sinistro, destro, nan_sx, radici = self._liste
+        risultato = []
+        for x in X.tolist():
+            for nodo in radici:
+                while feature[nodo] != FOGLIA:
+                    v = x[feature[nodo]]
+                    if v != v:  # NaN
+                        nodo = sinistro[nodo] if nan_sx[nodo] else destro[nodo]
+                    else:
+                        nodo = sinistro[nodo] if v <= soglie[nodo] else destro[nodo]
+                risultato.append(nodo)
+        return np.array(risultato, dtype=np.intp).reshape(X.shape[0], len(radici))
+
+    def predict_proba(self, X):
+        foglie = self.foglie(X)
+        proba = np.zeros((foglie.shape[0], self.valori.shape[1]), dtype=np.float64)
+        # Somma albero per albero nello stesso ordine di RandomForestClassifier: stessi arrotondamenti
+        for t in range(foglie.shape[1]):
+            proba += self.valori[foglie[:, t]]
+        if foglie.shape[1] > 1:
+            proba /= foglie.shape[1]
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def verifica_equivalenza(modello, X):
+    """
+    Confronta predict/predict_proba compilati con quelli di sklearn, sia sul percorso
+    vettoriale (tutto X) sia su quello scalare (righe una per una, solo le prime 500).
+    Restituisce la discrepanza massima sulle probabilità.
+    """
+    compilato = AlberiCompilati.da_modello(modello)
+    X = np.asarray(X)
+    proba_sk = modello.predict_proba(X)
+    proba_c = compilato.predict_proba(X)
+    assert np.array_equal(modello.predict(X), compilato.predict(X)), "predict diverso da sklearn"
+    assert np.array_equal(modello.apply(X).reshape(len(X), -1),
+                          compilato.foglie(X) - compilato.radici), "foglie diverse da sklearn"
+    proba_scalare = np.vstack([compilato.predict_proba(X[i:i + 1]) for i in range(min(500, len(X)))])
+    assert np.array_equal(proba_scalare, proba_sk[:len(proba_scalare)]), "percorso scalare diverso da sklearn"
+    return float(np.abs(proba_sk - proba_c).max())
+
+
+def benchmark(modello, X, ripetizioni=200):
+    """
+    Tempo per chiamata predict_proba, sklearn vs compilato, su una riga e su batch
+    crescenti. Restituisce {dimensione: (secondi_sklearn, secondi_compilato)}.
+    """
+    compilato = AlberiCompilati.da_modello(modello)
+    riga = X[:1]
+
+    def cronometra(funzione, argomento, n):
+        funzione(argomento)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            funzione(argomento)
+        return (time.perf_counter() - t0) / n
+
+    misure = {1: (cronometra(modello.predict_proba, riga, ripetizioni),
+                  cronometra(compilato.predict_proba, riga, ripetizioni))}
+    for n in (16, 64, 256, 1024, len(X)):
+        blocco = X[:n]
+        ripetute = max(3, ripetizioni * 4 // n)
+        misure[n] = (cronometra(modello.predict_proba, blocco, ripetute),
+                     cronometra(compilato.predict_proba, blocco, ripetute))
+    return misure
+
+
+if __name__ == "__main__":
+    from sklearn.tree import DecisionTreeClassifier
+    from sklearn.ensemble import RandomForestClassifier
+    from caricamento_dati import carica_dataset, separa_feature_target
+
+    DATASET_PATH = sys.argv[1] if len(sys.argv) > 1 else 'Train_Dataset_Clean.csv'
+    X, y = separa_feature_target(carica_dataset(DATASET_PATH))
+    X, y = X.to_numpy(), y.cat.codes.to_numpy()
+
+    for nome, modello in [('Decision Tree', DecisionTreeClassifier(random_state=42, max_depth=10)),
+                          ('Random Forest', RandomForestClassifier(n_estimators=50, random_state=42))]:
+        modello.fit(X, y)
+        print(f"--- {nome} ---")
+        print(f"[OK] Identico a sklearn su {len(X)} righe (max |Δproba| = {verifica_equivalenza(modello, X):.1e})")
+        for dimensione, (t_sklearn, t_compilato) in benchmark(modello, X).items():
+            print(f"  {dimensione:>8} righe: sklearn {t_sklearn * 1000:9.3f} ms | "
+                  f"compilato {t_compilato * 1000:9.3f} ms (x{t_sklearn / t_compilato:.1f})")
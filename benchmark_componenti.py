@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import numpy as np
+
+# --- CONFIGURAZIONE ---
+BASELINE_PATH = 'benchmark_baseline.json'
+SOGLIA_REGRESSIONE = 0.25   # +25% rispetto alla baseline = regressione
+RIPETIZIONI = 5
+
+# ==============================================================================
+# Ogni stadio è una funzione prepara(dimensione) -> callable da cronometrare.
+# La preparazione (addestramento, costruzione grafi, ...) NON entra nella misura.
+# ==============================================================================
+
+_cache_preparazione = {}
+
+
+def _modello_rf():
+    """Random Forest con gli iperparametri del sistema ibrido, addestrato una volta per run."""
+    if 'rf' not in _cache_preparazione:
+        from sklearn.ensemble import RandomForestClassifier
+        from sistema_ibrido import DATASET_PATH, PARAMETRI_RF
+        from caricamento_dati import carica_dataset, separa_feature_target
+        X, y = separa_feature_target(carica_dataset(DATASET_PATH))
+        modello = RandomForestClassifier(**PARAMETRI_RF).fit(X.to_numpy(), y.cat.codes.to_numpy())
+        _cache_preparazione['rf'] = (modello, X.to_numpy())
+    return _cache_preparazione['rf']
+
+
+def prepara_rf_singola(dimensione):
+    """'dimensione' chiamate predict_proba consecutive su una riga (come reasoning_pipeline)."""
+    modello, X = _modello_rf()
+    righe = [X[i:i + 1] for i in range(dimensione)]
+    return lambda: [modello.predict_proba(r) for r in righe]
+
+
+def prepara_rf_batch(dimensione):
+    """Un solo predict_proba su 'dimensione' righe (come reasoning_batch)."""
+    modello, X = _modello_rf()
+    blocco = np.resize(X, (dimensione, X.shape[1]))
+    return lambda: modello.predict_proba(blocco)
+
+
+def prepara_rf_compilata_singola(dimensione):
+    """Come rf_singola ma con il motore ad array compilato (alberi_compilati.py)."""
+    from alberi_compilati import AlberiCompilati
+    modello, X = _modello_rf()
+    compilato = AlberiCompilati.da_modello(modello)
+    righe = [X[i:i + 1] for i in range(dimensione)]
+    return lambda: [compilato.predict_proba(r) for r in righe]
+
+
+def prepara_rf_compilata_batch(dimensione):
+    """Come rf_batch ma con il motore ad array compilato."""
+    from alberi_compilati import AlberiCompilati
+    modello, X = _modello_rf()
+    compilato = AlberiCompilati.da_modello(modello)
+    blocco = np.resize(X, (dimensione, X.shape[1]))
+    return lambda: compilato.predict_proba(blocco)
+
+
+def prepara_prolog(dimensione):
+    """'dimensione' round-trip Prolog completi (assert + validazione + recovery + retract)."""
+    from pyswip import Prolog
+    from pool_prolog import valida_lotto_prolog
+    if 'prolog' not in _cache_preparazione:
+        prolog = Prolog()
+        prolog.consult('kb_agricola.pl')
+        _cache_preparazione['prolog'] = prolog
+    prolog = _cache_preparazione['prolog']
+
+    rng = np.random.default_rng(42)
+    colture = ['rice', 'maize', 'lentil', 'banana', 'coffee', 'wheat']
+    lotti = [(int(rng.integers(0, 140)), 40, 40, round(float(rng.uniform(4, 9)), 2),
+              round(float(rng.uniform(50, 2000)), 2), round(float(rng.uniform(8, 40)), 2), colture[i % 6])
+             for i in range(dimensione)]
+    return lambda: [valida_lotto_prolog(prolog, 'lotto_bench', l[:6], l[6]) for l in lotti]
+
+
+def grafo_sintetico(n_nodi, seed=42):
+    """Mappa dict-of-lists a griglia (4 vicini, costi casuali) con ~n_nodi waypoint."""
+    rng = random.Random(seed)
+    lato = max(2, int(n_nodi ** 0.5))
+    grafo = {}
+    for r in range(lato):
+        for c in range(lato):
+            archi = []
+            for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+                rr, cc = r + dr, c + dc
+                if 0 <= rr < lato and 0 <= cc < lato:
+                    archi.append((f"W_{rr}_{cc}", rng.randint(1, 20)))
+            grafo[f"W_{r}_{c}"] = archi
+    return grafo, 'W_0_0', f"W_{lato - 1}_{lato - 1}"
+
+
+def prepara_a_star(dimensione):
+    """a_star_search (mappa dict) dall'angolo al vertice opposto di un grafo con 'dimensione' nodi."""
+    from pianificazione_drone import a_star_search
+    grafo, start, goal = grafo_sintetico(dimensione)
+    euristica_nulla = dict.fromkeys(grafo, 0)
+    # Nessuna zona interdetta esplicita: si misura la ricerca, non la query alla KB
+    return lambda: a_star_search(grafo, start, goal, euristica_nulla, verbose=False, interdette=frozenset())
+
+
+def prepara_a_star_csr(dimensione):
+    """a_star_csr sullo stesso grafo sintetico (rappresentazione CSR già costruita)."""
+    from pianificazione_drone import a_star_csr, grafo_csr_da_dizionario
+    grafo, start, goal = grafo_sintetico(dimensione)
+    csr = grafo_csr_da_dizionario(grafo)
+    tutti = np.ones(len(csr), dtype=bool)
+    return lambda: a_star_csr(csr, start, goal, attraversabili=tutti)
+
+
+def prepara_diagnosi(dimensione):
+    """'dimensione' chiamate stima_rischio (pgmpy, modalità non compilata)."""
+    from diagnosi_bayesiana import DiagnosticaFitopatologica
+    bn = DiagnosticaFitopatologica()
+    rng = np.random.default_rng(42)
+    casi = [(int(rng.integers(2)), int(rng.integers(2)), float(rng.uniform(0, 200)), float(rng.uniform(0, 100)))
+            for _ in range(dimensione)]
+    return lambda: [bn.stima_rischio(*caso) for caso in casi]
+
+
+STADI = {
+    'rf_singola': (prepara_rf_singola, [1, 10, 100]),
+    'rf_batch': (prepara_rf_batch, [1, 100, 1000, 10000]),
+    'rf_compilata_singola': (prepara_rf_compilata_singola, [1, 10, 100]),
+    'rf_compilata_batch': (prepara_rf_compilata_batch, [1, 100, 1000, 10000]),
+    'prolog_validazione': (prepara_prolog, [10, 100, 1000]),
+    'a_star': (prepara_a_star, [100, 1000, 10000]),
+    'a_star_csr': (prepara_a_star_csr, [100, 1000, 10000, 50000]),
+    'diagnosi_bayesiana': (prepara_diagnosi, [1, 10, 100]),
+}
+
+
+def misura(funzione, ripetizioni=RIPETIZIONI):
+    """Mediana dei tempi (s) su 'ripetizioni' esecuzioni, dopo un giro di riscaldamento."""
+    funzione()
+    tempi = []
+    for _ in range(ripetizioni):
+        t0 = time.perf_counter()
+        funzione()
+        tempi.append(time.perf_counter() - t0)
+    return statistics.median(tempi)
+
+
+def _dipendenza_mancante(errore):
+    """
+    ImportError, oppure un errore di pyswip (PySwipError, es. SwiPrologNotFoundError):
+    pyswip lo solleva mentre carica la libreria, quindi la classe non è importabile
+    e si riconosce per nome.
+    """
+    return isinstance(errore, ImportError) or any(c.__name__ == 'PySwipError' for c in type(errore).__mro__)
+
+
+def esegui(stadi=None, ripetizioni=RIPETIZIONI):
+    """
+    Esegue gli stadi richiesti (tutti se None) per ogni dimensione dello sweep.
+    Restituisce ({stadio: {dimensione: secondi}}, {stadio: errore}). Gli stadi le cui
+    dipendenze opzionali non sono installate (es. pyswip senza SWI-Prolog) vengono
+    saltati con un avviso; gli stadi che falliscono sono registrati come errori (il
+    main esce con codice 1), senza fermare gli altri.
+    """
+    risultati, errori = {}, {}
+    for nome in stadi or STADI:
+        prepara, dimensioni = STADI[nome]
+        try:
+            misure = {}
+            for dimensione in dimensioni:
+                misure[str(dimensione)] = misura(prepara(dimensione), ripetizioni)
+                print(f"  {nome:<20} n={dimensione:<7} {misure[str(dimensione)] * 1000:>10.2f} ms "
+                      f"({misure[str(dimensione)] / dimensione * 1e6:.1f} us/elemento)")
+            risultati[nome] = misure
+        except Exception as e:
+            if _dipendenza_mancante(e):
+                print(f"  {nome:<20} [SALTATO] dipendenza mancante: {e}")
+                continue
+            errori[nome] = f"{type(e).__name__}: {e}"
+            print(f"  {nome:<20} [ERRORE] {errori[nome]}")
+    return risultati, errori
+
+
+def confronta(risultati, baseline, soglia=SOGLIA_REGRESSIONE):
+    """Lista delle regressioni: (stadio, dimensione, baseline_s, attuale_s) oltre la soglia."""
+    regressioni = []
+    for nome, misure in risultati.items():
+        for dimensione, tempo in misure.items():
+            riferimento = baseline.get('risultati', {}).get(nome, {}).get(dimensione)
+            if riferimento is not None and tempo > riferimento * (1 + soglia):
+                regressioni.append((nome, dimensione, riferimento, tempo))
+    return regressioni
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark dei componenti di AgroSmart Advisor")
+    parser.add_argument('--stadi', nargs='*', choices=list(STADI), help="Stadi da eseguire (default: tutti)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="File JSON delle baseline")
+    parser.add_argument('--salva-baseline', action='store_true', help="Registra i risultati come nuova baseline")
+    parser.add_argument('--soglia', type=float, default=SOGLIA_REGRESSIONE,
+                        help="Rallentamento relativo tollerato (0.25 = +25%%)")
+    parser.add_argument('--ripetizioni', type=int, default=RIPETIZIONI)
+    args = parser.parse_args()
+
+    print("--- MICRO-BENCHMARK COMPONENTI ---")
+    risultati, errori = esegui(args.stadi, args.ripetizioni)
+    if errori:
+        print(f"\n[ERRORE] {len(errori)} stadi falliti: {', '.join(errori)}.")
+        sys.exit(1)
+
+    if args.salva_baseline or not os.path.exists(args.baseline):
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.setdefault('risultati', {}).update(risultati)
+        baseline['macchina'] = {'python': platform.python_version(), 'piattaforma': platform.platform(),
+                                'processore': platform.processor() or platform.machine()}
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\n[BASELINE] Risultati salvati in '{args.baseline}'.")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressioni = confronta(risultati, baseline, args.soglia)
+    senza_baseline = [nome for nome in risultati if nome not in baseline.get('risultati', {})]
+    if senza_baseline:
+        print(f"\n[INFO] Nessuna baseline per: {', '.join(senza_baseline)} (usare --salva-baseline).")
+    if regressioni:
+        print(f"\n[REGRESSIONE] {len(regressioni)} misure oltre la soglia del {args.soglia:.0%}:")
+        for nome, dimensione, riferimento, tempo in regressioni:
+            print(f"  {nome} n={dimensione}: {riferimento * 1000:.2f} ms -> {tempo * 1000:.2f} ms "
+                  f"(+{tempo / riferimento - 1:.0%})")
+        sys.exit(1)
+    print(f"\n[OK] Nessuna regressione oltre il {args.soglia:.0%} rispetto a '{args.baseline}'.")
+
+
+if __name__ == "__main__":
+    main()
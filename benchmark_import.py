@@ -0,0 +1,69 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# --- CONFIGURAZIONE ---
+MODULI = ['sistema_ibrido', 'servizio_http', 'pianificazione_drone', 'giri_ispezione',
+          'motore_regole', 'pool_prolog', 'alberi_compilati']
+# Sottosistemi pesanti di cui si controlla il caricamento (non dovrebbero esserci all'import)
+PESANTI = ['pyswip', 'pgmpy', 'sklearn', 'pandas', 'torch', 'scipy']
+RIPETIZIONI = 5
+
+# Eseguito in un interprete nuovo per ogni misura: nessun modulo già in cache
+_SONDA = """
+import json, sys, time
+t0 = time.perf_counter()
+import {modulo}
+durata = time.perf_counter() - t0
+print(json.dumps({{'secondi': durata, 'caricati': [m for m in {pesanti!r} if m in sys.modules]}}))
+"""
+
+
+def misura_import(modulo, ripetizioni=RIPETIZIONI):
+    """Mediana del tempo di import di 'modulo' in processi Python nuovi + sottosistemi pesanti caricati."""
+    tempi, caricati = [], []
+    for _ in range(ripetizioni):
+        uscita = subprocess.run([sys.executable, '-c', _SONDA.format(modulo=modulo, pesanti=PESANTI)],
+                                capture_output=True, text=True)
+        if uscita.returncode != 0:
+            righe = uscita.stderr.strip().splitlines()
+            raise RuntimeError(righe[-1] if righe else f"codice di uscita {uscita.returncode}")
+        esito = json.loads(uscita.stdout.strip().splitlines()[-1])
+        tempi.append(esito['secondi'])
+        caricati = esito['caricati']
+    return statistics.median(tempi), caricati
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo di import dei moduli di AgroSmart Advisor")
+    parser.add_argument('moduli', nargs='*', default=MODULI)
+    parser.add_argument('--ripetizioni', type=int, default=RIPETIZIONI)
+    parser.add_argument('--soglia-ms', type=float, default=None,
+                        help="Esce con errore se un import supera questa durata")
+    args = parser.parse_args()
+
+    print(f"--- TEMPO DI IMPORT (mediana su {args.ripetizioni} processi nuovi) ---")
+    oltre_soglia, falliti = [], []
+    for modulo in args.moduli:
+        try:
+            secondi, caricati = misura_import(modulo, args.ripetizioni)
+        except RuntimeError as e:
+            print(f"  {modulo:<22} [ERRORE] {e}")
+            falliti.append(modulo)
+            continue
+        print(f"  {modulo:<22} {secondi * 1000:8.1f} ms   pesanti caricati: {', '.join(caricati) or '-'}")
+        if args.soglia_ms is not None and secondi * 1000 > args.soglia_ms:
+            oltre_soglia.append(modulo)
+
+    if falliti:
+        print(f"\n[ERRORE] Import falliti: {', '.join(falliti)}")
+    if oltre_soglia:
+        print(f"\n[REGRESSIONE] Oltre {args.soglia_ms:.0f} ms: {', '.join(oltre_soglia)}")
+    if falliti or oltre_soglia:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
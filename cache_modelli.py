@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import joblib
+
+# --- CONFIGURAZIONE ---
+CACHE_DIR = 'modelli_cache'
+BLOCCO_HASH = 1 << 20  # Lettura del dataset a blocchi da 1 MB
+
+
+def hash_file(path):
+    """SHA-256 del contenuto di un file, letto a blocchi (va bene anche per CSV grandi)."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for blocco in iter(lambda: f.read(BLOCCO_HASH), b''):
+            h.update(blocco)
+    return h.hexdigest()
+
+
+def chiave_artefatto(csv_path, parametri):
+    """
+    Chiave dell'artefatto: hash del dataset + iperparametri dei modelli + versione di sklearn.
+    Se cambia uno dei tre, la chiave cambia e i modelli vengono riaddestrati.
+    """
+    import sklearn
+    h = hashlib.sha256()
+    h.update(hash_file(csv_path).encode())
+    h.update(json.dumps(parametri, sort_keys=True).encode())
+    h.update(sklearn.__version__.encode())
+    return h.hexdigest()[:16]
+
+
+def percorso_artefatto(chiave, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"modelli_{chiave}.joblib")
+
+
+def chiave_aggiornamento(chiave, numero):
+    """
+    Chiave dell'artefatto con gli aggiornamenti online del modello base 'chiave':
+    l'artefatto base descrive sempre e solo dataset + iperparametri.
+    """
+    return f"{chiave}_online{numero}"
+
+
+def aggiornamenti_salvati(chiave, cache_dir=CACHE_DIR):
+    """Numeri degli artefatti online salvati per il modello base 'chiave', in ordine crescente."""
+    if not os.path.isdir(cache_dir):
+        return []
+    prefisso, suffisso = f"modelli_{chiave_aggiornamento(chiave, '')}", '.joblib'
+    numeri = [nome[len(prefisso):-len(suffisso)] for nome in os.listdir(cache_dir)
+              if nome.startswith(prefisso) and nome.endswith(suffisso)]
+    return sorted(int(numero) for numero in numeri if numero.isdigit())
+
+
+def salva_aggiornamento(chiave, modelli, cache_dir=CACHE_DIR):
+    """
+    Salva i modelli aggiornati online del modello base 'chiave' con il numero progressivo
+    successivo (l'ultimo salvato è sempre il più recente, anche se chi salva era partito
+    dal modello base) ed elimina gli artefatti online precedenti. Restituisce la chiave.
+    """
+    precedenti = aggiornamenti_salvati(chiave, cache_dir)
+    nuova = chiave_aggiornamento(chiave, (precedenti[-1] if precedenti else 0) + 1)
+    salva_modelli(nuova, modelli, cache_dir)
+    for numero in precedenti:
+        try:
+            os.remove(percorso_artefatto(chiave_aggiornamento(chiave, numero), cache_dir))
+        except FileNotFoundError:
+            pass  # Già rimosso da un altro processo
+    return nuova
+
+
+def carica_modelli(chiave, cache_dir=CACHE_DIR):
+    """
+    Ricarica i modelli salvati (dizionario nome -> oggetto) o None se assenti.
+    Nessun memory-map: gli alberi di sklearn copiano nodi e valori in buffer propri
+    (Tree.__setstate__) e classes_ del LabelEncoder è un array di oggetti, quindi
+    ogni processo che carica l'artefatto ne ha una copia privata.
+    """
+    path = percorso_artefatto(chiave, cache_dir)
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path)
+
+
+def salva_modelli(chiave, modelli, cache_dir=CACHE_DIR):
+    """
+    Salva i modelli senza compressione (caricamento più rapido all'avvio dei worker).
+    La scrittura passa da un file temporaneo + rename atomico, così worker
+    avviati in parallelo non leggono mai un artefatto scritto a metà.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = percorso_artefatto(chiave, cache_dir)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(modelli, tmp)
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# --- CONFIGURAZIONE ---
+KB_PATH = 'kb_agricola.pl'
+# Risoluzione di quantizzazione per ogni input (sotto questa soglia due letture sono
+# considerate la stessa): nutrienti in unità intere, pH a 0.05, pioggia al mm, temperatura a 0.1 °C.
+# Contenitori [k*passo, (k+1)*passo): i bordi cadono sui multipli del passo, come le soglie della KB.
+RISOLUZIONI = {'N': 1.0, 'P': 1.0, 'K': 1.0, 'pH': 0.05, 'rainfall': 1.0, 'temperature': 0.1}
+MAX_VOCI = 10_000
+TTL_S = None  # Nessuna scadenza temporale di default (solo LRU)
+
+
+def soglie_kb(kb_path=KB_PATH):
+    """Regole a soglia di dati_lotto/7 nella KB come [(colonna, operatore, valore)]."""
+    if not os.path.exists(kb_path):
+        return []
+    from motore_regole import MotoreRegole, ARGOMENTI_LOTTO
+    return [(ARGOMENTI_LOTTO[indice], operatore, valore)
+            for indice, operatore, valore in MotoreRegole(kb_path).soglie.values()]
+
+
+class CacheRaccomandazioni:
+    """
+    Memoizzazione degli esiti della pipeline, con chiave = i sei input quantizzati
+    alle risoluzioni configurate (letture di lotti vicini o poll ripetuti dello
+    stesso lotto che differiscono sotto la precisione dei sensori condividono l'esito).
+    - dimensione limitata con espulsione LRU, scadenza opzionale 'ttl_s' per voce;
+    - ogni accesso riceve la 'versione' corrente di modelli e KB: se cambia, la cache
+      viene svuotata (nessun esito calcolato con modelli o vincoli vecchi);
+    - statistiche di hit/miss consultabili con statistiche().
+    Oltre ai contenitori, la chiave contiene l'esito di ogni regola a soglia della KB
+    (es. pH < 5.5): due letture ai lati di una soglia non condividono mai l'esito,
+    anche con operatori stretti (pH > 7.5) o errori di arrotondamento della divisione.
+    """
+
+    def __init__(self, colonne, risoluzioni=None, max_voci=MAX_VOCI, ttl_s=TTL_S, soglie=None):
+        """
+        soglie: [(colonna, operatore, valore)] delle regole a soglia; default quelle di
+        kb_agricola.pl (compilate da motore_regole), nessuna se il file non esiste.
+        """
+        risoluzioni = {**RISOLUZIONI, **(risoluzioni or {})}
+        self.colonne = list(colonne)
+        self.passi = np.array([risoluzioni[c] for c in self.colonne], dtype=np.float64)
+        self.soglie = soglie_kb() if soglie is None else list(soglie)
+        self._indici_soglie = [self.colonne.index(colonna) for colonna, _, _ in self.soglie]
+        self.max_voci = max_voci
+        self.ttl_s = ttl_s
+        self.versione = None
+        self._voci = OrderedDict()
+        self._lock = threading.Lock()
+        self._contatori = dict.fromkeys(['hit', 'miss', 'espulse', 'scadute', 'invalidazioni'], 0)
+
+    def chiavi(self, X):
+        """Chiavi di cache (tuple di interi) per una matrice (n, 6) di input."""
+        from motore_regole import OPERATORI
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.passi))
+        parti = [np.floor(X / self.passi).astype(np.int64)]
+        for i, (_, operatore, valore) in zip(self._indici_soglie, self.soglie):
+            parti.append(OPERATORI[operatore](X[:, i], valore)[:, None].astype(np.int64))
+        return list(map(tuple, np.hstack(parti).tolist()))
+
+    def _allinea_versione(self, versione):
+        if versione != self.versione:
+            if self._voci:
+                self._contatori['invalidazioni'] += 1
+            self._voci.clear()
+            self.versione = versione
+
+    def ottieni(self, chiave, versione):
+        """Esito memorizzato per 'chiave', oppure None (miss, voce scaduta o versione cambiata)."""
+        with self._lock:
+            self._allinea_versione(versione)
+            voce = self._voci.get(chiave)
+            if voce is not None and self.ttl_s is not None and time.monotonic() - voce[0] > self.ttl_s:
+                del self._voci[chiave]
+                self._contatori['scadute'] += 1
+                voce = None
+            if voce is None:
+                self._contatori['miss'] += 1
+                return None
+            self._voci.move_to_end(chiave)
+            self._contatori['hit'] += 1
+            return voce[1]
+
+    def inserisci(self, chiave, esito, versione):
+        with self._lock:
+            self._allinea_versione(versione)
+            self._voci[chiave] = (time.monotonic(), esito)
+            self._voci.move_to_end(chiave)
+            while len(self._voci) > self.max_voci:
+                self._voci.popitem(last=False)
+                self._contatori['espulse'] += 1
+
+    def svuota(self):
+        with self._lock:
+            self._voci.clear()
+
+    def statistiche(self):
+        with self._lock:
+            accessi = self._contatori['hit'] + self._contatori['miss']
+            return {**self._contatori,
+                    'voci': len(self._voci),
+                    'hit_rate': self._contatori['hit'] / accessi if accessi else 0.0}
+
+
+if __name__ == "__main__":
+    # Verifica: letture appena sotto/sopra ogni soglia della KB hanno chiavi diverse,
+    # partendo dal valore di base di ogni colonna e spostando solo quella della soglia.
+    colonne = ['N', 'P', 'K', 'pH', 'rainfall', 'temperature']
+    cache = CacheRaccomandazioni(colonne)
+    base = np.array([90, 40, 40, 6.5, 800, 25], dtype=np.float64)
+    errori = 0
+    for colonna, operatore, valore in cache.soglie:
+        i = colonne.index(colonna)
+        for delta in (1e-9, 1e-3, cache.passi[i] / 2):
+            righe = np.tile(base, (2, 1))
+            righe[:, i] = [valore - delta, valore + delta]
+            k = cache.chiavi(righe)
+            if k[0] == k[1]:
+                print(f"[ERRORE] {colonna} {operatore} {valore}: chiavi condivise ai lati della soglia (delta {delta})")
+                errori += 1
+    print(f"[OK] {len(cache.soglie)} soglie della KB separate dalle chiavi della cache." if not errori
+          else f"[ERRORE] {errori} casi con chiavi condivise.")
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURAZIONE ---
+# Tipi compatti per le colonne del dataset: 2 byte per i nutrienti (valori < 32767),
+# 4 byte per le misure continue, etichetta come categoria (codici int8, int16 oltre 127 colture).
+# Rispetto ai default int64/float64 + stringhe Python la memoria scende di circa 4-8 volte.
+COLONNA_TARGET = 'Crop'
+DTYPE_COLONNE = {
+    'N': np.int16,
+    'P': np.int16,
+    'K': np.int16,
+    'pH': np.float32,
+    'rainfall': np.float32,
+    'temperature': np.float32,
+}
+COLONNE_FEATURE = list(DTYPE_COLONNE)
+
+CHUNK_RIGHE = 500_000    # Righe per blocco di lettura (file più grandi della RAM)
+CACHE_DIR = 'dati_cache'
+
+# Archivio binario colonnare: un .npy per colonna + intestazione JSON
+FORMATO_ARCHIVIO = 1
+META_FILE = 'meta.json'
+DATASET_PREDEFINITI = ['Train_Dataset_Clean.csv', 'test dataset.csv']
+
+
+def leggi_a_blocchi(csv_path, chunksize=CHUNK_RIGHE):
+    """
+    Legge il CSV a blocchi di 'chunksize' righe, già con i tipi compatti.
+    La colonna indice 'Unnamed: 0' degli export viene scartata in lettura.
+    Restituisce un iteratore di DataFrame (l'etichetta resta stringa nel blocco).
+    """
+    intestazione = pd.read_csv(csv_path, nrows=0).columns
+    colonne = [c for c in intestazione if c in DTYPE_COLONNE or c == COLONNA_TARGET]
+    dtype = {c: DTYPE_COLONNE[c] for c in colonne if c in DTYPE_COLONNE}
+    return pd.read_csv(csv_path, usecols=colonne, dtype=dtype, chunksize=chunksize)
+
+
+def _chiave_cache(csv_path):
+    """Impronta economica del file (percorso, dimensione, data di modifica): non rilegge i GB del CSV."""
+    info = os.stat(csv_path)
+    impronta = f"{os.path.abspath(csv_path)}|{info.st_size}|{info.st_mtime_ns}"
+    return hashlib.sha256(impronta.encode()).hexdigest()[:16]
+
+
+def _percorso_archivio(csv_path, cache_dir):
+    nome = os.path.splitext(os.path.basename(csv_path))[0].replace(' ', '_')
+    return os.path.join(cache_dir, f"{nome}_{_chiave_cache(csv_path)}")
+
+
+def _scrivi_intestazione(f, dtype, righe):
+    """
+    (Ri)scrive l'intestazione .npy di un vettore di 'righe' elementi all'inizio del file.
+    Restituisce l'offset dei dati: NumPy riserva spazio per far crescere la dimensione
+    sul posto, ma se cambiasse l'intestazione sovrascriverebbe i dati (il chiamante verifica).
+    """
+    f.seek(0)
+    np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                                             'fortran_order': False, 'shape': (righe,)})
+    return f.tell()
+
+
+def _scrivi_colonne(csv_path, cartella, chunksize):
+    """
+    Parsing a blocchi del CSV scritto direttamente in <cartella>/<colonna>.npy:
+    ogni blocco è accodato ai file e poi scartato, quindi la memoria resta quella
+    di un blocco qualunque sia la dimensione del CSV. Il numero di righe è scritto
+    nelle intestazioni alla fine. L'etichetta è salvata prima con codici provvisori
+    (ordine di apparizione), poi rimappata a blocchi nell'ordine alfabetico finale.
+    Restituisce l'intestazione per meta.json.
+    """
+    file_colonne = {}
+    dtype_colonne = {}
+    inizio_dati = {}
+    vocabolario = {}
+    righe = 0
+    provvisori = os.path.join(cartella, f"{COLONNA_TARGET}.codici")
+    try:
+        for blocco in leggi_a_blocchi(csv_path, chunksize):
+            for nome in blocco.columns:
+                if nome == COLONNA_TARGET:
+                    etichette = blocco[nome].astype(str).to_numpy()
+                    for etichetta in pd.unique(etichette):
+                        vocabolario.setdefault(etichetta, len(vocabolario))
+                    if nome not in file_colonne:
+                        file_colonne[nome] = open(provvisori, 'wb')
+                    pd.Series(etichette).map(vocabolario).to_numpy(np.int32).tofile(file_colonne[nome])
+                else:
+                    valori = blocco[nome].to_numpy()
+                    if nome not in file_colonne:
+                        # Intestazione provvisoria da 0 righe, corretta a fine lettura
+                        file_colonne[nome] = open(os.path.join(cartella, f"{nome}.npy"), 'wb')
+                        dtype_colonne[nome] = valori.dtype
+                        inizio_dati[nome] = _scrivi_intestazione(file_colonne[nome], valori.dtype, 0)
+                    valori.tofile(file_colonne[nome])
+            righe += len(blocco)
+        for nome, f in file_colonne.items():
+            if nome != COLONNA_TARGET and _scrivi_intestazione(f, dtype_colonne[nome], righe) != inizio_dati[nome]:
+                raise ValueError(f"Intestazione .npy della colonna '{nome}' cambiata di lunghezza con {righe} righe")
+    finally:
+        for f in file_colonne.values():
+            f.close()
+
+    categorie = None
+    if COLONNA_TARGET in file_colonne:
+        # Categorie in ordine alfabetico (stesso ordine di LabelEncoder); codici int8/int16,
+        # lo stesso tipo che usa pandas: il Categorical li adotta senza copiarli
+        categorie = sorted(vocabolario)
+        rimappa = np.empty(len(vocabolario), dtype=np.int64)
+        rimappa[[vocabolario[c] for c in categorie]] = np.arange(len(categorie))
+        tipo_codici = np.int8 if len(categorie) <= 127 else np.int16
+        codici = np.lib.format.open_memmap(os.path.join(cartella, f"{COLONNA_TARGET}.npy"), mode='w+',
+                                           dtype=tipo_codici, shape=(righe,))
+        if righe:
+            sorgente = np.memmap(provvisori, dtype=np.int32, mode='r', shape=(righe,))
+            for inizio in range(0, righe, chunksize):
+                codici[inizio:inizio + chunksize] = rimappa[sorgente[inizio:inizio + chunksize]]
+            del sorgente
+        codici.flush()
+        del codici
+        dtype_colonne[COLONNA_TARGET] = np.dtype(tipo_codici)
+        os.remove(provvisori)
+
+    colonne = list(file_colonne)
+    return {
+        'formato': FORMATO_ARCHIVIO,
+        'sorgente': os.path.basename(csv_path),
+        'righe': righe,
+        'colonne': colonne,
+        'dtype': {nome: dtype_colonne[nome].str for nome in colonne},
+        'categorie': categorie,
+    }
+
+
+def _in_memory_map(valori):
+    """True se l'array è una vista su un file in memory-map (risale la catena dei .base)."""
+    while valori is not None and not isinstance(valori, np.memmap):
+        valori = getattr(valori, 'base', None)
+    return valori is not None
+
+
+def _da_colonne(colonne, categorie):
+    """
+    Ricostruisce il DataFrame compatto dagli array colonnari (target come Categorical).
+    copy=False: con gli array in memory-map le feature restano viste sui file; i codici
+    dell'etichetta sono condivisi solo se la versione di pandas li adotta senza copia
+    (altrimenti copia privata da 1-2 byte per riga; vedi python caricamento_dati.py).
+    """
+    dati = {}
+    for nome, valori in colonne.items():
+        if nome == COLONNA_TARGET:
+            # Codici già validati alla conversione: nessuna seconda scansione
+            dati[nome] = pd.Categorical.from_codes(valori, dtype=pd.CategoricalDtype(categorie),
+                                                   validate=False)
+        else:
+            dati[nome] = valori
+    return pd.DataFrame(dati, copy=False)
+
+
+def converti_in_archivio(csv_path, cache_dir=CACHE_DIR, chunksize=CHUNK_RIGHE):
+    """
+    Conversione una tantum del CSV in un archivio binario colonnare:
+        <cache_dir>/<nome>_<impronta>/<colonna>.npy + meta.json
+    (intestazione con colonne, dtype, numero di righe e vocabolario dell'etichetta).
+    Se l'archivio del file nella sua versione attuale esiste già non fa nulla.
+    Restituisce il percorso dell'archivio.
+    """
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(csv_path)
+
+    percorso = _percorso_archivio(csv_path, cache_dir)
+    if os.path.exists(os.path.join(percorso, META_FILE)):
+        return percorso
+
+    # Scrittura in una cartella temporanea poi rename: nessun lettore vede un archivio a metà
+    tmp = f"{percorso}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    try:
+        meta = _scrivi_colonne(csv_path, tmp, chunksize)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    with open(os.path.join(tmp, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    try:
+        os.rename(tmp, percorso)
+    except OSError:
+        # Un altro processo ha completato la stessa conversione per primo
+        shutil.rmtree(tmp, ignore_errors=True)
+    return percorso
+
+
+def apri_archivio(percorso):
+    """
+    Apre un archivio di converti_in_archivio in memory-map, sola lettura.
+    Restituisce (colonne, meta): gli array sono viste sui file, quindi N processi
+    condividono la stessa copia nella page cache invece di N copie private.
+    """
+    with open(os.path.join(percorso, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get('formato') != FORMATO_ARCHIVIO:
+        raise ValueError(f"Archivio '{percorso}' in un formato non supportato: {meta.get('formato')}")
+
+    colonne = {}
+    for nome in meta['colonne']:
+        valori = np.load(os.path.join(percorso, f"{nome}.npy"), mmap_mode='r')
+        if valori.dtype.str != meta['dtype'][nome] or len(valori) != meta['righe']:
+            raise ValueError(f"Colonna '{nome}' dell'archivio '{percorso}' non coerente con meta.json")
+        colonne[nome] = valori
+    return colonne, meta
+
+
+def carica_dataset(csv_path, usa_cache=True, cache_dir=CACHE_DIR, chunksize=CHUNK_RIGHE):
+    """
+    Caricamento condiviso dei dataset per tutti gli script.
+    - lettura a blocchi con tipi compatti (int16 / float32, etichetta categoriale);
+    - con usa_cache=True il CSV è convertito una volta nell'archivio colonnare
+      (converti_in_archivio) e il DataFrame è costruito senza copie sui suoi file
+      in memory-map: ogni script o worker lo apre istantaneamente e tutti
+      condividono le stesse pagine. Le colonne sono in sola lettura.
+    Solleva FileNotFoundError se il CSV non esiste (come pd.read_csv).
+    """
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(csv_path)
+
+    if not usa_cache:
+        # Stessa scrittura a blocchi in una cartella temporanea, poi una sola copia in RAM per colonna
+        with tempfile.TemporaryDirectory() as cartella:
+            meta = _scrivi_colonne(csv_path, cartella, chunksize)
+            colonne = {nome: np.load(os.path.join(cartella, f"{nome}.npy")) for nome in meta['colonne']}
+        return _da_colonne(colonne, meta['categorie'])
+
+    colonne, meta = apri_archivio(converti_in_archivio(csv_path, cache_dir, chunksize))
+    return _da_colonne(colonne, meta['categorie'])
+
+
+def separa_feature_target(df):
+    """(X, y) dal DataFrame compatto: feature nell'ordine di COLONNE_FEATURE."""
+    return df[COLONNE_FEATURE], df[COLONNA_TARGET]
+
+
+if __name__ == "__main__":
+    # Conversione una tantum: python caricamento_dati.py [file.csv ...]
+    for csv_path in sys.argv[1:] or DATASET_PREDEFINITI:
+        try:
+            percorso = converti_in_archivio(csv_path)
+        except FileNotFoundError:
+            print(f"[ERRORE] File non trovato: {csv_path}")
+            continue
+        colonne, meta = apri_archivio(percorso)
+        dimensione = sum(valori.nbytes for valori in colonne.values())
+        print(f"[DATI] {csv_path} -> {percorso}: {meta['righe']} righe, "
+              f"{len(meta['colonne'])} colonne, {dimensione / 1e6:.1f} MB in memory-map.")
+        df = carica_dataset(csv_path)
+        copiate = [c for c in df.columns if not _in_memory_map(
+            df[c].array._ndarray if c == COLONNA_TARGET else df[c].to_numpy())]
+        print(f"       Colonne del DataFrame copiate in RAM: {', '.join(copiate) or 'nessuna'}.")
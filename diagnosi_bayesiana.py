@@ -1,11 +1,34 @@
 from pgmpy.models import BayesianModel
 from pgmpy.factors.discrete import TabularCPD
 from pgmpy.inference import VariableElimination
+import json
+import os
+import numpy as np
 import logging
 
 # Disabilitiamo i warning logistici
 logging.getLogger("pgmpy").setLevel(logging.ERROR)
 
+# Soglie di discretizzazione dei dati continui dei sensori
+SOGLIA_PIOGGIA_MM = 50   # Soglia arbitraria 50mm
+SOGLIA_UMIDITA_PCT = 60  # Soglia 60%
+
+# Ordine degli assi delle tabelle compilate: un asse binario per ogni evidenza
+EVIDENZE = ['Macchie_Foglie', 'Ingiallimento', 'Pioggia', 'Umidità']
+
+# Topologia della rete (grafo orientato), condivisa con l'apprendimento delle CPT
+ARCHI = [
+    ('Pioggia', 'Stress_Idrico'),           # La pioggia riduce lo stress idrico
+    ('Umidità', 'Presenza_Malattia'),       # L'umidità favorisce i funghi (Malattia)
+    ('Stress_Idrico', 'Ingiallimento'),     # Lo stress causa giallo
+    ('Presenza_Malattia', 'Ingiallimento'), # Anche la malattia causa giallo (CAUSA COMUNE)
+    ('Presenza_Malattia', 'Macchie_Foglie') # La malattia causa macchie
+]
+
+# CPT apprese dai log di osservazione (apprendimento_cpt.py --salva): se il file
+# esiste, carica_diagnostica le usa al posto dei valori a priori
+MODELLO_CPT_PATH = 'diagnosi_cpt.json'
+
 class DiagnosticaFitopatologica:
     """
     Rete Bayesiana Causale "Folta".
@@ -17,15 +40,20 @@ class DiagnosticaFitopatologica:
                                                                   [Macchie_Foglie]
     """
 
-    def __init__(self):
+    def __init__(self, compilata=False, cpt=None, soglie=None):
+        """
+        compilata=True precalcola subito le tabelle a posteriori (vedi compila()):
+        stima_rischio diventa una lettura di tabella invece di due query pgmpy.
+        cpt: CPT apprese ({nodo: {'evidence': [...], 'values': [[...]]}}, vedi
+        apprendimento_cpt.py) al posto di quelle a priori scritte qui sotto.
+        soglie: {'pioggia_mm': ..., 'umidita_pct': ...} per la discretizzazione dei sensori.
+        """
+        soglie = soglie or {}
+        self.soglia_pioggia_mm = soglie.get('pioggia_mm', SOGLIA_PIOGGIA_MM)
+        self.soglia_umidita_pct = soglie.get('umidita_pct', SOGLIA_UMIDITA_PCT)
+
         # 1. Definizione della Topologia (Grafo Orientato)
-        self.model = BayesianModel([
-            ('Pioggia', 'Stress_Idrico'),           # La pioggia riduce lo stress idrico
-            ('Umidità', 'Presenza_Malattia'),       # L'umidità favorisce i funghi (Malattia)
-            ('Stress_Idrico', 'Ingiallimento'),     # Lo stress causa giallo
-            ('Presenza_Malattia', 'Ingiallimento'), # Anche la malattia causa giallo (CAUSA COMUNE)
-            ('Presenza_Malattia', 'Macchie_Foglie') # La malattia causa macchie
-        ])
+        self.model = BayesianModel(ARCHI)
 
         # 2. TABELLE DELLE PROBABILITÀ (CPT)
 
@@ -69,11 +97,92 @@ class DiagnosticaFitopatologica:
                                         [0.05, 0.7, 0.8, 0.95]], # Si Giallo
                                 evidence=['Stress_Idrico', 'Presenza_Malattia'], evidence_card=[2, 2])
 
+        cpds = [cpd_pioggia, cpd_umidita, cpd_stress, cpd_malattia, cpd_macchie, cpd_giallo]
+        if cpt is not None:
+            cpds = [TabularCPD(variable=nodo, variable_card=2, values=spec['values'],
+                               evidence=spec['evidence'] or None,
+                               evidence_card=[2] * len(spec['evidence']) or None)
+                    for nodo, spec in cpt.items()]
+
         # 3. Aggiunta e Validazione
-        self.model.add_cpds(cpd_pioggia, cpd_umidita, cpd_stress, cpd_malattia, cpd_macchie, cpd_giallo)
+        self.model.add_cpds(*cpds)
         assert self.model.check_model()
         self.inferenza = VariableElimination(self.model)
 
+        self.tabella_malattia = None
+        self.tabella_stress = None
+        if compilata:
+            self.compila()
+
+    @classmethod
+    def da_file(cls, path, compilata=False):
+        """Rete con le CPT e le soglie esportate da apprendimento_cpt.py."""
+        with open(path) as f:
+            modello = json.load(f)
+        return cls(compilata=compilata, cpt=modello['cpt'], soglie=modello['soglie'])
+
+    def compila(self):
+        """
+        Modalità compilata: tutte le evidenze sono binarie (macchie, giallo, pioggia e
+        umidità discretizzate), quindi esistono solo 16 combinazioni. Calcoliamo una volta
+        P(Presenza_Malattia=1 | e) e P(Stress_Idrico=1 | e) per ognuna, enumerando la
+        distribuzione congiunta con einsum sulle CPT del modello.
+        Le tabelle hanno assi [macchie, giallo, pioggia, umidità].
+        """
+        lettere = {var: chr(ord('a') + i) for i, var in enumerate(self.model.nodes())}
+        operandi, indici = [], []
+        for cpd in self.model.get_cpds():
+            operandi.append(cpd.values)
+            indici.append(''.join(lettere[v] for v in cpd.variables))
+
+        assi_evidenza = ''.join(lettere[v] for v in EVIDENZE)
+        tabelle = []
+        for query in ['Presenza_Malattia', 'Stress_Idrico']:
+            firma = f"{','.join(indici)}->{assi_evidenza}{lettere[query]}"
+            congiunta = np.einsum(firma, *operandi)
+            tabelle.append(congiunta[..., 1] / congiunta.sum(axis=-1))
+
+        self.tabella_malattia, self.tabella_stress = tabelle
+        return self
+
+    def verifica_compilazione(self, tolleranza=1e-9):
+        """
+        Confronta le 16 combinazioni delle tabelle compilate con le query pgmpy.
+        Restituisce lo scarto massimo assoluto (solleva AssertionError oltre la tolleranza).
+        """
+        if self.tabella_malattia is None:
+            self.compila()
+
+        scarto = 0.0
+        for combinazione in np.ndindex(*self.tabella_malattia.shape):
+            evidence = dict(zip(EVIDENZE, (int(v) for v in combinazione)))
+            p_mal = self.inferenza.query(variables=['Presenza_Malattia'], evidence=evidence,
+                                         show_progress=False).values[1]
+            p_stress = self.inferenza.query(variables=['Stress_Idrico'], evidence=evidence,
+                                            show_progress=False).values[1]
+            scarto = max(scarto, abs(p_mal - self.tabella_malattia[combinazione]),
+                         abs(p_stress - self.tabella_stress[combinazione]))
+
+        assert scarto <= tolleranza, f"Tabelle compilate non coerenti con pgmpy (scarto {scarto:.2e})"
+        return scarto
+
+    def stima_rischio_array(self, macchie, giallo, pioggia_mm, umidita_pct):
+        """
+        Versione vettoriale di stima_rischio per migliaia di fotogrammi del drone.
+        Accetta scalari o array NumPy (con broadcasting) e restituisce
+        (prob_malattia, prob_stress) come array.
+        """
+        if self.tabella_malattia is None:
+            self.compila()
+
+        indice = (
+            np.asarray(macchie, dtype=np.intp),
+            np.asarray(giallo, dtype=np.intp),
+            (np.asarray(pioggia_mm) > self.soglia_pioggia_mm).astype(np.intp),
+            (np.asarray(umidita_pct) > self.soglia_umidita_pct).astype(np.intp),
+        )
+        return self.tabella_malattia[indice], self.tabella_stress[indice]
+
     def stima_rischio(self, macchie, giallo, pioggia_mm, umidita_pct):
         """
         Input:
@@ -84,8 +193,13 @@ class DiagnosticaFitopatologica:
         evidence = {}
         
         # Discretizzazione dei dati continui (trasformiamo i numeri in stati 0/1)
-        stato_pioggia = 1 if pioggia_mm > 50 else 0  # Soglia arbitraria 50mm
-        stato_umidita = 1 if umidita_pct > 60 else 0 # Soglia 60%
+        stato_pioggia = 1 if pioggia_mm > self.soglia_pioggia_mm else 0
+        stato_umidita = 1 if umidita_pct > self.soglia_umidita_pct else 0
+
+        if self.tabella_malattia is not None:
+            # Modalità compilata: lettura diretta della tabella precalcolata
+            combinazione = (macchie, giallo, stato_pioggia, stato_umidita)
+            return float(self.tabella_malattia[combinazione]), float(self.tabella_stress[combinazione])
         
         evidence['Macchie_Foglie'] = macchie
         evidence['Ingiallimento'] = giallo
@@ -103,6 +217,12 @@ class DiagnosticaFitopatologica:
 
         return prob_malattia, prob_stress
 
+def carica_diagnostica(compilata=False, path=MODELLO_CPT_PATH):
+    """Rete con le CPT apprese se 'path' esiste, altrimenti con quelle a priori."""
+    if os.path.exists(path):
+        return DiagnosticaFitopatologica.da_file(path, compilata=compilata)
+    return DiagnosticaFitopatologica(compilata=compilata)
+
 if __name__ == "__main__":
     bn = DiagnosticaFitopatologica()
     
@@ -115,4 +235,8 @@ if __name__ == "__main__":
     # Caso B: Foglie Gialle, Niente Macchie, SICCITÀ TOTALE.
     # Il sistema dovrebbe dire: "Probabilmente è solo sete (Stress), rischio malattia basso".
     p_mal, p_stress = bn.stima_rischio(macchie=0, giallo=1, pioggia_mm=0, umidita_pct=20)
-    print(f"Scenario B (Secco, Giallo):   Rischio Malattia: {p_mal:.2f} | Rischio Stress: {p_stress:.2f}")
\ No newline at end of file
+    print(f"Scenario B (Secco, Giallo):   Rischio Malattia: {p_mal:.2f} | Rischio Stress: {p_stress:.2f}")
+
+    # Verifica della modalità compilata contro pgmpy su tutte le 16 combinazioni
+    scarto = bn.compila().verifica_compilazione()
+    print(f"Modalità compilata verificata contro pgmpy (scarto massimo: {scarto:.1e})")
\ No newline at end of file
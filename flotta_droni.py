@@ -0,0 +1,305 @@
+import heapq
+import itertools
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pianificazione_drone import (mappa_agricola, grafo_bidirezionale, dijkstra_csr,
+                                  percorso_da_padri, versione_vincoli)
+
+# --- CONFIGURAZIONE ---
+STAZIONI = ['Stazione_Ricarica']     # Stazioni di ricarica (partenza e rientro delle missioni)
+DESTINAZIONE = 'Lotto_Critico'       # Lotto ispezionato dalle missioni del sistema ibrido
+AUTONOMIA_M = 150                    # Distanza percorribile con una carica completa
+VELOCITA_M_S = 5.0
+TEMPO_ISPEZIONE_S = 60               # Permanenza sul lotto (rilievo fotografico)
+TEMPO_RICARICA_S = 900               # Da batteria scarica a piena (ricarica lineare)
+
+_piano_worker = None  # (grafo, stazioni) nei processi del pool
+
+
+def piano_lotto(grafo, stazioni, lotto, attraversabili):
+    """
+    Un solo Dijkstra dal lotto (grafo simmetrico): distanza e percorso lotto -> stazione
+    per ogni stazione raggiungibile. L'andata è lo stesso percorso al contrario.
+    Restituisce {stazione: (distanza, percorso lotto -> stazione)}.
+    """
+    distanze, padri = dijkstra_csr(grafo, lotto, attraversabili)
+    piano = {}
+    for stazione in stazioni:
+        distanza = distanze[grafo.posizione[stazione]]
+        if np.isfinite(distanza):
+            piano[stazione] = (float(distanza), percorso_da_padri(grafo, padri, lotto, stazione))
+    return piano
+
+
+def _inizializza_worker(grafo, stazioni):
+    """Eseguito una volta per processo: il grafo arriva una sola volta, non a ogni task."""
+    global _piano_worker
+    _piano_worker = (grafo, stazioni)
+
+
+def _pianifica_nel_worker(lotto, attraversabili):
+    grafo, stazioni = _piano_worker
+    return piano_lotto(grafo, stazioni, lotto, attraversabili)
+
+
+class Drone:
+    """Stato di un drone della flotta (tempo simulato, batteria in metri residui)."""
+
+    def __init__(self, nome, stazione, autonomia=AUTONOMIA_M, velocita=VELOCITA_M_S):
+        self.nome = nome
+        self.stazione = stazione
+        self.autonomia = autonomia
+        self.velocita = velocita
+        self.batteria = autonomia
+        self.libero_da = 0.0
+        self.tempo_volo = 0.0
+        self.missioni = 0
+
+
+class SchedulerFlotta:
+    """
+    Scheduler di missioni di ispezione per più droni e stazioni di ricarica.
+    - accoda(): inserisce la missione in una coda di priorità e avvia subito, in un
+      pool di processi, la pianificazione dei percorsi verso il lotto (un Dijkstra
+      per lotto, in cache per versione dei vincoli KB e dei costi): chi accoda non attende;
+    - esegui(): assegna le missioni in attesa ai droni in tempo simulato, per priorità
+      e in ordine di arrivo, scegliendo il drone che termina prima nel rispetto di
+      autonomia (andata + rientro alla stazione più vicina) e batteria residua
+      (ricarica in stazione quando serve);
+    - statistiche(): throughput delle missioni, attese in coda, utilizzo dei droni.
+    Le missioni restano in coda finché qualcuno non chiama esegui(): il servizio HTTP
+    (servizio_http.py --droni) lo fa a intervalli regolari.
+    Gli istanti sono secondi dall'avvio dello scheduler (orologio reale per accoda()
+    senza 'arrivo', oppure istanti espliciti per simulazioni e replay).
+    """
+
+    def __init__(self, droni=2, grafo=None, stazioni=None, n_worker=None,
+                 tempo_ispezione=TEMPO_ISPEZIONE_S, tempo_ricarica=TEMPO_RICARICA_S):
+        """
+        droni: numero di droni (distribuiti tra le stazioni) o lista di Drone.
+        n_worker: processi per la pianificazione (0 = pianificazione nel processo chiamante).
+        """
+        self.grafo = grafo_bidirezionale(mappa_agricola if grafo is None else grafo)
+        self.stazioni = list(stazioni or STAZIONI)
+        if isinstance(droni, int):
+            droni = [Drone(f"drone_{i + 1}", self.stazioni[i % len(self.stazioni)]) for i in range(droni)]
+        self.droni = list(droni)
+        self.n_worker = os.cpu_count() if n_worker is None else n_worker
+        self.tempo_ispezione = tempo_ispezione
+        self.tempo_ricarica = tempo_ricarica
+
+        self.missioni = {}         # id -> dizionario della missione
+        self._coda = []            # heap (-priorità, arrivo, id)
+        self._contatore = itertools.count(1)
+        self._lock = threading.Lock()
+        self._piani = {}           # ((versione vincoli, versione pesi), lotto) -> piano o Future
+        self._executor = None
+        self._versione_pesi_pool = None
+        self._t0 = time.monotonic()
+        self.tempo_pianificazione = 0.0
+
+    # --- CODA ---
+
+    def orologio(self):
+        return time.monotonic() - self._t0
+
+    def accoda(self, lotto=DESTINAZIONE, priorita=1.0, arrivo=None):
+        """Inserisce una missione (thread-safe, non bloccante). Restituisce l'id della missione."""
+        if lotto not in self.grafo.posizione:
+            raise ValueError(f"Lotto sconosciuto alla mappa della flotta: {lotto}")
+        with self._lock:
+            id_missione = next(self._contatore)
+            arrivo = self.orologio() if arrivo is None else float(arrivo)
+            self.missioni[id_missione] = {'id': id_missione, 'lotto': lotto, 'priorita': float(priorita),
+                                          'arrivo': arrivo, 'stato': 'in_coda'}
+            heapq.heappush(self._coda, (-float(priorita), arrivo, id_missione))
+            self._avvia_pianificazione(lotto)
+        return id_missione
+
+    def in_coda(self):
+        with self._lock:
+            return len(self._coda)
+
+    # --- PIANIFICAZIONE CONCORRENTE ---
+
+    def _versione(self):
+        return versione_vincoli(), self.grafo.versione_pesi
+
+    def _pool(self):
+        if self._executor is not None and self._versione_pesi_pool != self.grafo.versione_pesi:
+            # I worker hanno una copia del grafo con i costi vecchi: nuovo pool
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._executor is None:
+            self._versione_pesi_pool = self.grafo.versione_pesi
+            self._executor = ProcessPoolExecutor(max_workers=self.n_worker,
+                                                 mp_context=mp.get_context('spawn'),
+                                                 initializer=_inizializza_worker,
+                                                 initargs=(self.grafo, self.stazioni))
+        return self._executor
+
+    def _avvia_pianificazione(self, lotto):
+        """Avvia (se non già in cache per questa versione di KB e costi) il piano del lotto nel pool."""
+        chiave = (self._versione(), lotto)
+        if chiave in self._piani:
+            return
+        for vecchia in [k for k in self._piani if k[0] != chiave[0]]:
+            del self._piani[vecchia]
+        if self.n_worker > 0:
+            self._piani[chiave] = self._pool().submit(_pianifica_nel_worker, lotto,
+                                                      self.grafo.maschera_attraversabili())
+        else:
+            self._piani[chiave] = None   # calcolato al momento dell'assegnazione
+
+    def _piano(self, lotto):
+        chiave = (self._versione(), lotto)
+        with self._lock:
+            if chiave not in self._piani:
+                self._avvia_pianificazione(lotto)
+            piano = self._piani[chiave]
+        if piano is None:
+            piano = piano_lotto(self.grafo, self.stazioni, lotto, self.grafo.maschera_attraversabili())
+        elif not isinstance(piano, dict):
+            piano = piano.result()
+        with self._lock:
+            self._piani[chiave] = piano
+        return piano
+
+    # --- ASSEGNAZIONE ---
+
+    def _batteria_a(self, drone, istante):
+        """Batteria del drone all'istante dato: a terra in stazione si ricarica linearmente."""
+        ricarica = max(0.0, istante - drone.libero_da) / self.tempo_ricarica * drone.autonomia
+        return min(drone.autonomia, drone.batteria + ricarica)
+
+    def _assegna(self, missione, piano, istante):
+        """Sceglie il drone che completa prima la missione (vincoli di autonomia e batteria)."""
+        if not piano:
+            missione.update(stato='rifiutata', motivo='lotto irraggiungibile')
+            return
+        rientro, (distanza_rientro, percorso_rientro) = min(piano.items(), key=lambda v: v[1][0])
+
+        migliore = None
+        for drone in self.droni:
+            if drone.stazione not in piano:
+                continue
+            andata, percorso_andata = piano[drone.stazione]
+            consumo = andata + distanza_rientro
+            if consumo > drone.autonomia:
+                continue
+            inizio = max(istante, drone.libero_da, missione['arrivo'])
+            batteria = self._batteria_a(drone, inizio)
+            if batteria < consumo:
+                # Attesa a terra finché la carica basta per andata + rientro
+                inizio += (consumo - batteria) / drone.autonomia * self.tempo_ricarica
+                batteria = consumo
+            fine = inizio + consumo / drone.velocita + self.tempo_ispezione
+            if migliore is None or fine < migliore[0]:
+                migliore = (fine, inizio, batteria, drone, consumo, percorso_andata)
+
+        if migliore is None:
+            missione.update(stato='rifiutata', motivo='fuori autonomia')
+            return
+
+        fine, inizio, batteria, drone, consumo, percorso_andata = migliore
+        percorso = list(reversed(percorso_andata)) + percorso_rientro[1:]
+        drone.batteria = batteria - consumo
+        drone.libero_da = fine
+        drone.stazione = rientro
+        drone.tempo_volo += fine - inizio
+        drone.missioni += 1
+        missione.update(stato='assegnata', drone=drone.nome, partenza=inizio, fine=fine,
+                        attesa=inizio - missione['arrivo'], percorso=percorso, costo=consumo)
+
+    def esegui(self):
+        """
+        Assegna tutte le missioni in coda (simulazione a eventi: quando un drone si
+        libera prende la missione più prioritaria già arrivata).
+        Restituisce la lista delle missioni elaborate in questo giro.
+        """
+        with self._lock:
+            da_assegnare = sorted((self.missioni[id_m] for _, _, id_m in self._coda), key=lambda m: m['arrivo'])
+            self._coda = []
+
+        t0 = time.perf_counter()
+        piani = {lotto: self._piano(lotto) for lotto in dict.fromkeys(m['lotto'] for m in da_assegnare)}
+        self.tempo_pianificazione += time.perf_counter() - t0
+
+        pronte, i = [], 0
+        while i < len(da_assegnare) or pronte:
+            istante = min(drone.libero_da for drone in self.droni)
+            if not pronte and da_assegnare[i]['arrivo'] > istante:
+                istante = da_assegnare[i]['arrivo']
+            while i < len(da_assegnare) and da_assegnare[i]['arrivo'] <= istante:
+                m = da_assegnare[i]
+                heapq.heappush(pronte, (-m['priorita'], m['arrivo'], m['id']))
+                i += 1
+            missione = self.missioni[heapq.heappop(pronte)[2]]
+            self._assegna(missione, piani[missione['lotto']], istante)
+        return da_assegnare
+
+    # --- METRICHE ---
+
+    def statistiche(self):
+        """Throughput (missioni/ora simulate), attese in coda e utilizzo dei droni."""
+        with self._lock:
+            missioni, in_coda = list(self.missioni.values()), len(self._coda)
+        assegnate = [m for m in missioni if m['stato'] == 'assegnata']
+        attese = np.array([m['attesa'] for m in assegnate])
+        arco = (max(m['fine'] for m in assegnate) - min(m['arrivo'] for m in assegnate)) if assegnate else 0.0
+        return {
+            'missioni': len(missioni),
+            'assegnate': len(assegnate),
+            'rifiutate': sum(m['stato'] == 'rifiutata' for m in missioni),
+            'in_coda': in_coda,
+            'throughput_ora': len(assegnate) / arco * 3600 if arco > 0 else 0.0,
+            'attesa_media_s': float(attese.mean()) if len(attese) else 0.0,
+            'attesa_p95_s': float(np.percentile(attese, 95)) if len(attese) else 0.0,
+            'attesa_max_s': float(attese.max()) if len(attese) else 0.0,
+            'utilizzo_droni': {d.nome: d.tempo_volo / arco if arco > 0 else 0.0 for d in self.droni},
+            'tempo_pianificazione_s': self.tempo_pianificazione,
+        }
+
+    def chiudi(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.chiudi()
+
+
+if __name__ == "__main__":
+    from benchmark_componenti import grafo_sintetico
+
+    # Simulazione di un'epidemia: raffica di ispezioni su una mappa a griglia con
+    # quattro stazioni negli angoli, confrontando flotte di dimensioni diverse.
+    N_MISSIONI = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    mappa, _, _ = grafo_sintetico(2500)
+    lato = int(len(mappa) ** 0.5)
+    stazioni = [f"W_{r}_{c}" for r in (0, lato - 1) for c in (0, lato - 1)]
+    rng = np.random.default_rng(42)
+    lotti = [f"W_{r}_{c}" for r, c in rng.integers(0, lato, (N_MISSIONI // 4, 2))]
+    richieste = [(lotti[rng.integers(len(lotti))], float(rng.random()), float(t))
+                 for t in np.sort(rng.uniform(0, 3600, N_MISSIONI))]
+
+    print(f"--- FLOTTA DRONI: {N_MISSIONI} ispezioni in un'ora, {len(lotti)} lotti, "
+          f"{len(mappa)} waypoint, {len(stazioni)} stazioni ---")
+    for n_droni in (1, 4, 8, 16):
+        with SchedulerFlotta([Drone(f"drone_{i + 1}", stazioni[i % len(stazioni)], autonomia=1200)
+                              for i in range(n_droni)], mappa, stazioni) as flotta:
+            for lotto, priorita, arrivo in richieste:
+                flotta.accoda(lotto, priorita, arrivo)
+            flotta.esegui()
+            s = flotta.statistiche()
+        print(f"  {n_droni:>2} droni: {s['throughput_ora']:7.1f} missioni/ora | attesa media "
+              f"{s['attesa_media_s'] / 60:7.1f} min, p95 {s['attesa_p95_s'] / 60:7.1f} min | "
+              f"rifiutate {s['rifiutate']} | pianificazione {s['tempo_pianificazione_s']:.2f} s")
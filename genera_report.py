@@ -0,0 +1,211 @@
+import argparse
+import hashlib
+import importlib
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# --- CONFIGURAZIONE ---
+TRAIN_FILE = 'Train_Dataset_Clean.csv'
+TEST_FILE = 'test dataset.csv'
+CARTELLA_OUTPUT = 'grafici_per_relazione'
+MANIFEST_PATH = os.path.join(CARTELLA_OUTPUT, '.manifest_report.json')
+
+# Decision Tree condiviso da feature importance e matrice di confusione
+# (stesso modello che i due script addestravano separatamente)
+PARAMETRI_DT_REPORT = {'random_state': 42}
+
+# Registro delle figure: funzione che le genera, input da cui dipendono e file prodotti.
+#   dataset: passa il training set come primo argomento
+#   modello: passa il Decision Tree condiviso (argomento 'modello')
+#   codice: moduli locali da cui dipende la figura (il loro hash fa parte dell'impronta)
+FIGURE = {
+    'distribuzione_classi': {'modulo': 'generazione_grafici_doc', 'funzione': 'plot_distribuzione_classi',
+                             'dati': [TRAIN_FILE], 'dataset': True,
+                             'codice': ['generazione_grafici_doc.py', 'caricamento_dati.py'],
+                             'output': [os.path.join(CARTELLA_OUTPUT, '1_distribuzione_classi.png')]},
+    'feature_importance': {'modulo': 'generazione_grafici_doc', 'funzione': 'plot_feature_importance',
+                           'dati': [TRAIN_FILE], 'dataset': True, 'modello': True,
+                           'codice': ['generazione_grafici_doc.py', 'caricamento_dati.py'],
+                           'output': [os.path.join(CARTELLA_OUTPUT, '2_feature_importance.png')]},
+    'learning_curve': {'modulo': 'generazione_grafici_doc', 'funzione': 'plot_learning_curve_graph',
+                       'dati': [TRAIN_FILE], 'dataset': True,
+                       'codice': ['generazione_grafici_doc.py', 'caricamento_dati.py'],
+                       'output': [os.path.join(CARTELLA_OUTPUT, '3_learning_curve.png')]},
+    'rete_bayesiana': {'modulo': 'generazione_grafici_doc', 'funzione': 'plot_rete_bayesiana',
+                       'dati': [],
+                       'codice': ['generazione_grafici_doc.py', 'caricamento_dati.py'],
+                       'output': [os.path.join(CARTELLA_OUTPUT, '4_rete_bayesiana_grafo.png')]},
+    'mappa_drone': {'modulo': 'generazione_extra_doc', 'funzione': 'plot_mappa_drone',
+                    'dati': [],
+                    'codice': ['generazione_extra_doc.py'],
+                    'output': [os.path.join(CARTELLA_OUTPUT, '5_mappa_drone_Astar.png')]},
+    'tassonomia': {'modulo': 'generazione_extra_doc', 'funzione': 'plot_tassonomia_ontologia',
+                   'dati': [],
+                   'codice': ['generazione_extra_doc.py'],
+                   'output': [os.path.join(CARTELLA_OUTPUT, '6_tassonomia_ontologia.png')]},
+    'confronto_modelli': {'modulo': 'valutazione_modelli', 'funzione': 'main',
+                          'dati': [TRAIN_FILE, 'iperparametri.json'],
+                          'codice': ['valutazione_modelli.py', 'caricamento_dati.py', 'motore_valutazione.py',
+                                     'ricerca_iperparametri.py', 'alberi_compilati.py'],
+                          'output': [os.path.join(CARTELLA_OUTPUT, '7_confronto_modelli.png')]},
+    'valutazione_finale': {'modulo': 'test_finale', 'funzione': 'main',
+                           'dati': [TRAIN_FILE, TEST_FILE], 'modello': True,
+                           'codice': ['test_finale.py', 'caricamento_dati.py'],
+                           'output': [os.path.join(CARTELLA_OUTPUT, 'report_classificazione_finale.txt'),
+                                      os.path.join(CARTELLA_OUTPUT, 'matrice_confusione_finale.png')]},
+    'albero_decisionale': {'modulo': 'visualizza_albero', 'funzione': 'main',
+                           'dati': [TRAIN_FILE],
+                           'codice': ['visualizza_albero.py', 'caricamento_dati.py'],
+                           'output': ['albero_decisionale.png']},
+}
+
+
+def _hash_file(path):
+    """Hash del contenuto di un file (None se non esiste: anche la sua comparsa invalida la figura)."""
+    from cache_modelli import hash_file
+    return hash_file(path) if os.path.exists(path) else None
+
+
+def impronta(nome, dpi, hash_dati):
+    """
+    Impronta degli input di una figura: hash dei dataset da cui dipende, dei moduli
+    locali del suo campo 'codice' e dei parametri di generazione.
+    """
+    spec = FIGURE[nome]
+    descrizione = {
+        'dati': {path: hash_dati[path] for path in spec['dati']},
+        'codice': {path: _hash_file(path) for path in spec['codice']},
+        'funzione': spec['funzione'],
+        'parametri': {'dpi': dpi, 'modello': PARAMETRI_DT_REPORT if spec.get('modello') else None},
+    }
+    return hashlib.sha256(json.dumps(descrizione, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def leggi_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def scrivi_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def prepara_modello_condiviso():
+    """
+    Addestra (una volta, poi da cache_modelli) il Decision Tree usato da più figure.
+    Restituisce la chiave dell'artefatto: i worker lo ricaricano invece di riaddestrarlo.
+    """
+    from cache_modelli import chiave_artefatto, carica_modelli, salva_modelli
+    chiave = chiave_artefatto(TRAIN_FILE, {'report_dt': PARAMETRI_DT_REPORT})
+    if carica_modelli(chiave) is None:
+        from sklearn.tree import DecisionTreeClassifier
+        from caricamento_dati import carica_dataset, separa_feature_target
+        X, y = separa_feature_target(carica_dataset(TRAIN_FILE))
+        # Stessa codifica di LabelEncoder: categorie ordinate alfabeticamente
+        modello = DecisionTreeClassifier(**PARAMETRI_DT_REPORT).fit(X, y.cat.codes.to_numpy())
+        salva_modelli(chiave, {'dt': modello})
+        print("[REPORT] Decision Tree condiviso addestrato e salvato in cache.")
+    return chiave
+
+
+def _inizializza_worker():
+    """Backend senza display nei worker (nessuna finestra, nessun server X richiesto)."""
+    os.environ['MPLBACKEND'] = 'Agg'
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _genera_figura(nome, dpi, chiave_modello):
+    """Job del worker: importa lo script della figura e ne chiama la funzione."""
+    spec = FIGURE[nome]
+    argomenti, opzioni = [], {}
+    if spec.get('dataset'):
+        from caricamento_dati import carica_dataset
+        argomenti.append(carica_dataset(TRAIN_FILE))
+    if spec.get('modello'):
+        from cache_modelli import carica_modelli
+        opzioni['modello'] = carica_modelli(chiave_modello)['dt']
+    if dpi is not None:
+        opzioni['dpi'] = dpi
+
+    t0 = time.perf_counter()
+    funzione = getattr(importlib.import_module(spec['modulo']), spec['funzione'])
+    funzione(*argomenti, **opzioni)
+    return nome, time.perf_counter() - t0
+
+
+def costruisci_report(figure=None, dpi=None, forza=False, n_worker=None):
+    """
+    Genera le figure richieste (tutte se None) in un pool di processi con backend Agg.
+    Una figura viene saltata se i suoi output esistono e l'impronta degli input
+    (dataset, codice, parametri) coincide con quella registrata nel manifest.
+    Restituisce (generate, saltate).
+    """
+    figure = list(figure or FIGURE)
+    manifest = leggi_manifest()
+    hash_dati = {path: _hash_file(path) for nome in figure for path in FIGURE[nome]['dati']}
+    impronte = {nome: impronta(nome, dpi, hash_dati) for nome in figure}
+
+    da_generare = [nome for nome in figure
+                   if forza or manifest.get(nome) != impronte[nome]
+                   or not all(os.path.exists(p) for p in FIGURE[nome]['output'])]
+    saltate = [nome for nome in figure if nome not in da_generare]
+    for nome in saltate:
+        print(f"[REPORT] {nome}: invariata, saltata.")
+    if not da_generare:
+        return [], saltate
+
+    if any(FIGURE[nome].get('dataset') for nome in da_generare):
+        # Conversione nel processo padre: i worker aprono tutti lo stesso archivio in memory-map
+        from caricamento_dati import converti_in_archivio
+        converti_in_archivio(TRAIN_FILE)
+
+    chiave_modello = None
+    if any(FIGURE[nome].get('modello') for nome in da_generare):
+        chiave_modello = prepara_modello_condiviso()
+
+    generate = []
+    with ProcessPoolExecutor(max_workers=n_worker or os.cpu_count(),
+                             mp_context=mp.get_context('spawn'),
+                             initializer=_inizializza_worker) as pool:
+        futuri = {pool.submit(_genera_figura, nome, dpi, chiave_modello): nome for nome in da_generare}
+        for futuro in as_completed(futuri):
+            nome = futuri[futuro]
+            try:
+                _, durata = futuro.result()
+            except Exception as e:
+                print(f"[ERRORE] {nome}: {type(e).__name__}: {e}")
+                continue
+            # Il manifest si aggiorna figura per figura: un build interrotto non rifà quelle pronte
+            manifest[nome] = impronte[nome]
+            scrivi_manifest(manifest)
+            generate.append(nome)
+            print(f"[REPORT] {nome}: generata in {durata:.1f} s.")
+    return generate, saltate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build incrementale e parallelo dei grafici per la relazione")
+    parser.add_argument('--figure', nargs='*', choices=list(FIGURE), help="Figure da generare (default: tutte)")
+    parser.add_argument('--dpi', type=int, default=None, help="Risoluzione (default: quella di ogni script)")
+    parser.add_argument('--forza', action='store_true', help="Rigenera anche le figure invariate")
+    parser.add_argument('--n-worker', type=int, default=None)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    generate, saltate = costruisci_report(args.figure, args.dpi, args.forza, args.n_worker)
+    print(f"\n--- REPORT: {len(generate)} figure generate, {len(saltate)} invariate "
+          f"({time.perf_counter() - t0:.1f} s) ---")
+
+
+if __name__ == "__main__":
+    main()
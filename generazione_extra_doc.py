@@ -4,10 +4,11 @@ import os
 
 # Cartella output (la stessa di prima)
 OUTPUT_DIR = 'grafici_per_relazione'
+DPI = 300
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
 
-def plot_mappa_drone():
+def plot_mappa_drone(dpi=DPI):
     print("--- Generazione Mappa Drone con Percorso A* ---")
     
     # 1. Definiamo la Mappa (Grafo)
@@ -55,11 +56,11 @@ def plot_mappa_drone():
     plt.axis('off')
     
     outfile = os.path.join(OUTPUT_DIR, '5_mappa_drone_Astar.png')
-    plt.savefig(outfile, dpi=300)
+    plt.savefig(outfile, dpi=dpi)
     plt.close()
     print(f"[OK] Salvato: {outfile}")
 
-def plot_tassonomia_ontologia():
+def plot_tassonomia_ontologia(dpi=DPI):
     print("\n--- Generazione Tassonomia (Ontologia) ---")
     
     # Gerarchia delle classi (Simile a quella Prolog)
@@ -103,7 +104,7 @@ def plot_tassonomia_ontologia():
     plt.title("Ontologia delle Colture (Gerarchia delle Classi)", fontsize=15)
     
     outfile = os.path.join(OUTPUT_DIR, '6_tassonomia_ontologia.png')
-    plt.savefig(outfile, dpi=300)
+    plt.savefig(outfile, dpi=dpi)
     plt.close()
     print(f"[OK] Salvato: {outfile}")
 
@@ -7,10 +7,12 @@ import os
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.model_selection import learning_curve
 from sklearn.preprocessing import LabelEncoder
+from caricamento_dati import carica_dataset
 
 # --- CONFIGURAZIONE ---
 FILE_DATI = 'Train_Dataset_Clean.csv'
 CARTELLA_OUTPUT = 'grafici_per_relazione'
+DPI = 300
 
 # Crea una sottocartella per tenere in ordine i file generati
 if not os.path.exists(CARTELLA_OUTPUT):
@@ -21,12 +23,9 @@ if not os.path.exists(CARTELLA_OUTPUT):
 sns.set_theme(style="whitegrid")
 
 def carica_dati():
-    """Helper per caricare e pulire i dati."""
+    """Helper per caricare e pulire i dati (tipi compatti, 'Unnamed: 0' già scartata)."""
     try:
-        df = pd.read_csv(FILE_DATI)
-        if 'Unnamed: 0' in df.columns:
-            df = df.drop(columns=['Unnamed: 0'])
-        return df
+        return carica_dataset(FILE_DATI)
     except FileNotFoundError:
         print(f"[ERRORE] Impossibile trovare '{FILE_DATI}'. Assicurati che sia nella cartella.")
         exit()
@@ -34,7 +33,7 @@ def carica_dati():
 # ==============================================================================
 # 1. GRAFICO DISTRIBUZIONE DELLE CLASSI (Dataset Balance)
 # ==============================================================================
-def plot_distribuzione_classi(df):
+def plot_distribuzione_classi(df, dpi=DPI):
     print("--- Generazione Grafico 1: Distribuzione Classi ---")
     plt.figure(figsize=(14, 8))
     
@@ -50,25 +49,29 @@ def plot_distribuzione_classi(df):
     plt.tight_layout()
     
     nome_file = os.path.join(CARTELLA_OUTPUT, '1_distribuzione_classi.png')
-    plt.savefig(nome_file, dpi=300)
+    plt.savefig(nome_file, dpi=dpi)
     plt.close()
     print(f"[OK] Salvato: {nome_file}")
 
 # ==============================================================================
 # 2. GRAFICO FEATURE IMPORTANCE (Importanza dei Parametri)
 # ==============================================================================
-def plot_feature_importance(df):
+def plot_feature_importance(df, modello=None, dpi=DPI):
+    """modello: Decision Tree già addestrato (es. condiviso da genera_report.py); se None lo addestra qui."""
     print("\n--- Generazione Grafico 2: Feature Importance ---")
     X = df.drop(columns=['Crop'])
     y = df['Crop']
     
-    # Serve l'encoding per addestrare il modello al volo
-    le = LabelEncoder()
-    y_enc = le.fit_transform(y)
-    
-    # Addestriamo un Decision Tree veloce per estrarre l'importanza
-    model = DecisionTreeClassifier(random_state=42)
-    model.fit(X, y_enc)
+    if modello is not None:
+        model = modello
+    else:
+        # Serve l'encoding per addestrare il modello al volo
+        le = LabelEncoder()
+        y_enc = le.fit_transform(y)
+        
+        # Addestriamo un Decision Tree veloce per estrarre l'importanza
+        model = DecisionTreeClassifier(random_state=42)
+        model.fit(X, y_enc)
     
     # Creiamo un DataFrame per facilitare il plotting
     importance_df = pd.DataFrame({
@@ -85,14 +88,14 @@ def plot_feature_importance(df):
     plt.tight_layout()
     
     nome_file = os.path.join(CARTELLA_OUTPUT, '2_feature_importance.png')
-    plt.savefig(nome_file, dpi=300)
+    plt.savefig(nome_file, dpi=dpi)
     plt.close()
     print(f"[OK] Salvato: {nome_file}")
 
 # ==============================================================================
 # 3. LEARNING CURVE (Curva di Apprendimento)
 # ==============================================================================
-def plot_learning_curve_graph(df):
+def plot_learning_curve_graph(df, dpi=DPI):
     print("\n--- Generazione Grafico 3: Learning Curve (Richiede alcuni secondi...) ---")
     X = df.drop(columns=['Crop'])
     y = df['Crop']
@@ -134,14 +137,14 @@ def plot_learning_curve_graph(df):
     plt.tight_layout()
     
     nome_file = os.path.join(CARTELLA_OUTPUT, '3_learning_curve.png')
-    plt.savefig(nome_file, dpi=300)
+    plt.savefig(nome_file, dpi=dpi)
     plt.close()
     print(f"[OK] Salvato: {nome_file}")
 
 # ==============================================================================
 # 4. VISUALIZZAZIONE GRAFO RETE BAYESIANA
 # ==============================================================================
-def plot_rete_bayesiana():
+def plot_rete_bayesiana(dpi=DPI):
     print("\n--- Generazione Grafico 4: Struttura Rete Bayesiana (Causale) ---")
     
     # Nuovi archi che riflettono la logica complessa
@@ -174,7 +177,7 @@ def plot_rete_bayesiana():
     plt.axis('off')
 
     nome_file = os.path.join(CARTELLA_OUTPUT, '4_rete_bayesiana_grafo.png')
-    plt.savefig(nome_file, dpi=300)
+    plt.savefig(nome_file, dpi=dpi)
     plt.close()
     print(f"[OK] Salvato: {nome_file}")
 
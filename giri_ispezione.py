@@ -0,0 +1,162 @@
+import numpy as np
+from pianificazione_drone import (mappa_agricola, grafo_bidirezionale, grafo_csr_da_dizionario,
+                                  dijkstra_csr, percorso_da_padri, versione_vincoli)
+
+# --- CONFIGURAZIONE ---
+BASE = 'Stazione_Ricarica'
+
+
+class PianificatoreGiri:
+    """
+    Pianificatore di giri di ispezione multi-lotto sulla mappa di pianificazione_drone.
+    Invece di N missioni separate Stazione_Ricarica -> Lotto_X:
+      1. matrice delle distanze tra stazione e lotti segnalati, con UN Dijkstra a
+         sorgente singola per ogni punto (in cache per versione della mappa/KB);
+      2. ordine di visita con nearest neighbour + miglioramento 2-opt;
+      3. opzionale: limite di autonomia della batteria, con rientri alla stazione.
+    """
+
+    def __init__(self, grafo=None, base=BASE):
+        """grafo: mappa dict o GrafoCSR; default mappa_agricola percorribile nei due sensi."""
+        if grafo is None:
+            grafo = grafo_bidirezionale(mappa_agricola)
+        self.grafo = grafo_csr_da_dizionario(grafo) if isinstance(grafo, dict) else grafo
+        self.base = base
+        self._cache = {}  # ((versione_vincoli, versione_pesi), sorgente) -> (distanze, padri)
+
+    def _albero(self, sorgente):
+        """Dijkstra da 'sorgente', calcolato una sola volta per versione di vincoli e costi."""
+        chiave = ((versione_vincoli(), self.grafo.versione_pesi), sorgente)
+        if chiave not in self._cache:
+            # Vincoli o costi cambiati: le voci di versioni precedenti non servono più
+            for vecchia in [k for k in self._cache if k[0] != chiave[0]]:
+                del self._cache[vecchia]
+            self._cache[chiave] = dijkstra_csr(self.grafo, sorgente)
+        return self._cache[chiave]
+
+    def matrice_distanze(self, punti):
+        """Matrice D[i, j] = costo minimo da punti[i] a punti[j] (inf se irraggiungibile)."""
+        colonne = [self.grafo.posizione[p] for p in punti]
+        return np.array([self._albero(p)[0][colonne] for p in punti], dtype=float)
+
+    def pianifica(self, lotti, autonomia=None):
+        """
+        Giro ottimizzato che parte e rientra alla stazione passando per tutti i 'lotti'.
+        autonomia: distanza massima (m) percorribile con una carica; se il giro la supera
+        viene spezzato in più sortite con rientro alla stazione.
+        Restituisce un dizionario con ordine di visita, sortite, percorso completo,
+        costo totale e lotti irraggiungibili (anche quelli assenti dalla mappa).
+        """
+        richiesti = [l for l in dict.fromkeys(lotti) if l != self.base]
+        lotti = [l for l in richiesti if l in self.grafo.posizione]
+        punti = [self.base] + lotti
+        D = self.matrice_distanze(punti)
+
+        # Lotti da escludere: non raggiungibili o (con batteria) fuori autonomia andata+ritorno
+        andata_ritorno = D[0, 1:] + D[1:, 0]
+        escludi = ~np.isfinite(andata_ritorno)
+        if autonomia is not None:
+            escludi |= andata_ritorno > autonomia
+        visitabili = [i + 1 for i in np.flatnonzero(~escludi)]
+        esclusi = {lotti[i] for i in np.flatnonzero(escludi)}
+        irraggiungibili = [l for l in richiesti if l in esclusi or l not in self.grafo.posizione]
+
+        ordine = _due_opt(D, _nearest_neighbour(D, visitabili))
+        sortite = _dividi_in_sortite(D, ordine, autonomia)
+
+        percorso, costo = [self.base], 0.0
+        for sortita in sortite:
+            for a, b in zip(sortita, sortita[1:]):
+                tratto = percorso_da_padri(self.grafo, self._albero(punti[a])[1], punti[a], punti[b])
+                percorso.extend(tratto[1:])
+                costo += D[a, b]
+
+        return {
+            'ordine': [punti[i] for i in ordine],
+            'sortite': [[punti[i] for i in sortita] for sortita in sortite],
+            'percorso': percorso,
+            'costo': costo,
+            'irraggiungibili': irraggiungibili,
+        }
+
+
+# --- EURISTICHE DI ORDINAMENTO (indici riferiti alla matrice D, 0 = stazione) ---
+
+def _costo_giro(D, ordine):
+    """Costo del giro chiuso 0 -> ordine... -> 0 (matrice anche asimmetrica)."""
+    tappe = [0] + list(ordine) + [0]
+    return float(sum(D[a, b] for a, b in zip(tappe, tappe[1:])))
+
+
+def _nearest_neighbour(D, visitabili):
+    """Ordine iniziale: dalla stazione, sempre verso il lotto non visitato più vicino."""
+    ordine, corrente = [], 0
+    rimasti = list(visitabili)
+    while rimasti:
+        prossimo = min(rimasti, key=lambda j: D[corrente, j])
+        ordine.append(prossimo)
+        rimasti.remove(prossimo)
+        corrente = prossimo
+    return ordine
+
+
+def _due_opt(D, ordine):
+    """
+    Miglioramento 2-opt: inverte segmenti del giro finché il costo scende.
+    Il costo è ricalcolato sull'intero giro perché la mappa è orientata (D asimmetrica).
+    """
+    migliore, costo_migliore = list(ordine), _costo_giro(D, ordine)
+    migliorato = True
+    while migliorato:
+        migliorato = False
+        for i in range(len(migliore) - 1):
+            for j in range(i + 1, len(migliore)):
+                candidato = migliore[:i] + migliore[i:j + 1][::-1] + migliore[j + 1:]
+                costo = _costo_giro(D, candidato)
+                if costo < costo_migliore - 1e-9:
+                    migliore, costo_migliore, migliorato = candidato, costo, True
+    return migliore
+
+
+def _dividi_in_sortite(D, ordine, autonomia):
+    """
+    Spezza il giro in sortite 0 -> ... -> 0 rispettando l'autonomia: si aggiunge il
+    lotto successivo solo se poi resta batteria per rientrare alla stazione.
+    """
+    if not ordine:
+        return []
+    if autonomia is None:
+        return [[0] + list(ordine) + [0]]
+
+    sortite, corrente, percorso = [], [0], 0.0
+    for lotto in ordine:
+        ultimo = corrente[-1]
+        if len(corrente) > 1 and percorso + D[ultimo, lotto] + D[lotto, 0] > autonomia:
+            sortite.append(corrente + [0])
+            corrente, percorso, ultimo = [0], 0.0, 0
+        corrente.append(lotto)
+        percorso += D[ultimo, lotto]
+    sortite.append(corrente + [0])
+    return sortite
+
+
+if __name__ == "__main__":
+    # Mappa di esempio con rientri orientati e costi diversi da quelli di andata
+    mappa = {nodo: list(archi) for nodo, archi in mappa_agricola.items()}
+    mappa['Lotto_Critico'] = [('Lotto_C', 5), ('Lotto_D', 15)]
+    mappa['Lotto_C'] = mappa['Lotto_C'] + [('Lotto_A', 12)]
+    mappa['Lotto_D'] = mappa['Lotto_D'] + [('Lotto_A', 25)]
+    mappa['Lotto_A'] = mappa['Lotto_A'] + [('Stazione_Ricarica', 10)]
+
+    pianificatore = PianificatoreGiri(mappa)
+    for autonomia in [None, 60]:
+        giro = pianificatore.pianifica(['Lotto_Critico', 'Lotto_D', 'Lotto_C', 'Magazzino'], autonomia)
+        print(f"--- GIRO DI ISPEZIONE (autonomia: {autonomia or 'illimitata'}) ---")
+        for sortita in giro['sortite']:
+            print(f"  Sortita: {' -> '.join(sortita)}")
+        print(f"  Percorso: {' -> '.join(giro['percorso'])}")
+        print(f"  Costo totale: {giro['costo']:.0f}m | Irraggiungibili: {giro['irraggiungibili']}")
+
+    giro = PianificatoreGiri().pianifica(['Lotto_Critico', 'Lotto_D', 'Lotto_Inesistente'])
+    print(f"--- MAPPA PREDEFINITA (andata e ritorno) ---\n  Percorso: {' -> '.join(giro['percorso'])}")
+    print(f"  Costo totale: {giro['costo']:.0f}m | Irraggiungibili: {giro['irraggiungibili']}")
@@ -4,6 +4,7 @@
 
 % --- DICHIARAZIONE FATTI DINAMICI ---
 :- dynamic dati_lotto/7.
+:- dynamic no_fly_zone/1.        % Zone aperte/chiuse durante le missioni (imposta_no_fly_zone)
 
 % --- 1. ONTOLOGIA DELLE COLTURE ---
 % Gerarchia: categoria(NomeColtura, Famiglia).
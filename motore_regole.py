@@ -0,0 +1,316 @@
+import re
+import sys
+import numpy as np
+
+# --- CONFIGURAZIONE ---
+KB_PATH = 'kb_agricola.pl'
+
+# Posizione degli argomenti di dati_lotto(ID, N, P, K, PH, Rain, Temp)
+# (stesso ordine delle colonne di input del sistema ibrido)
+ARGOMENTI_LOTTO = ['N', 'P', 'K', 'pH', 'rainfall', 'temperature']
+
+OPERATORI = {
+    '<': np.less,
+    '>': np.greater,
+    '=<': np.less_equal,
+    '>=': np.greater_equal,
+}
+
+# --- PATTERN DELLE CLAUSOLE SUPPORTATE ---
+RE_CATEGORIA = re.compile(r"^categoria\((\w+),\s*(\w+)\)\.$")
+RE_SOGLIA = re.compile(r"^(\w+)\(ID\)\s*:-\s*dati_lotto\(ID,([^)]*)\),\s*(\w+)\s*(=<|>=|<|>)\s*(-?[\d.]+)\.$")
+RE_INCOMP_COLTURA = re.compile(r"^incompatibile\(ID,\s*([a-z]\w*)\)\s*:-\s*(\w+)\(ID\)\.$")
+RE_INCOMP_FAMIGLIA = re.compile(
+    r"^incompatibile\(ID,\s*([A-Z]\w*)\)\s*:-\s*categoria\(\1,\s*(\w+)\),\s*(\w+)\(ID\)\.$")
+
+
+def _clausole(kb_path):
+    """Legge il file .pl e restituisce le clausole (una per riga logica, senza commenti)."""
+    with open(kb_path, encoding='utf-8') as f:
+        testo = re.sub(r'%.*', '', f.read())
+
+    clausole, corrente = [], ''
+    for riga in testo.splitlines():
+        corrente += ' ' + riga.strip()
+        if corrente.rstrip().endswith('.'):
+            clausole.append(' '.join(corrente.split()))
+            corrente = ''
+    return clausole
+
+
+class MotoreRegole:
+    """
+    Motore nativo (NumPy) equivalente ai vincoli di kb_agricola.pl.
+    Compila l'ontologia categoria/2, le regole a soglia su dati_lotto/7 e le
+    clausole incompatibile/2 in maschere booleane:
+        condizioni (lotti x regole)  @  regole_colture (regole x colture)
+    così la validità di un intero batch lotti x colture si ottiene in un passo
+    vettoriale, senza round-trip pyswip e senza stato globale (thread-safe).
+    """
+
+    def __init__(self, kb_path=KB_PATH):
+        self.ontologia = []      # [(coltura, famiglia)] nell'ordine dei fatti Prolog
+        self.soglie = {}         # nome_regola -> (indice_colonna, operatore, valore)
+        self.per_coltura = []    # [(coltura, nome_regola)]
+        self.per_famiglia = []   # [(famiglia, nome_regola)]
+
+        for clausola in _clausole(kb_path):
+            self._compila_clausola(clausola)
+
+        for _, regola in self.per_coltura + self.per_famiglia:
+            if regola not in self.soglie:
+                raise ValueError(f"Regola '{regola}' usata da incompatibile/2 ma non definita come soglia.")
+
+        self.nomi_regole = list(self.soglie)
+        self._indici_famiglie = {}   # tuple(classi) -> indice per il recovery probabilistico
+
+    def _compila_clausola(self, clausola):
+        m = RE_CATEGORIA.match(clausola)
+        if m:
+            self.ontologia.append((m.group(1), m.group(2)))
+            return
+
+        m = RE_SOGLIA.match(clausola)
+        if m:
+            nome, argomenti, variabile, operatore, valore = m.groups()
+            argomenti = [a.strip() for a in argomenti.split(',')]
+            if variabile not in argomenti:
+                raise ValueError(f"Clausola non supportata: {clausola}")
+            self.soglie[nome] = (argomenti.index(variabile), operatore, float(valore))
+            return
+
+        m = RE_INCOMP_COLTURA.match(clausola)
+        if m:
+            self.per_coltura.append((m.group(1), m.group(2)))
+            return
+
+        m = RE_INCOMP_FAMIGLIA.match(clausola)
+        if m:
+            self.per_famiglia.append((m.group(2), m.group(3)))
+            return
+
+        if clausola.startswith('incompatibile('):
+            # Una regola di vincolo che non sappiamo compilare renderebbe il motore non equivalente
+            raise ValueError(f"Clausola incompatibile/2 non supportata dal motore nativo: {clausola}")
+
+    # --- MASCHERE ---
+
+    def condizioni(self, X):
+        """Maschera (n_lotti x n_regole): quali regole a soglia sono vere per ogni lotto."""
+        X = np.asarray(X, dtype=float).reshape(-1, len(ARGOMENTI_LOTTO))
+        maschera = np.empty((X.shape[0], len(self.nomi_regole)), dtype=bool)
+        for j, nome in enumerate(self.nomi_regole):
+            colonna, operatore, valore = self.soglie[nome]
+            maschera[:, j] = OPERATORI[operatore](X[:, colonna], valore)
+        return maschera
+
+    def matrice_regole(self, colture):
+        """Maschera (n_regole x n_colture): quali regole rendono incompatibile ogni coltura."""
+        indice_regola = {nome: i for i, nome in enumerate(self.nomi_regole)}
+        matrice = np.zeros((len(self.nomi_regole), len(colture)), dtype=bool)
+        for j, coltura in enumerate(colture):
+            for target, regola in self.per_coltura:
+                if target == coltura:
+                    matrice[indice_regola[regola], j] = True
+            for famiglia, regola in self.per_famiglia:
+                if (coltura, famiglia) in self.ontologia:
+                    matrice[indice_regola[regola], j] = True
+        return matrice
+
+    def incompatibilita(self, X, colture):
+        """Maschera (n_lotti x n_colture) equivalente a incompatibile(ID, Coltura)."""
+        cond = self.condizioni(X).astype(np.uint8)
+        return (cond @ self.matrice_regole(colture).astype(np.uint8)) > 0
+
+    # --- INTERFACCE DI RAGIONAMENTO (equivalenti a quelle Prolog) ---
+
+    def valida(self, X, colture_predette):
+        """valida_raccomandazione/2 per riga: array bool (n_lotti,)."""
+        colture_predette = np.asarray(colture_predette)
+        distinte, inverso = np.unique(colture_predette, return_inverse=True)
+        incomp = self.incompatibilita(X, distinte)
+        return ~incomp[np.arange(len(colture_predette)), inverso.ravel()]
+
+    def alternative_ordinate(self, coltura):
+        """Candidati di suggerisci_alternativa/3 nell'ordine di backtracking di Prolog."""
+        candidati = []
+        for pianta, famiglia in self.ontologia:
+            if pianta != coltura:
+                continue
+            for alternativa, altra_famiglia in self.ontologia:
+                if altra_famiglia == famiglia and alternativa != coltura and alternativa not in candidati:
+                    candidati.append(alternativa)
+        return candidati
+
+    def suggerisci_alternativa(self, X, colture_predette):
+        """
+        Prima soluzione di suggerisci_alternativa/3 per ogni lotto (None se non esiste
+        o se la coltura è già valida). Restituisce un array object (n_lotti,).
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, len(ARGOMENTI_LOTTO))
+        colture_predette = np.asarray(colture_predette)
+        risultato = np.full(len(colture_predette), None, dtype=object)
+
+        colture_onto = list(dict.fromkeys(pianta for pianta, _ in self.ontologia))
+        posizione = {c: i for i, c in enumerate(colture_onto)}
+        incomp_onto = self.incompatibilita(X, colture_onto)
+        validi = self.valida(X, colture_predette)
+
+        for coltura in np.unique(colture_predette[~validi]):
+            candidati = self.alternative_ordinate(coltura)
+            if not candidati:
+                continue
+            righe = np.flatnonzero((colture_predette == coltura) & ~validi)
+            ok = ~incomp_onto[np.ix_(righe, [posizione[c] for c in candidati])]
+            trovata = ok.any(axis=1)
+            scelta = np.asarray(candidati, dtype=object)[ok.argmax(axis=1)]
+            risultato[righe[trovata]] = scelta[trovata]
+        return risultato
+
+    # --- RECOVERY PROBABILISTICO ---
+
+    def indice_famiglie(self, classi):
+        """
+        Indice famiglia -> classi, costruito una volta per vettore di classi del
+        classificatore ('classi' = nomi nell'ordine delle colonne di predict_proba).
+        Universo dei candidati: colture dell'ontologia (ordine Prolog), poi le classi
+        senza famiglia. Restituisce (universo, posizione delle classi nell'universo,
+        maschera universo x universo 'stessa famiglia, diversa coltura', regole x universo).
+        """
+        chiave = tuple(classi)
+        if chiave not in self._indici_famiglie:
+            universo = list(dict.fromkeys([pianta for pianta, _ in self.ontologia] + list(classi)))
+            posizione = {c: i for i, c in enumerate(universo)}
+            famiglie = list(dict.fromkeys(famiglia for _, famiglia in self.ontologia))
+            appartenenza = np.zeros((len(universo), len(famiglie)), dtype=np.uint8)
+            for pianta, famiglia in self.ontologia:
+                appartenenza[posizione[pianta], famiglie.index(famiglia)] = 1
+            stessa_famiglia = (appartenenza @ appartenenza.T) > 0
+            np.fill_diagonal(stessa_famiglia, False)
+            self._indici_famiglie[chiave] = (
+                np.asarray(universo, dtype=object),
+                np.array([posizione[c] for c in classi], dtype=np.intp),
+                stessa_famiglia,
+                self.matrice_regole(universo).astype(np.uint8),
+            )
+        return self._indici_famiglie[chiave]
+
+    def alternative_classificate(self, X, proba, classi, k=3):
+        """
+        Recovery ordinato per probabilità: per ogni lotto in conflitto, le k alternative
+        ammesse da suggerisci_alternativa/3 (stessa famiglia, compatibili col lotto)
+        ordinate per la probabilità del classificatore già calcolata per quel lotto.
+        La coltura predetta è l'argmax di 'proba' (n_lotti x n_classi). Le colture
+        dell'ontologia ignote al modello hanno probabilità 0; a parità vale l'ordine Prolog.
+        Restituisce (nomi, punteggi), array (n_lotti x k): None/NaN dove mancano candidati
+        (tutta la riga per i lotti validi).
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, len(ARGOMENTI_LOTTO))
+        proba = np.asarray(proba, dtype=float).reshape(len(X), len(classi))
+        universo, colonne, stessa_famiglia, regole = self.indice_famiglie(classi)
+        k = min(k, len(universo))
+
+        punteggi = np.zeros((len(X), len(universo)))
+        punteggi[:, colonne] = proba
+        predette = colonne[proba.argmax(axis=1)]
+        incomp = (self.condizioni(X).astype(np.uint8) @ regole) > 0
+        conflitto = incomp[np.arange(len(X)), predette]
+
+        ammesse = stessa_famiglia[predette] & ~incomp & conflitto[:, None]
+        punteggi = np.where(ammesse, punteggi, -np.inf)
+        ordine = np.argsort(-punteggi, axis=1, kind='stable')[:, :k]
+        scelti = np.take_along_axis(punteggi, ordine, axis=1)
+        presenti = np.isfinite(scelti)
+        return np.where(presenti, universo[ordine], None), np.where(presenti, scelti, np.nan)
+
+
+# --- VERIFICA DI EQUIVALENZA CON PYSWIP ---
+
+def verifica_equivalenza(prolog, X, colture):
+    """
+    Confronta il motore nativo con il percorso pyswip (dati_lotto + valida_raccomandazione
+    + suggerisci_alternativa) su ogni lotto di X e ogni coltura in 'colture'.
+    Controlla anche che il recovery probabilistico proponga esattamente l'insieme
+    delle soluzioni Prolog, in ordine di probabilità (casuale, con 'coltura' in testa).
+    Restituisce la lista delle discrepanze (vuota = motore equivalente).
+    """
+    motore = MotoreRegole()
+    X = np.asarray(X, dtype=float).reshape(-1, len(ARGOMENTI_LOTTO))
+    discrepanze = []
+    lotto_id = "lotto_verifica"
+    rng = np.random.default_rng(0)
+
+    for j, coltura in enumerate(colture):
+        colonna = np.full(len(X), coltura, dtype=object)
+        validi = motore.valida(X, colonna)
+        alternative = motore.suggerisci_alternativa(X, colonna)
+        proba = rng.random((len(X), len(colture)))
+        proba[:, j] = 1.0
+        classificate, punteggi = motore.alternative_classificate(X, proba, colture, k=len(colture))
+
+        for i, valori in enumerate(X):
+            n, p, k, ph, rain, temp = (repr(float(v)) for v in valori)
+            list(prolog.query(f"retractall(dati_lotto({lotto_id},_,_,_,_,_,_))"))
+            list(prolog.query(f"assertz(dati_lotto({lotto_id}, {n}, {p}, {k}, {ph}, {rain}, {temp}))"))
+
+            valida_pl = bool(list(prolog.query(f"valida_raccomandazione({lotto_id}, {coltura})")))
+            soluzioni = list(prolog.query(f"suggerisci_alternativa({lotto_id}, {coltura}, Alternativa)"))
+            alternativa_pl = str(soluzioni[0]['Alternativa']) if soluzioni else None
+
+            if valida_pl != validi[i] or alternativa_pl != alternative[i]:
+                discrepanze.append((tuple(valori), coltura, (valida_pl, alternativa_pl),
+                                    (bool(validi[i]), alternative[i])))
+
+            insieme_pl = {str(s['Alternativa']) for s in soluzioni}
+            trovate = punteggi[i][~np.isnan(punteggi[i])]
+            if (insieme_pl != set(classificate[i][:len(trovate)])
+                    or np.any(np.diff(trovate) > 0)):
+                discrepanze.append((tuple(valori), coltura, sorted(insieme_pl),
+                                    list(classificate[i][:len(trovate)])))
+
+    list(prolog.query(f"retractall(dati_lotto({lotto_id},_,_,_,_,_,_))"))
+    return discrepanze
+
+
+def lotti_di_confine(motore, n_casuali=200, seed=42):
+    """
+    Lotti di prova per la verifica: valori esattamente sulle soglie della KB,
+    appena sopra/sotto, più campioni casuali negli intervalli del dataset.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.array([90, 40, 40, 6.5, 500, 25], dtype=float)
+    lotti = [base]
+    for colonna, _, valore in motore.soglie.values():
+        for delta in (-0.01, 0.0, 0.01):
+            lotto = base.copy()
+            lotto[colonna] = valore + delta
+            lotti.append(lotto)
+
+    casuali = np.column_stack([
+        rng.integers(0, 140, n_casuali), rng.integers(5, 145, n_casuali),
+        rng.integers(5, 205, n_casuali), rng.uniform(3.5, 9.9, n_casuali).round(2),
+        rng.uniform(20, 3000, n_casuali).round(2), rng.uniform(8, 43, n_casuali).round(2),
+    ])
+    return np.vstack([np.array(lotti), casuali])
+
+
+if __name__ == "__main__":
+    from pyswip import Prolog
+
+    prolog = Prolog()
+    prolog.consult(KB_PATH)
+    motore = MotoreRegole()
+
+    X = lotti_di_confine(motore)
+    colture = list(dict.fromkeys([c for c, _ in motore.ontologia] + ['barley', 'wheat']))
+
+    print(f"--- VERIFICA EQUIVALENZA MOTORE NATIVO vs PYSWIP ({len(X)} lotti x {len(colture)} colture) ---")
+    discrepanze = verifica_equivalenza(prolog, X, colture)
+
+    if discrepanze:
+        for valori, coltura, atteso, ottenuto in discrepanze[:20]:
+            print(f" [!] {coltura} @ {valori}: Prolog={atteso} Nativo={ottenuto}")
+        print(f"[ERRORE] {len(discrepanze)} discrepanze trovate.")
+        sys.exit(1)
+
+    print("[OK] Motore nativo equivalente al percorso Prolog.")
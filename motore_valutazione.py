@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+import joblib
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+
+# --- CONFIGURAZIONE ---
+CACHE_DIR = 'cache_valutazione'
+
+
+def hash_array(*arrays):
+    """Impronta del contenuto di uno o più array (dati + forma + tipo)."""
+    h = hashlib.sha256()
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(str((a.shape, a.dtype.str)).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()[:16]
+
+
+def _chiave_fold(hash_dati, stimatore, seed, n_splits, fold):
+    """Chiave di cache di un singolo (modello, fold): dati + classe/parametri del modello + split."""
+    descrizione = {
+        'dati': hash_dati,
+        'modello': type(stimatore).__name__,
+        'parametri': json.dumps(stimatore.get_params(), sort_keys=True, default=repr),
+        'seed': seed,
+        'n_splits': n_splits,
+        'fold': fold,
+    }
+    return hashlib.sha256(json.dumps(descrizione, sort_keys=True).encode()).hexdigest()[:24]
+
+
+def _valuta_fold(stimatore, X, y, indici_train, indici_test):
+    """Job eseguito nei worker: addestra su un fold e restituisce l'accuratezza sul fold di test."""
+    modello = clone(stimatore)
+    modello.fit(X[indici_train], y[indici_train])
+    return float(modello.score(X[indici_test], y[indici_test]))
+
+
+def _condividi(matrice, cartella):
+    """
+    Salva la matrice su disco e la riapre in memory-map: i worker ricevono solo il
+    riferimento al file e leggono tutti la stessa copia (page cache), senza duplicarla.
+    """
+    path = os.path.join(cartella, f"{hash_array(matrice)}.mmap")
+    if not os.path.exists(path):
+        joblib.dump(np.ascontiguousarray(matrice), path)
+    return joblib.load(path, mmap_mode='r')
+
+
+def valuta_modelli(modelli, matrici, y, n_splits=10, seed=42, n_jobs=-1, cache_dir=CACHE_DIR):
+    """
+    Cross-validation stratificata di più modelli, in parallelo su tutti i core.
+    - modelli: lista di (nome, stimatore, nome_matrice);
+    - matrici: dizionario nome_matrice -> array delle feature (es. originale e scalata);
+    - ogni job è una coppia (modello, fold), eseguita con joblib su tutti i core;
+    - i punteggi per fold sono salvati in 'cache_dir' (chiave: hash dei dati, parametri
+      del modello, seed e fold), quindi aggiungere un modello calcola solo quello nuovo.
+    Restituisce un dizionario nome -> array delle accuratezze per fold.
+    """
+    y = np.asarray(y)
+    os.makedirs(cache_dir, exist_ok=True)
+    kfold = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+    split = list(kfold.split(np.zeros(len(y)), y))
+
+    hash_matrici = {nome: hash_array(m, y) for nome, m in matrici.items()}
+    punteggi = {nome: [None] * n_splits for nome, _, _ in modelli}
+    da_calcolare = []
+
+    for nome, stimatore, nome_matrice in modelli:
+        for fold in range(n_splits):
+            chiave = _chiave_fold(hash_matrici[nome_matrice], stimatore, seed, n_splits, fold)
+            path = os.path.join(cache_dir, f"{chiave}.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    punteggi[nome][fold] = json.load(f)['accuratezza']
+            else:
+                da_calcolare.append((nome, stimatore, nome_matrice, fold, path))
+
+    if da_calcolare:
+        with tempfile.TemporaryDirectory(prefix='agrosmart_cv_') as cartella:
+            condivise = {nome: _condividi(np.asarray(m), cartella)
+                         for nome, m in matrici.items()
+                         if any(nm == nome for _, _, nm, _, _ in da_calcolare)}
+            y_condivisa = _condividi(y, cartella)
+
+            risultati = Parallel(n_jobs=n_jobs)(
+                delayed(_valuta_fold)(stimatore, condivise[nome_matrice], y_condivisa, *split[fold])
+                for _, stimatore, nome_matrice, fold, _ in da_calcolare
+            )
+
+        for (nome, _, _, fold, path), accuratezza in zip(da_calcolare, risultati):
+            punteggi[nome][fold] = accuratezza
+            with open(path, 'w') as f:
+                json.dump({'modello': nome, 'fold': fold, 'accuratezza': accuratezza}, f)
+
+    return {nome: np.array(valori) for nome, valori in punteggi.items()}
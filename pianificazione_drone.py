@@ -1,9 +1,13 @@
 import heapq
-from pyswip import Prolog
+import numpy as np
 
-# Inizializzazione Prolog
-prolog = Prolog()
-prolog.consult("kb_agricola.pl")
+KB_PATH = "kb_agricola.pl"
+_prolog = None  # Motore Prolog del planner, avviato al primo uso (vedi motore_prolog)
+
+# Versione dei vincoli spaziali: va incrementata (aggiorna_vincoli_kb) ogni volta
+# che i fatti no_fly_zone/1 cambiano, così le maschere in cache vengono ricalcolate.
+_versione_vincoli = 0
+_cache_no_fly = {}
 
 # --- 1. DEFINIZIONE DELLA MAPPA (Grafo) ---
 # Rappresentiamo l'azienda agricola come un grafo.
@@ -31,16 +35,71 @@ euristica = {
     'Lotto_Critico': 0
 }
 
-def a_star_search(grafo, start, goal, h):
+# --- 3. VINCOLI SPAZIALI RISOLTI UNA VOLTA PER VERSIONE DELLA KB ---
+
+def motore_prolog():
+    """
+    Motore SWI-Prolog con la KB consultata, creato alla prima query sui vincoli:
+    importare il modulo (es. per il solo grafo o per A* su CSR) non avvia Prolog.
+    """
+    global _prolog
+    if _prolog is None:
+        from pyswip import Prolog
+        _prolog = Prolog()
+        _prolog.consult(KB_PATH)
+    return _prolog
+
+def aggiorna_vincoli_kb():
+    """Segnala che le no-fly zone nella KB sono cambiate (invalida le cache)."""
+    global _versione_vincoli
+    _versione_vincoli += 1
+    _cache_no_fly.clear()
+
+def versione_vincoli():
+    """
+    Versione corrente dei vincoli: cambia solo con aggiorna_vincoli_kb / imposta_no_fly_zone.
+    kb_agricola.pl è consultata una volta per processo (motore_prolog, AgroSmartAI,
+    worker del pool, MotoreRegole): le modifiche al file richiedono un riavvio.
+    """
+    return _versione_vincoli
+
+def imposta_no_fly_zone(nodo, interdetta=True):
+    """
+    Apre o chiude una no-fly zone a runtime (irrorazione, persone in campo):
+    assert/retract del fatto no_fly_zone/1 nella KB e nuova versione dei vincoli,
+    così maschere e pianificatori incrementali vedono il cambiamento.
+    """
+    prolog = motore_prolog()
+    list(prolog.query(f"retractall(no_fly_zone('{nodo}'))"))
+    if interdetta:
+        list(prolog.query(f"assertz(no_fly_zone('{nodo}'))"))
+    aggiorna_vincoli_kb()
+
+def zone_interdette():
+    """
+    Insieme dei nodi in no_fly_zone/1, con UNA sola query Prolog per versione della KB
+    (invece di una query attraversabile/1 per ogni vicino espanso).
+    """
+    versione = versione_vincoli()
+    if versione not in _cache_no_fly:
+        _cache_no_fly.clear()
+        _cache_no_fly[versione] = frozenset(str(r['Z']) for r in motore_prolog().query("no_fly_zone(Z)"))
+    return _cache_no_fly[versione]
+
+def a_star_search(grafo, start, goal, h, verbose=True, interdette=None):
     """
     Algoritmo A* (A-Star) per la ricerca del percorso ottimo.
     F(n) = G(n) + H(n)
+    Con verbose=False non stampa i messaggi di pruning (uso in batch).
+    interdette: insieme dei nodi vietati; default le no-fly zone della KB.
     """
     # La frontiera è una coda di priorità ordinata per F
     frontiera = []
     heapq.heappush(frontiera, (0 + h[start], 0, start, [start]))
     
     visitati = set()
+    if interdette is None:
+        interdette = zone_interdette()
 
     while frontiera:
         # Prendo il nodo con F minore
@@ -54,12 +113,10 @@ def a_star_search(grafo, start, goal, h):
             
             # Espando i vicini
             for vicino, costo_arco in grafo.get(corrente, []):
-                # Chiediamo al Prolog se il drone può passare sul vicino
-                query = f"attraversabile('{vicino}')"
-                is_valid = list(prolog.query(query))
-                
-                if not is_valid:
-                    print(f" [!] PRUNING: Nodo '{vicino}' scartato (Vincolo KB)")
+                # Il drone può passare sul vicino? (no-fly zone risolte dalla KB)
+                if vicino in interdette:
+                    if verbose:
+                        print(f" [!] PRUNING: Nodo '{vicino}' scartato (Vincolo KB)")
                     continue # Salta questo nodo e non lo aggiunge alla frontiera
                 
                 nuovo_g = g + costo_arco
@@ -68,6 +125,205 @@ def a_star_search(grafo, start, goal, h):
 
     return None, float('inf')
 
+# --- 4. GRAFI GRANDI: RAPPRESENTAZIONE CSR E A* CON PUNTATORI AL PADRE ---
+
+class GrafoCSR:
+    """
+    Grafo orientato in formato CSR (Compressed Sparse Row) per mappe con decine di
+    migliaia di waypoint. I vicini del nodo i sono indici[indptr[i]:indptr[i+1]]
+    con costi pesi[indptr[i]:indptr[i+1]]; i nomi restano disponibili per il contratto
+    (percorso come lista di nomi).
+    """
+
+    def __init__(self, nomi, sorgenti, destinazioni, pesi):
+        self.nomi = list(nomi)
+        self.posizione = {nome: i for i, nome in enumerate(self.nomi)}
+        n = len(self.nomi)
+
+        sorgenti = np.asarray(sorgenti, dtype=np.int32)
+        ordine = np.argsort(sorgenti, kind='stable')
+        self.indici = np.asarray(destinazioni, dtype=np.int32)[ordine]
+        self.pesi = np.asarray(pesi)[ordine]  # interi restano interi (costi in metri)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sorgenti, minlength=n), out=self.indptr[1:])
+
+        self.versione_pesi = 0       # incrementata da aggiorna_pesi (cache dei percorsi)
+        self._maschera = None
+        self._versione_maschera = None
+        self._liste = None           # indptr/indici/pesi come liste Python (vedi liste())
+        self._maschera_lista = None
+
+    def __len__(self):
+        return len(self.nomi)
+
+    def __getstate__(self):
+        # Le liste sono solo una cache locale: non vanno copiate verso i worker
+        return dict(self.__dict__, _liste=None, _maschera_lista=None)
+
+    def liste(self):
+        """
+        indptr, indici e pesi come liste Python (accesso per elemento veloce nei cicli
+        di ricerca), convertite una volta sola invece che a ogni ricerca.
+        """
+        if self._liste is None:
+            self._liste = (self.indptr.tolist(), self.indici.tolist(), self.pesi.tolist())
+        return self._liste
+
+    def aggiorna_pesi(self, archi, costi):
+        """Cambia i costi degli archi (indici nell'array pesi) e invalida le liste in cache."""
+        self.pesi[archi] = costi
+        self._liste = None
+        self.versione_pesi += 1
+
+    def attraversabili_lista(self, attraversabili=None):
+        """Maschera come lista: quella della KB (default) è convertita una volta per versione."""
+        if attraversabili is None:
+            attraversabili = self.maschera_attraversabili()
+        if attraversabili is not self._maschera:
+            return attraversabili.tolist()
+        if self._maschera_lista is None:
+            self._maschera_lista = self._maschera.tolist()
+        return self._maschera_lista
+
+    def maschera_attraversabili(self):
+        """Maschera booleana dei nodi attraversabili, ricalcolata solo se cambia la KB."""
+        versione = versione_vincoli()
+        if self._versione_maschera != versione:
+            interdette = zone_interdette()
+            self._maschera = np.fromiter((nome not in interdette for nome in self.nomi),
+                                         dtype=bool, count=len(self.nomi))
+            self._versione_maschera = versione
+            self._maschera_lista = None
+        return self._maschera
+
+def grafo_csr_da_dizionario(grafo):
+    """Converte una mappa dict-of-lists (come mappa_agricola) in GrafoCSR."""
+    nomi = list(dict.fromkeys(list(grafo) + [v for archi in grafo.values() for v, _ in archi]))
+    posizione = {nome: i for i, nome in enumerate(nomi)}
+    sorgenti, destinazioni, pesi = [], [], []
+    for nodo, archi in grafo.items():
+        for vicino, costo in archi:
+            sorgenti.append(posizione[nodo])
+            destinazioni.append(posizione[vicino])
+            pesi.append(costo)
+    return GrafoCSR(nomi, sorgenti, destinazioni, pesi)
+
+def grafo_bidirezionale(grafo):
+    """
+    Grafo di volo con ogni collegamento percorribile nei due sensi, con lo stesso costo:
+    mappa_agricola è solo "di andata", ma un drone deve poter rientrare alla stazione.
+    """
+    if isinstance(grafo, dict):
+        grafo = grafo_csr_da_dizionario(grafo)
+    sorgenti = np.repeat(np.arange(len(grafo)), np.diff(grafo.indptr))
+    return GrafoCSR(grafo.nomi, np.concatenate([sorgenti, grafo.indici]),
+                    np.concatenate([grafo.indici, sorgenti]), np.concatenate([grafo.pesi, grafo.pesi]))
+
+def _euristica_array(grafo_csr, h):
+    """Euristica come array per indice: accetta dict (nome -> stima), array o funzione(indice)."""
+    if h is None:
+        return np.zeros(len(grafo_csr))
+    if isinstance(h, dict):
+        return np.fromiter((h.get(nome, 0) for nome in grafo_csr.nomi), dtype=np.float64,
+                           count=len(grafo_csr))
+    if callable(h):
+        return np.fromiter((h(i) for i in range(len(grafo_csr))), dtype=np.float64, count=len(grafo_csr))
+    return np.asarray(h, dtype=np.float64)
+
+def a_star_csr(grafo, start, goal, h=None, attraversabili=None):
+    """
+    A* su GrafoCSR (accetta anche una mappa dict-of-lists, convertita al volo).
+    - no-fly zone risolte in una maschera booleana (una volta per versione della KB);
+    - la frontiera contiene solo (f, g, indice): il percorso si ricostruisce alla fine
+      dai puntatori al padre, quindi la memoria è O(nodi) e non O(lunghezza^2);
+    - archi e maschera KB in forma di lista restano in cache sul GrafoCSR (liste()).
+    Stesso contratto di a_star_search: (lista di nomi, costo) oppure (None, inf).
+    """
+    if isinstance(grafo, dict):
+        grafo = grafo_csr_da_dizionario(grafo)
+    if start not in grafo.posizione or goal not in grafo.posizione:
+        return None, float('inf')
+
+    s, t = grafo.posizione[start], grafo.posizione[goal]
+    stima = [0.0] * len(grafo) if h is None else _euristica_array(grafo, h).tolist()
+    indptr, indici, pesi = grafo.liste()
+    ok = grafo.attraversabili_lista(attraversabili)
+
+    n = len(grafo)
+    costo_g = [float('inf')] * n
+    padre = [-1] * n
+    chiusi = bytearray(n)
+
+    costo_g[s] = 0
+    frontiera = [(stima[s], 0, s)]
+
+    while frontiera:
+        f, g, corrente = heapq.heappop(frontiera)
+        if chiusi[corrente]:
+            continue
+        if corrente == t:
+            percorso = [corrente]
+            while percorso[-1] != s:
+                percorso.append(padre[percorso[-1]])
+            return [grafo.nomi[i] for i in reversed(percorso)], g
+        chiusi[corrente] = 1
+
+        for e in range(indptr[corrente], indptr[corrente + 1]):
+            vicino = indici[e]
+            if chiusi[vicino] or not ok[vicino]:
+                continue
+            nuovo_g = g + pesi[e]
+            if nuovo_g < costo_g[vicino]:
+                costo_g[vicino] = nuovo_g
+                padre[vicino] = corrente
+                heapq.heappush(frontiera, (nuovo_g + stima[vicino], nuovo_g, vicino))
+
+    return None, float('inf')
+
+def dijkstra_csr(grafo, sorgente, attraversabili=None):
+    """
+    Dijkstra a sorgente singola su GrafoCSR: distanze verso TUTTI i nodi e puntatori
+    al padre (-1 = irraggiungibile). Stessi vincoli di a_star_csr (no-fly zone escluse,
+    tranne la sorgente stessa). Base per le matrici delle distanze dei giri di ispezione.
+    """
+    s = grafo.posizione[sorgente]
+    indptr, indici, pesi = grafo.liste()
+    ok = grafo.attraversabili_lista(attraversabili)
+
+    n = len(grafo)
+    dist = [float('inf')] * n
+    padre = [-1] * n
+    chiusi = bytearray(n)
+    dist[s] = 0
+    frontiera = [(0, s)]
+
+    while frontiera:
+        d, corrente = heapq.heappop(frontiera)
+        if chiusi[corrente]:
+            continue
+        chiusi[corrente] = 1
+        for e in range(indptr[corrente], indptr[corrente + 1]):
+            vicino = indici[e]
+            if chiusi[vicino] or not ok[vicino]:
+                continue
+            nuova_d = d + pesi[e]
+            if nuova_d < dist[vicino]:
+                dist[vicino] = nuova_d
+                padre[vicino] = corrente
+                heapq.heappush(frontiera, (nuova_d, vicino))
+
+    return np.array(dist), np.array(padre, dtype=np.int64)
+
+def percorso_da_padri(grafo, padre, sorgente, destinazione):
+    """Ricostruisce il percorso (lista di nomi) dai puntatori al padre di dijkstra_csr."""
+    s, t = grafo.posizione[sorgente], grafo.posizione[destinazione]
+    if s != t and padre[t] < 0:
+        return None
+    percorso = [t]
+    while percorso[-1] != s:
+        percorso.append(int(padre[percorso[-1]]))
+    return [grafo.nomi[i] for i in reversed(percorso)]
+
 if __name__ == "__main__":
     # Testiamo il drone
     percorso, costo = a_star_search(mappa_agricola, 'Stazione_Ricarica', 'Lotto_Critico', euristica)
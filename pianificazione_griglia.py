@@ -0,0 +1,388 @@
+import heapq
+import math
+import sys
+import time
+import numpy as np
+
+# --- PIANIFICAZIONE SU GRIGLIA DI OCCUPAZIONE (mappe raster dei campi) ---
+# La griglia è un array NumPy booleano: True = cella bloccata (ostacolo o no-fly zone).
+# Movimenti a 8 direzioni: costo 1 in orizzontale/verticale, sqrt(2) in diagonale.
+# Le diagonali sono ammesse solo se entrambe le celle ortogonali adiacenti sono libere
+# (il drone non "taglia" gli spigoli degli ostacoli).
+# I costi sono in celle: moltiplicare per la risoluzione della mappa per avere i metri.
+
+SQRT2 = math.sqrt(2)
+DIREZIONI = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+
+def _carica_strato(strato):
+    """Uno strato della mappa: array NumPy oppure percorso di un file .npy."""
+    if isinstance(strato, str):
+        strato = np.load(strato, mmap_mode='r')
+    return np.asarray(strato).astype(bool)
+
+
+def carica_griglia(ostacoli, no_fly=None):
+    """
+    Costruisce la griglia di occupanza combinando lo strato degli ostacoli con
+    quello (opzionale) delle no-fly zone. Ogni strato può essere un array o un .npy.
+    """
+    griglia = _carica_strato(ostacoli)
+    if no_fly is not None:
+        griglia = griglia | _carica_strato(no_fly)
+    return griglia
+
+
+def distanza_ottile(a, b):
+    """Euristica ottile tra due celle (r, c): ammissibile e consistente sulle 8 direzioni."""
+    dr, dc = abs(a[0] - b[0]), abs(a[1] - b[1])
+    return max(dr, dc) + (SQRT2 - 1) * min(dr, dc)
+
+
+class _GrigliaPiatta:
+    """
+    Griglia linearizzata con un bordo di celle bloccate: niente controlli sui limiti
+    negli anelli interni, gli spostamenti sono semplici offset sull'indice.
+    """
+
+    def __init__(self, griglia):
+        griglia = np.asarray(griglia, dtype=bool)
+        self.righe, self.colonne = griglia.shape
+        self.larghezza = self.colonne + 2
+        bordata = np.ones((self.righe + 2, self.larghezza), dtype=bool)
+        bordata[1:-1, 1:-1] = griglia
+        self.libero = bytearray((~bordata).astype(np.uint8).tobytes())
+        self.altezza = self.righe + 2
+        self._arresti = None
+
+    def arresti(self):
+        """
+        Celle di arresto dei salti JPS rettilinei, precalcolate una volta per griglia:
+        per ogni direzione (E, O, S, N) una cella "ferma" il salto se è bloccata o ha
+        un vicino forzato. Così un salto diventa una bytearray.find (ciclo in C)
+        invece di una scansione cella per cella in Python.
+        E/O sono in ordine per righe, S/N per colonne (griglia trasposta).
+        """
+        if self._arresti is None:
+            L = np.frombuffer(bytes(self.libero), dtype=np.uint8).reshape(self.altezza, self.larghezza) > 0
+            forzati = {d: np.zeros_like(L) for d in 'EOSN'}
+            centro = (slice(1, -1), slice(1, -1))
+            forzati['E'][centro] = (L[:-2, 1:-1] & ~L[:-2, :-2]) | (L[2:, 1:-1] & ~L[2:, :-2])
+            forzati['O'][centro] = (L[:-2, 1:-1] & ~L[:-2, 2:]) | (L[2:, 1:-1] & ~L[2:, 2:])
+            forzati['S'][centro] = (L[1:-1, :-2] & ~L[:-2, :-2]) | (L[1:-1, 2:] & ~L[:-2, 2:])
+            forzati['N'][centro] = (L[1:-1, :-2] & ~L[2:, :-2]) | (L[1:-1, 2:] & ~L[2:, 2:])
+
+            self._arresti = {}
+            for d, f in forzati.items():
+                stop = ~L | f
+                if d in 'SN':
+                    stop = stop.T
+                self._arresti[d] = bytearray(np.ascontiguousarray(stop).astype(np.uint8).tobytes())
+        return self._arresti
+
+    def trasposto(self, indice):
+        r, c = divmod(indice, self.larghezza)
+        return c * self.altezza + r
+
+    def da_trasposto(self, indice_t):
+        c, r = divmod(indice_t, self.altezza)
+        return r * self.larghezza + c
+
+    def indice(self, cella):
+        r, c = cella
+        if not (0 <= r < self.righe and 0 <= c < self.colonne):
+            return None
+        return (r + 1) * self.larghezza + (c + 1)
+
+    def cella(self, indice):
+        r, c = divmod(indice, self.larghezza)
+        return (r - 1, c - 1)
+
+    def ottile(self, a, b):
+        ra, ca = divmod(a, self.larghezza)
+        rb, cb = divmod(b, self.larghezza)
+        dr, dc = abs(ra - rb), abs(ca - cb)
+        return max(dr, dc) + (SQRT2 - 1) * min(dr, dc)
+
+
+def _ricostruisci(mappa, padre, s, t):
+    """Percorso completo cella per cella dai puntatori al padre (i salti JPS vengono espansi)."""
+    punti = [t]
+    while punti[-1] != s:
+        punti.append(padre[punti[-1]])
+    punti.reverse()
+
+    percorso = [mappa.cella(punti[0])]
+    for a, b in zip(punti, punti[1:]):
+        ra, ca = mappa.cella(a)
+        rb, cb = mappa.cella(b)
+        dr, dc = (rb > ra) - (rb < ra), (cb > ca) - (cb < ca)
+        while (ra, ca) != (rb, cb):
+            ra, ca = ra + dr, ca + dc
+            percorso.append((ra, ca))
+    return percorso
+
+
+def _prepara(griglia, start, goal):
+    mappa = griglia if isinstance(griglia, _GrigliaPiatta) else _GrigliaPiatta(griglia)
+    s, t = mappa.indice(start), mappa.indice(goal)
+    if s is None or t is None or not mappa.libero[s] or not mappa.libero[t]:
+        return mappa, None, None
+    return mappa, s, t
+
+
+def a_star_griglia(griglia, start, goal, statistiche=None):
+    """
+    A* classico sulla griglia (8 direzioni, euristica ottile).
+    Restituisce (percorso come lista di celle (r, c), costo) oppure (None, inf).
+    Se 'statistiche' è un dizionario, vi scrive il numero di nodi espansi.
+    """
+    mappa, s, t = _prepara(griglia, start, goal)
+    if s is None:
+        return None, float('inf')
+
+    W = mappa.larghezza
+    libero = mappa.libero
+    mosse = [(dr * W + dc, dr * W, dc, SQRT2 if dr and dc else 1.0) for dr, dc in DIREZIONI]
+
+    costo_g = {s: 0.0}
+    padre = {}
+    chiusi = set()
+    frontiera = [(mappa.ottile(s, t), 0.0, s)]
+    espansi = 0
+
+    while frontiera:
+        f, g, corrente = heapq.heappop(frontiera)
+        if corrente in chiusi:
+            continue
+        if corrente == t:
+            if statistiche is not None:
+                statistiche['espansi'] = espansi
+            return _ricostruisci(mappa, padre, s, t), g
+        chiusi.add(corrente)
+        espansi += 1
+
+        for passo, passo_r, passo_c, costo in mosse:
+            vicino = corrente + passo
+            if not libero[vicino] or vicino in chiusi:
+                continue
+            if passo_r and passo_c and not (libero[corrente + passo_r] and libero[corrente + passo_c]):
+                continue  # niente tagli di spigolo
+            nuovo_g = g + costo
+            if nuovo_g < costo_g.get(vicino, float('inf')):
+                costo_g[vicino] = nuovo_g
+                padre[vicino] = corrente
+                heapq.heappush(frontiera, (nuovo_g + mappa.ottile(vicino, t), nuovo_g, vicino))
+
+    if statistiche is not None:
+        statistiche['espansi'] = espansi
+    return None, float('inf')
+
+
+# --- JUMP POINT SEARCH ---
+
+def _salta(mappa, indice, dr, dc, t):
+    """
+    Salto JPS dalla cella 'indice' (già spostata di (dr, dc) rispetto al padre).
+    Restituisce l'indice del jump point trovato oppure -1.
+    Versione iterativa: su griglie 2000x2000 la ricorsione sforerebbe lo stack.
+    """
+    W = mappa.larghezza
+    libero = mappa.libero
+
+    if dr and dc:
+        passo = dr * W + dc
+        while True:
+            if not libero[indice]:
+                return -1
+            if indice == t:
+                return indice
+            # In diagonale: è un jump point se da qui parte un salto orizzontale o verticale utile
+            if _salta_dritto(mappa, indice + dc, 0, dc, t) != -1 or \
+                    _salta_dritto(mappa, indice + dr * W, dr, 0, t) != -1:
+                return indice
+            if not (libero[indice + dc] and libero[indice + dr * W]):
+                return -1
+            indice += passo
+
+    return _salta_dritto(mappa, indice, dr, dc, t)
+
+
+def _salta_dritto(mappa, indice, dr, dc, t):
+    """
+    Salto orizzontale o verticale: si ferma su ostacoli, sul goal o su vicini forzati.
+    La ricerca della prima cella di arresto usa le tabelle precalcolate di
+    _GrigliaPiatta.arresti() (il bordo bloccato garantisce di restare sulla stessa riga/colonna).
+    """
+    arresti = mappa.arresti()
+
+    if dc == 1:
+        j = arresti['E'].find(1, indice)
+        if indice <= t <= j:
+            return t
+    elif dc == -1:
+        j = arresti['O'].rfind(1, 0, indice + 1)
+        if j <= t <= indice:
+            return t
+    else:
+        it, tt = mappa.trasposto(indice), mappa.trasposto(t)
+        if dr == 1:
+            j = arresti['S'].find(1, it)
+            if it <= tt <= j:
+                return t
+        else:
+            j = arresti['N'].rfind(1, 0, it + 1)
+            if j <= tt <= it:
+                return t
+        j = mappa.da_trasposto(j)
+
+    return j if mappa.libero[j] else -1
+
+
+def _vicini_potati(mappa, corrente, padre):
+    """Direzioni di ricerca da 'corrente' secondo le regole di pruning di JPS."""
+    W = mappa.larghezza
+    libero = mappa.libero
+    if padre is None:
+        return [(dr, dc) for dr, dc in DIREZIONI
+                if libero[corrente + dr * W + dc] and
+                (not (dr and dc) or (libero[corrente + dr * W] and libero[corrente + dc]))]
+
+    rc, cc = divmod(corrente, W)
+    rp, cp = divmod(padre, W)
+    dr, dc = (rc > rp) - (rc < rp), (cc > cp) - (cc < cp)
+    direzioni = []
+
+    if dr and dc:
+        vert, oriz = libero[corrente + dr * W], libero[corrente + dc]
+        if vert:
+            direzioni.append((dr, 0))
+        if oriz:
+            direzioni.append((0, dc))
+        if vert and oriz:
+            direzioni.append((dr, dc))
+    elif dc:
+        avanti, su, giu = libero[corrente + dc], libero[corrente - W], libero[corrente + W]
+        if avanti:
+            direzioni.append((0, dc))
+            if su:
+                direzioni.append((-1, dc))
+            if giu:
+                direzioni.append((1, dc))
+        if su:
+            direzioni.append((-1, 0))
+        if giu:
+            direzioni.append((1, 0))
+    else:
+        avanti, sx, dx = libero[corrente + dr * W], libero[corrente - 1], libero[corrente + 1]
+        if avanti:
+            direzioni.append((dr, 0))
+            if sx:
+                direzioni.append((dr, -1))
+            if dx:
+                direzioni.append((dr, 1))
+        if sx:
+            direzioni.append((0, -1))
+        if dx:
+            direzioni.append((0, 1))
+    return direzioni
+
+
+def jps_griglia(griglia, start, goal, statistiche=None):
+    """
+    Jump Point Search sulla griglia: stessa soluzione ottima di a_star_griglia ma
+    espande solo i jump point, saltando le lunghe file di celle simmetriche.
+    Stesso contratto: (percorso cella per cella, costo) oppure (None, inf).
+    """
+    mappa, s, t = _prepara(griglia, start, goal)
+    if s is None:
+        return None, float('inf')
+
+    W = mappa.larghezza
+    costo_g = {s: 0.0}
+    padre = {}
+    chiusi = set()
+    frontiera = [(mappa.ottile(s, t), 0.0, s)]
+    espansi = 0
+
+    while frontiera:
+        f, g, corrente = heapq.heappop(frontiera)
+        if corrente in chiusi:
+            continue
+        if corrente == t:
+            if statistiche is not None:
+                statistiche['espansi'] = espansi
+            return _ricostruisci(mappa, padre, s, t), g
+        chiusi.add(corrente)
+        espansi += 1
+
+        for dr, dc in _vicini_potati(mappa, corrente, padre.get(corrente)):
+            salto = _salta(mappa, corrente + dr * W + dc, dr, dc, t)
+            if salto == -1 or salto in chiusi:
+                continue
+            nuovo_g = g + mappa.ottile(corrente, salto)
+            if nuovo_g < costo_g.get(salto, float('inf')):
+                costo_g[salto] = nuovo_g
+                padre[salto] = corrente
+                heapq.heappush(frontiera, (nuovo_g + mappa.ottile(salto, t), nuovo_g, salto))
+
+    if statistiche is not None:
+        statistiche['espansi'] = espansi
+    return None, float('inf')
+
+
+# --- BENCHMARK ---
+
+def griglia_sintetica(dimensione, n_ostacoli=None, seed=42):
+    """
+    Mappa raster di prova: ostacoli rettangolari (capannoni, filari, no-fly zone)
+    sparsi su un campo dimensione x dimensione. Gli angoli restano liberi.
+    """
+    rng = np.random.default_rng(seed)
+    griglia = np.zeros((dimensione, dimensione), dtype=bool)
+    if n_ostacoli is None:
+        n_ostacoli = 300  # copertura ~15-20% del campo, indipendente dalla dimensione
+    lato_max = max(2, dimensione // 20)
+    for _ in range(n_ostacoli):
+        r, c = rng.integers(0, dimensione, 2)
+        h, w = rng.integers(1, lato_max, 2)
+        griglia[r:r + h, c:c + w] = True
+    griglia[0, 0] = griglia[-1, -1] = False
+    return griglia
+
+
+def benchmark(dimensione=500, seed=42):
+    """Confronta A* e JPS (nodi espansi e tempo) sulla stessa griglia, dall'angolo in alto a sinistra a quello opposto."""
+    griglia = griglia_sintetica(dimensione, seed=seed)
+    mappa = _GrigliaPiatta(griglia)
+    start, goal = (0, 0), (dimensione - 1, dimensione - 1)
+
+    risultati = {}
+    for nome, algoritmo in [('A*', a_star_griglia), ('JPS', jps_griglia)]:
+        statistiche = {}
+        t0 = time.perf_counter()
+        percorso, costo = algoritmo(mappa, start, goal, statistiche)
+        risultati[nome] = {
+            'tempo_s': time.perf_counter() - t0,
+            'espansi': statistiche['espansi'],
+            'costo': costo,
+            'lunghezza': len(percorso) if percorso else 0,
+        }
+    return risultati
+
+
+if __name__ == "__main__":
+    dimensione = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f"--- BENCHMARK GRIGLIA {dimensione}x{dimensione}: A* vs Jump Point Search ---")
+    risultati = benchmark(dimensione)
+
+    print(f"{'Algoritmo':<10} | {'Espansi':>10} | {'Tempo (s)':>10} | {'Costo':>10}")
+    print("-" * 50)
+    for nome, r in risultati.items():
+        print(f"{nome:<10} | {r['espansi']:>10} | {r['tempo_s']:>10.3f} | {r['costo']:>10.2f}")
+
+    if abs(risultati['A*']['costo'] - risultati['JPS']['costo']) > 1e-6:
+        print("[ERRORE] JPS e A* restituiscono costi diversi!")
+        sys.exit(1)
+    print(f"\nSpeed-up JPS: {risultati['A*']['tempo_s'] / risultati['JPS']['tempo_s']:.1f}x, "
+          f"nodi espansi ridotti di {risultati['A*']['espansi'] / max(1, risultati['JPS']['espansi']):.0f}x")
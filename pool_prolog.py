@@ -0,0 +1,118 @@
+import itertools
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+# --- CONFIGURAZIONE ---
+KB_PATH = 'kb_agricola.pl'
+DIMENSIONE_BLOCCO = 256   # Lotti inviati a un worker per ogni task
+
+# Stato del singolo processo worker (un motore SWI-Prolog per processo)
+_prolog_worker = None
+_contatore_lotti = itertools.count()
+
+
+def valida_lotto_prolog(prolog, lotto_id, valori, coltura):
+    """
+    Validazione + recovery Prolog di un singolo lotto, senza stampe.
+    Scrive dati_lotto(lotto_id, ...), interroga valida_raccomandazione/2 e, se serve,
+    suggerisci_alternativa/3, poi ritira il fatto.
+    Restituisce (valida, alternativa) con alternativa=None se assente.
+    """
+    n, p, k, ph, rain, temp = valori
+    list(prolog.query(f"retractall(dati_lotto({lotto_id},_,_,_,_,_,_))"))
+    list(prolog.query(f"assertz(dati_lotto({lotto_id}, {n}, {p}, {k}, {ph}, {rain}, {temp}))"))
+    try:
+        if list(prolog.query(f"valida_raccomandazione({lotto_id}, {coltura})")):
+            return True, None
+
+        alternative = list(prolog.query(f"suggerisci_alternativa({lotto_id}, {coltura}, Alternativa)"))
+        if alternative:
+            return False, str(alternative[0]['Alternativa'])
+        return False, None
+    finally:
+        list(prolog.query(f"retractall(dati_lotto({lotto_id},_,_,_,_,_,_))"))
+
+
+def _inizializza_worker(kb_path):
+    """Eseguito una volta per processo: avvia SWI-Prolog e consulta la KB."""
+    global _prolog_worker
+    from pyswip import Prolog
+    _prolog_worker = Prolog()
+    _prolog_worker.consult(kb_path)
+
+
+def _valida_blocco(blocco):
+    """
+    Task del worker: valida un blocco di (valori, coltura).
+    Ogni lotto riceve un ID univoco (pid + contatore) così i fatti dati_lotto/7
+    di richieste diverse non si sovrascrivono mai.
+    """
+    pid = os.getpid()
+    esiti = []
+    for valori, coltura in blocco:
+        lotto_id = f"lotto_{pid}_{next(_contatore_lotti)}"
+        esiti.append(valida_lotto_prolog(_prolog_worker, lotto_id, valori, coltura))
+    return esiti
+
+
+class PoolProlog:
+    """
+    Pool di processi worker, ognuno con il proprio motore SWI-Prolog e kb_agricola.pl
+    consultata una sola volta. Il dispatcher divide i lotti in blocchi e distribuisce
+    valida_raccomandazione / suggerisci_alternativa su tutti i core.
+    Se un worker muore (es. crash del motore Prolog) il pool viene ricreato e il
+    batch ripetuto una volta.
+    """
+
+    def __init__(self, n_worker=None, kb_path=KB_PATH, dimensione_blocco=DIMENSIONE_BLOCCO):
+        self.n_worker = n_worker or os.cpu_count()
+        self.kb_path = kb_path
+        self.dimensione_blocco = dimensione_blocco
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # 'spawn': niente fork di un processo che ha già un motore Prolog inizializzato
+            self._executor = ProcessPoolExecutor(max_workers=self.n_worker,
+                                                 mp_context=mp.get_context('spawn'),
+                                                 initializer=_inizializza_worker,
+                                                 initargs=(self.kb_path,))
+        return self._executor
+
+    def valida_batch(self, lotti, colture):
+        """
+        lotti: sequenza di tuple (N, P, K, pH, rainfall, temperature); colture: coltura per lotto.
+        Restituisce (validi: array bool, alternative: array object con None se assente),
+        nello stesso ordine dell'input.
+        """
+        richieste = list(zip((tuple(v) for v in lotti), colture))
+        blocchi = [richieste[i:i + self.dimensione_blocco]
+                   for i in range(0, len(richieste), self.dimensione_blocco)]
+
+        for tentativo in range(2):
+            try:
+                risultati = [esito for blocco in self._pool().map(_valida_blocco, blocchi)
+                             for esito in blocco]
+                break
+            except BrokenProcessPool:
+                self.chiudi()
+                if tentativo == 1:
+                    raise
+
+        validi = np.array([valida for valida, _ in risultati], dtype=bool)
+        alternative = np.array([alternativa for _, alternativa in risultati], dtype=object)
+        return validi, alternative
+
+    def chiudi(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.chiudi()
@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import time
+from joblib import Parallel, delayed
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from alberi_compilati import AlberiCompilati
+
+# --- CONFIGURAZIONE ---
+DATASET_PATH = 'Train_Dataset_Clean.csv'
+STORIA_PATH = 'ricerca_iperparametri.jsonl'   # Una riga JSON per prova: permette di riprendere
+IPERPARAMETRI_PATH = 'iperparametri.json'      # Configurazioni scelte, lette da train_models
+SEED = 42
+ETA = 3                  # Fattore di dimezzamento: sopravvive 1/ETA dei candidati per round
+FRAZIONE_VALIDAZIONE = 0.25
+ALBERI_MAX = 90          # Risorsa massima per il Random Forest (numero di alberi)
+RIGHE_LATENZA = 200      # Righe singole su cui misurare la latenza di inferenza
+TOLLERANZA = 0.002       # Perdita di accuratezza accettata per una configurazione più veloce
+
+# Spazi di ricerca. Per il DT la risorsa è la frazione del training set,
+# per il RF il numero di alberi (ogni prova RF è quindi un modello completo).
+SPAZIO = {
+    'dt': {'max_depth': [4, 6, 8, 10, 12, 16, None],
+           'min_samples_leaf': [1, 2, 5, 10],
+           'criterion': ['gini', 'entropy']},
+    'rf': {'max_depth': [8, 12, 16, None],
+           'min_samples_leaf': [1, 2, 5],
+           'max_features': ['sqrt', 'log2', None]},
+}
+
+
+def configurazioni(spazio):
+    """Prodotto cartesiano dello spazio di ricerca come lista di dizionari."""
+    nomi = sorted(spazio)
+    return [dict(zip(nomi, valori)) for valori in itertools.product(*(spazio[n] for n in nomi))]
+
+
+def risorse(modello, eta=ETA, n_round=3, alberi_max=ALBERI_MAX):
+    """Risorsa per ogni round: frazione dei dati (DT) o numero di alberi (RF)."""
+    if modello == 'dt':
+        return [eta ** -(n_round - 1 - r) for r in range(n_round)]
+    return [max(1, alberi_max // eta ** (n_round - 1 - r)) for r in range(n_round)]
+
+
+def _chiave_prova(hash_dati, modello, parametri, risorsa):
+    descrizione = json.dumps({'dati': hash_dati, 'modello': modello, 'parametri': parametri,
+                              'risorsa': risorsa, 'seed': SEED}, sort_keys=True)
+    return hashlib.sha256(descrizione.encode()).hexdigest()[:16]
+
+
+def parametri_completi(modello, parametri, risorsa):
+    """Iperparametri del modello effettivamente addestrato nella prova (pronti per sklearn)."""
+    completi = {**parametri, 'random_state': SEED}
+    if modello == 'rf':
+        completi['n_estimators'] = risorsa
+    return completi
+
+
+def _esegui_prova(chiave, modello, parametri, risorsa, X_tr, y_tr, X_val, y_val):
+    """Job del worker: addestra, misura accuratezza di validazione e latenza per riga."""
+    if modello == 'dt':
+        n = max(1, int(round(len(X_tr) * risorsa)))
+        stimatore = DecisionTreeClassifier(**parametri_completi(modello, parametri, risorsa))
+        X_fit, y_fit = X_tr[:n], y_tr[:n]
+    else:
+        stimatore = RandomForestClassifier(n_jobs=1, **parametri_completi(modello, parametri, risorsa))
+        X_fit, y_fit = X_tr, y_tr
+
+    t0 = time.perf_counter()
+    stimatore.fit(X_fit, y_fit)
+    durata_fit = time.perf_counter() - t0
+
+    # Latenza come in reasoning_pipeline: una riga alla volta sul motore compilato
+    compilato = AlberiCompilati.da_modello(stimatore)
+    righe = [X_val[i:i + 1] for i in range(min(RIGHE_LATENZA, len(X_val)))]
+    compilato.predict_proba(righe[0])
+    t0 = time.perf_counter()
+    for riga in righe:
+        compilato.predict_proba(riga)
+    latenza = (time.perf_counter() - t0) / len(righe)
+
+    return {
+        'chiave': chiave,
+        'modello': modello,
+        'parametri': parametri,
+        'risorsa': risorsa,
+        'completa': modello == 'rf' or risorsa >= 1,
+        'accuratezza': float(stimatore.score(X_val, y_val)),
+        'latenza_us': latenza * 1e6,
+        'nodi': int(len(compilato.feature)),
+        'durata_fit_s': durata_fit,
+    }
+
+
+def leggi_storia(path):
+    """Prove già concluse (chiave -> record); righe troncate da un'interruzione sono ignorate."""
+    storia = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for riga in f:
+                try:
+                    record = json.loads(riga)
+                except json.JSONDecodeError:
+                    continue
+                storia[record['chiave']] = record
+    return storia
+
+
+def successive_halving(modello, X_tr, y_tr, X_val, y_val, hash_dati, storia_path=STORIA_PATH,
+                       eta=ETA, alberi_max=ALBERI_MAX, n_jobs=-1):
+    """
+    Successive halving su SPAZIO[modello]: tutte le configurazioni partono con la
+    risorsa minima, a ogni round sopravvive il miglior 1/eta (accuratezza, poi
+    latenza) e la risorsa viene moltiplicata per eta.
+    Le prove di un round girano in parallelo; ogni esito è aggiunto subito alla
+    storia JSONL, quindi una ricerca interrotta riparte calcolando solo le prove mancanti.
+    Restituisce la lista di tutte le prove eseguite (o riprese dalla storia).
+    """
+    storia = leggi_storia(storia_path)
+    candidati = configurazioni(SPAZIO[modello])
+    eseguite = []
+
+    for round_, risorsa in enumerate(risorse(modello, eta, alberi_max=alberi_max)):
+        chiavi = [_chiave_prova(hash_dati, modello, p, risorsa) for p in candidati]
+        da_fare = [(c, p) for c, p in zip(chiavi, candidati) if c not in storia]
+        print(f"[HALVING] {modello.upper()} round {round_ + 1}: {len(candidati)} configurazioni, "
+              f"risorsa {risorsa:g} ({len(candidati) - len(da_fare)} dalla storia)")
+
+        if da_fare:
+            lavori = Parallel(n_jobs=n_jobs, return_as='generator_unordered')(
+                delayed(_esegui_prova)(c, modello, p, risorsa, X_tr, y_tr, X_val, y_val) for c, p in da_fare
+            )
+            with open(storia_path, 'a') as f:
+                for record in lavori:
+                    f.write(json.dumps(record) + '\n')
+                    f.flush()
+                    storia[record['chiave']] = record
+
+        risultati = [storia[c] for c in chiavi]
+        eseguite += risultati
+        ordinati = sorted(risultati, key=lambda r: (-r['accuratezza'], r['latenza_us']))
+        candidati = [r['parametri'] for r in ordinati[:max(1, math.ceil(len(ordinati) / eta))]]
+
+    return eseguite
+
+
+def fronte_pareto(prove):
+    """Prove complete non dominate su (accuratezza massima, latenza minima), per latenza crescente."""
+    fronte, migliore = [], -1.0
+    for prova in sorted((p for p in prove if p['completa']), key=lambda p: (p['latenza_us'], -p['accuratezza'])):
+        if prova['accuratezza'] > migliore:
+            fronte.append(prova)
+            migliore = prova['accuratezza']
+    return fronte
+
+
+def scegli(fronte, tolleranza=TOLLERANZA):
+    """La configurazione più veloce del fronte con accuratezza entro 'tolleranza' dalla migliore."""
+    migliore = max(p['accuratezza'] for p in fronte)
+    return min((p for p in fronte if p['accuratezza'] >= migliore - tolleranza), key=lambda p: p['latenza_us'])
+
+
+def carica_iperparametri(predefiniti_dt, predefiniti_rf, path=IPERPARAMETRI_PATH):
+    """Iperparametri (dt, rf) scelti dalla ricerca, se salvati; altrimenti i predefiniti."""
+    if not os.path.exists(path):
+        return predefiniti_dt, predefiniti_rf
+    with open(path) as f:
+        scelti = json.load(f)
+    return scelti.get('dt', predefiniti_dt), scelti.get('rf', predefiniti_rf)
+
+
+def main():
+    from caricamento_dati import carica_dataset, separa_feature_target
+    from motore_valutazione import hash_array
+
+    parser = argparse.ArgumentParser(description="Ricerca iperparametri DT/RF con successive halving")
+    parser.add_argument('--modelli', nargs='*', choices=list(SPAZIO), default=list(SPAZIO))
+    parser.add_argument('--dataset', default=DATASET_PATH)
+    parser.add_argument('--storia', default=STORIA_PATH, help="Storia JSONL delle prove (ripresa automatica)")
+    parser.add_argument('--eta', type=int, default=ETA)
+    parser.add_argument('--alberi-max', type=int, default=ALBERI_MAX)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--tolleranza', type=float, default=TOLLERANZA,
+                        help="Perdita di accuratezza accettata per scegliere una configurazione più veloce")
+    parser.add_argument('--salva', action='store_true', help=f"Scrive le configurazioni scelte in {IPERPARAMETRI_PATH}")
+    args = parser.parse_args()
+
+    X, y = separa_feature_target(carica_dataset(args.dataset))
+    X, y = X.to_numpy(), y.cat.codes.to_numpy()
+    X_tr, X_val, y_tr, y_val = train_test_split(X, y, test_size=FRAZIONE_VALIDAZIONE,
+                                                stratify=y, random_state=SEED)
+    hash_dati = hash_array(X_tr, y_tr, X_val, y_val)
+
+    scelte = {}
+    for modello in args.modelli:
+        prove = successive_halving(modello, X_tr, y_tr, X_val, y_val, hash_dati, args.storia,
+                                   args.eta, args.alberi_max, args.n_jobs)
+        fronte = fronte_pareto(prove)
+        scelta = scegli(fronte, args.tolleranza)
+        scelte[modello] = parametri_completi(modello, scelta['parametri'], scelta['risorsa'])
+
+        print(f"\n--- FRONTE DI PARETO {modello.upper()} (accuratezza vs latenza per riga) ---")
+        print(f"{'Accuratezza':<12} | {'Latenza (us)':<12} | {'Nodi':<8} | Iperparametri")
+        for p in fronte:
+            segno = '*' if p is scelta else ' '
+            print(f"{p['accuratezza']:.4f}{segno}      | {p['latenza_us']:<12.1f} | {p['nodi']:<8} | "
+                  f"{parametri_completi(modello, p['parametri'], p['risorsa'])}")
+        print(f"(* = scelta: la più veloce entro {args.tolleranza:.3f} dalla migliore accuratezza)")
+
+    if args.salva:
+        esistenti = {}
+        if os.path.exists(IPERPARAMETRI_PATH):
+            with open(IPERPARAMETRI_PATH) as f:
+                esistenti = json.load(f)
+        with open(IPERPARAMETRI_PATH, 'w') as f:
+            json.dump({**esistenti, **scelte}, f, indent=2)
+        print(f"\n[OK] Iperparametri salvati in '{IPERPARAMETRI_PATH}' (usati da train_models e valutazione_modelli).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import heapq
+import sys
+import time
+import numpy as np
+from pianificazione_drone import grafo_csr_da_dizionario, a_star_csr, versione_vincoli
+
+INF = float('inf')
+
+
+class PianificatoreIncrementale:
+    """
+    Ripianificazione incrementale con D* Lite (Koenig & Likhachev) su GrafoCSR.
+    La ricerca procede all'indietro dal goal e conserva g/rhs di tutti i nodi tra le
+    chiamate: quando una zona si apre o si chiude, o cambia il costo di un arco, si
+    riparano solo i nodi la cui distanza dal goal è davvero cambiata, invece di
+    rifare l'A* da capo. Il drone può avanzare lungo il percorso (sposta_partenza)
+    senza invalidare lo stato.
+    Stessi vincoli di a_star_csr: un nodo non attraversabile non può essere raggiunto
+    (la partenza stessa è ammessa). Stesso contratto: (lista di nomi, costo) o (None, inf).
+    """
+
+    def __init__(self, grafo, start, goal, h=None, attraversabili=None):
+        """
+        h: funzione (indice_a, indice_b) -> stima ammissibile e consistente del costo
+           tra due nodi (default 0, cioè Dijkstra incrementale).
+        attraversabili: maschera iniziale; default quella della KB (sincronizza_kb la riallinea).
+        """
+        if isinstance(grafo, dict):
+            grafo = grafo_csr_da_dizionario(grafo)
+        self.grafo = grafo
+        n = len(grafo)
+        self._indptr, self._indici, pesi = grafo.liste()
+        self._pesi = list(pesi)  # copia privata: aggiorna_costo non modifica il grafo
+
+        # Predecessori (grafo trasposto) come indici degli archi entranti nell'array dei pesi
+        ordine = np.argsort(grafo.indici, kind='stable')
+        sorgenti = np.repeat(np.arange(n), np.diff(grafo.indptr))
+        self._pred_ptr = np.concatenate([[0], np.cumsum(np.bincount(grafo.indici, minlength=n))]).tolist()
+        self._pred = sorgenti[ordine].tolist()
+
+        self._versione = None
+        if attraversabili is None:
+            self._versione = versione_vincoli()
+            attraversabili = grafo.maschera_attraversabili()
+        self._ok = attraversabili.tolist()
+        self._h = h if h is not None else (lambda a, b: 0)
+
+        self._start = self._ultimo = grafo.posizione[start]
+        self._goal = grafo.posizione[goal]
+        self._km = 0
+        self._g = [INF] * n
+        self._rhs = [INF] * n
+        self._chiave = [None] * n   # chiave valida in coda per ogni nodo (None = fuori coda)
+        self._coda = []             # heap con eliminazione pigra delle voci obsolete
+        self.espansioni = 0
+
+        self._rhs[self._goal] = 0
+        self._accoda(self._goal)
+
+    # --- NUCLEO D* LITE ---
+
+    def _calcola_chiave(self, s):
+        m = min(self._g[s], self._rhs[s])
+        return (m + self._h(self._start, s) + self._km, m)
+
+    def _accoda(self, u):
+        chiave = self._calcola_chiave(u)
+        self._chiave[u] = chiave
+        heapq.heappush(self._coda, (chiave, u))
+
+    def _aggiorna_nodo(self, u):
+        if u != self._goal:
+            g, ok, indici, pesi = self._g, self._ok, self._indici, self._pesi
+            migliore = INF
+            for e in range(self._indptr[u], self._indptr[u + 1]):
+                v = indici[e]
+                if ok[v]:
+                    costo = pesi[e] + g[v]
+                    if costo < migliore:
+                        migliore = costo
+            self._rhs[u] = migliore
+        if self._g[u] != self._rhs[u]:
+            self._accoda(u)
+        else:
+            self._chiave[u] = None
+
+    def _aggiorna_predecessori(self, u):
+        pred = self._pred
+        for i in range(self._pred_ptr[u], self._pred_ptr[u + 1]):
+            self._aggiorna_nodo(pred[i])
+
+    def _calcola_percorso_minimo(self):
+        coda, chiavi, g, rhs = self._coda, self._chiave, self._g, self._rhs
+        s = self._start
+        while coda:
+            chiave, u = coda[0]
+            if chiavi[u] != chiave:   # voce obsoleta
+                heapq.heappop(coda)
+                continue
+            if not (chiave < self._calcola_chiave(s) or rhs[s] != g[s]):
+                break
+            heapq.heappop(coda)
+            self.espansioni += 1
+            nuova = self._calcola_chiave(u)
+            if chiave < nuova:
+                chiavi[u] = nuova
+                heapq.heappush(coda, (nuova, u))
+            elif g[u] > rhs[u]:
+                g[u] = rhs[u]
+                chiavi[u] = None
+                if self._ok[u]:   # un nodo interdetto non migliora i suoi predecessori
+                    self._aggiorna_predecessori(u)
+            else:
+                g[u] = INF
+                self._aggiorna_nodo(u)
+                if self._ok[u]:
+                    self._aggiorna_predecessori(u)
+
+    def _registra_spostamento(self):
+        """Prima di ogni modifica: le chiavi in coda restano limiti inferiori (offset km)."""
+        self._km += self._h(self._ultimo, self._start)
+        self._ultimo = self._start
+
+    def _cambia_nodo(self, v, attraversabile):
+        if self._ok[v] == attraversabile:
+            return False
+        self._ok[v] = attraversabile
+        self._aggiorna_predecessori(v)
+        return True
+
+    # --- API ---
+
+    def percorso(self):
+        """Percorso ottimo dalla partenza corrente al goal, riparando solo ciò che è cambiato."""
+        self._calcola_percorso_minimo()
+        s, t = self._start, self._goal
+        if self._g[s] == INF and s != t:
+            return None, INF
+        g, ok, indici, pesi = self._g, self._ok, self._indici, self._pesi
+        percorso = [s]
+        while percorso[-1] != t and len(percorso) <= len(g):
+            u = percorso[-1]
+            migliore, prossimo = INF, -1
+            for e in range(self._indptr[u], self._indptr[u + 1]):
+                v = indici[e]
+                if ok[v] and pesi[e] + g[v] < migliore:
+                    migliore, prossimo = pesi[e] + g[v], v
+            percorso.append(prossimo)
+        return [self.grafo.nomi[i] for i in percorso], (0 if s == t else g[s])
+
+    def sposta_partenza(self, nodo):
+        """Il drone ha raggiunto 'nodo': i piani successivi partono da lì."""
+        self._start = self.grafo.posizione[nodo]
+
+    def imposta_zone(self, interdette=(), riaperte=()):
+        """Chiude/apre zone (nomi dei nodi) senza passare dalla KB. Restituisce i nodi cambiati."""
+        self._registra_spostamento()
+        posizione = self.grafo.posizione
+        cambiati = sum(self._cambia_nodo(posizione[nodo], False) for nodo in interdette)
+        return cambiati + sum(self._cambia_nodo(posizione[nodo], True) for nodo in riaperte)
+
+    def aggiorna_costo(self, da, a, costo):
+        """Nuovo costo dell'arco da -> a (es. vento, consumo misurato)."""
+        u, v = self.grafo.posizione[da], self.grafo.posizione[a]
+        archi = [e for e in range(self._indptr[u], self._indptr[u + 1]) if self._indici[e] == v]
+        if not archi:
+            raise ValueError(f"Arco inesistente: {da} -> {a}")
+        self._registra_spostamento()
+        for e in archi:
+            self._pesi[e] = costo
+        self._aggiorna_nodo(u)
+
+    def sincronizza_kb(self):
+        """
+        Riallinea le zone ai fatti no_fly_zone/1 della KB (vedi imposta_no_fly_zone),
+        solo se la versione dei vincoli è cambiata. Restituisce i nodi cambiati.
+        """
+        versione = versione_vincoli()
+        if versione == self._versione:
+            return 0
+        maschera = self.grafo.maschera_attraversabili()
+        cambiati = np.flatnonzero(maschera != np.array(self._ok, dtype=bool)).tolist()
+        self._registra_spostamento()
+        for v in cambiati:
+            self._cambia_nodo(v, bool(maschera[v]))
+        self._versione = versione
+        return len(cambiati)
+
+
+if __name__ == "__main__":
+    from benchmark_componenti import grafo_sintetico
+
+    # Benchmark: una missione attraverso la griglia durante la quale si chiudono zone
+    # davanti al drone, si riaprono le precedenti e cambiano i costi di alcuni archi.
+    # Riparazione D* Lite contro A* da capo (stessa euristica di Manhattan, ammissibile
+    # perché i costi della griglia sintetica sono >= 1). I costi devono coincidere.
+    DIMENSIONI = [int(a) for a in sys.argv[1:]] or [10_000, 50_000]
+    N_EVENTI = 20
+    rng = np.random.default_rng(42)
+
+    for dimensione in DIMENSIONI:
+        mappa, start, goal = grafo_sintetico(dimensione)
+        riferimento = grafo_csr_da_dizionario(mappa)
+        righe = np.array([int(nome.split('_')[1]) for nome in riferimento.nomi])
+        colonne = np.array([int(nome.split('_')[2]) for nome in riferimento.nomi])
+        r, c = righe.tolist(), colonne.tolist()
+        t = riferimento.posizione[goal]
+        verso_goal = np.abs(righe - righe[t]) + np.abs(colonne - colonne[t])
+        maschera = np.ones(len(riferimento), dtype=bool)
+
+        t0 = time.perf_counter()
+        pianificatore = PianificatoreIncrementale(riferimento, start, goal,
+                                                  lambda a, b: abs(r[a] - r[b]) + abs(c[a] - c[b]),
+                                                  attraversabili=maschera.copy())
+        percorso, costo = pianificatore.percorso()
+        t_iniziale = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        a_star_csr(riferimento, start, goal, verso_goal, maschera)
+        t_a_star = time.perf_counter() - t0
+
+        tempi_riparazione, tempi_ripianificazione, chiuse = [], [], []
+        for evento in range(N_EVENTI):
+            # Il drone avanza di qualche waypoint
+            posizione = percorso[min(len(percorso) - 1, 1 + len(percorso) // 20)]
+            pianificatore.sposta_partenza(posizione)
+            # Zona chiusa qualche waypoint più avanti, riapertura di quella di due eventi fa
+            restante = percorso[percorso.index(posizione):]
+            zona = [n for n in restante[3:6] if n != goal]
+            riaperte = chiuse[-2] if len(chiuse) >= 2 else []
+            chiuse.append(zona)
+            # Variazioni di costo (vento) su archi casuali
+            archi = rng.integers(0, len(riferimento.indici), 5)
+            nuovi_costi = rng.integers(1, 21, 5)
+
+            t0 = time.perf_counter()
+            pianificatore.imposta_zone(zona, riaperte)
+            for e, costo_arco in zip(archi.tolist(), nuovi_costi.tolist()):
+                u = int(np.searchsorted(riferimento.indptr, e, side='right') - 1)
+                pianificatore.aggiorna_costo(riferimento.nomi[u], riferimento.nomi[riferimento.indici[e]], costo_arco)
+            percorso, costo = pianificatore.percorso()
+            tempi_riparazione.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            maschera[[riferimento.posizione[n] for n in zona]] = False
+            maschera[[riferimento.posizione[n] for n in riaperte]] = True
+            riferimento.aggiorna_pesi(archi, nuovi_costi)
+            _, costo_da_capo = a_star_csr(riferimento, posizione, goal, verso_goal, maschera)
+            tempi_ripianificazione.append(time.perf_counter() - t0)
+
+            if costo != costo_da_capo:
+                print(f"[ERRORE] Evento {evento}: costo riparato {costo} != costo da capo {costo_da_capo}")
+                sys.exit(1)
+            if percorso is None:
+                break
+
+        riparazione, ripianificazione = np.array(tempi_riparazione), np.array(tempi_ripianificazione)
+        print(f"--- {len(riferimento)} waypoint, {len(tempi_riparazione)} eventi (zone + costi) ---")
+        print(f"  Piano iniziale: D* Lite {t_iniziale * 1000:.1f} ms | A* {t_a_star * 1000:.1f} ms")
+        print(f"  Riparazione D* Lite: media {riparazione.mean() * 1000:.2f} ms, p95 "
+              f"{np.percentile(riparazione, 95) * 1000:.2f} ms")
+        print(f"  A* da capo:          media {ripianificazione.mean() * 1000:.2f} ms, p95 "
+              f"{np.percentile(ripianificazione, 95) * 1000:.2f} ms")
+        print(f"  Speedup medio: x{ripianificazione.mean() / riparazione.mean():.1f} "
+              f"({pianificatore.espansioni} espansioni totali) | [OK] costi identici")
@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import json
+import math
+import time
+import numpy as np
+from sistema_ibrido import AgroSmartAI, DATASET_PATH, COLONNE_INPUT
+from strumentazione import Strumentazione
+from cache_raccomandazioni import CacheRaccomandazioni, MAX_VOCI
+
+# --- CONFIGURAZIONE SERVIZIO ---
+HOST = '127.0.0.1'
+PORTA = 8080
+MAX_BATCH = 64          # Richieste massime valutate insieme
+MAX_ATTESA_MS = 10      # Latenza massima aggiunta per riempire un batch
+MAX_CORPO = 1 << 20     # Dimensione massima del corpo JSON (1 MB)
+INTERVALLO_FLOTTA_S = 5 # Ogni quanto le missioni in coda vengono assegnate ai droni (--droni)
+
+
+class MicroBatcher:
+    """
+    Raccoglie le richieste concorrenti in una finestra temporale breve e le valuta
+    insieme: UN predict_proba e UN controllo dei vincoli (motore nativo) per batch,
+    poi ogni richiesta riceve il proprio esito. Il batch parte appena raggiunge
+    'max_batch' richieste oppure dopo 'max_attesa_ms' dalla prima in coda.
+    """
+
+    def __init__(self, app, max_batch=MAX_BATCH, max_attesa_ms=MAX_ATTESA_MS):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_attesa = max_attesa_ms / 1000
+        self.coda = asyncio.Queue()
+        self.statistiche = {'richieste': 0, 'batch': 0, 'max_dimensione_batch': 0}
+        self._task = None
+
+    def avvia(self):
+        self._task = asyncio.get_running_loop().create_task(self._ciclo())
+
+    async def ferma(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def valuta(self, valori):
+        """Accoda una lettura (N, P, K, pH, rainfall, temperature) e ne attende l'esito."""
+        futuro = asyncio.get_running_loop().create_future()
+        await self.coda.put((valori, futuro))
+        return await futuro
+
+    async def _ciclo(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            richieste = [await self.coda.get()]
+            scadenza = loop.time() + self.max_attesa
+            while len(richieste) < self.max_batch:
+                attesa = scadenza - loop.time()
+                if attesa <= 0:
+                    break
+                try:
+                    richieste.append(await asyncio.wait_for(self.coda.get(), attesa))
+                except asyncio.TimeoutError:
+                    break
+
+            self.statistiche['richieste'] += len(richieste)
+            self.statistiche['batch'] += 1
+            self.statistiche['max_dimensione_batch'] = max(self.statistiche['max_dimensione_batch'],
+                                                           len(richieste))
+            X = np.array([valori for valori, _ in richieste], dtype=float)
+            try:
+                # Il lavoro CPU va in un thread: il loop continua ad accettare connessioni.
+                # Un solo batch alla volta (il ciclo attende), quindi l'app non è mai concorrente.
+                esiti = await loop.run_in_executor(None, self.app.reasoning_batch, X)
+            except Exception as e:
+                for _, futuro in richieste:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+
+            for (_, futuro), esito in zip(richieste, esiti.to_dict('records')):
+                if not futuro.done():
+                    futuro.set_result(_serializzabile(esito))
+
+
+def _serializzabile(esito):
+    """Esito della pipeline -> tipi JSON (NaN/inf/None -> null, scalari NumPy -> Python)."""
+    pulito = {}
+    for chiave, valore in esito.items():
+        if isinstance(valore, np.generic):
+            valore = valore.item()
+        if valore is None or (isinstance(valore, float) and not math.isfinite(valore)):
+            valore = None
+        pulito[chiave] = valore
+    return pulito
+
+
+def _valori_da_json(dati):
+    """Accetta {"N": .., "P": .., ...} oppure una lista di 6 valori nell'ordine di COLONNE_INPUT."""
+    if isinstance(dati, dict):
+        valori = [float(dati[c]) for c in COLONNE_INPUT]
+    elif isinstance(dati, list) and len(dati) == len(COLONNE_INPUT):
+        valori = [float(v) for v in dati]
+    else:
+        raise ValueError(f"Attesi i campi {COLONNE_INPUT}")
+    # json.loads accetta NaN/Infinity: nessuna regola scatterebbe e il lotto risulterebbe valido
+    if not all(math.isfinite(v) for v in valori):
+        raise ValueError("I valori devono essere numeri finiti")
+    return valori
+
+
+# --- SERVER HTTP/1.1 MINIMALE (solo libreria standard) ---
+
+STATI = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+         413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class ServizioRaccomandazioni:
+    """
+    Servizio HTTP/JSON locale basato su asyncio.
+      POST /raccomandazione   corpo: {"N":90,"P":40,"K":40,"pH":6.5,"rainfall":200,"temperature":25}
+      GET  /stato             statistiche del micro-batching, della cache degli esiti e della flotta
+      GET  /metriche          latenze per fase della pipeline (formato Prometheus)
+    """
+
+    def __init__(self, app, max_batch=MAX_BATCH, max_attesa_ms=MAX_ATTESA_MS,
+                 intervallo_flotta_s=INTERVALLO_FLOTTA_S):
+        self.batcher = MicroBatcher(app, max_batch, max_attesa_ms)
+        self.intervallo_flotta = intervallo_flotta_s
+        self.avvio = time.time()
+
+    async def _ciclo_flotta(self):
+        """Assegna periodicamente ai droni le missioni accodate dalla pipeline (in un thread)."""
+        loop = asyncio.get_running_loop()
+        flotta = self.batcher.app.flotta
+        while True:
+            await asyncio.sleep(self.intervallo_flotta)
+            if flotta.in_coda():
+                assegnate = await loop.run_in_executor(None, flotta.esegui)
+                print(f"[FLOTTA] {len(assegnate)} missioni elaborate.")
+
+    async def gestisci(self, reader, writer):
+        try:
+            while True:
+                riga = await reader.readline()
+                if not riga:
+                    break
+                try:
+                    metodo, percorso, _ = riga.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self._rispondi(writer, 400, {'errore': 'Richiesta non valida'}, chiudi=True)
+                    break
+
+                intestazioni = {}
+                while True:
+                    riga = await reader.readline()
+                    if riga in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valore = riga.decode('latin-1').partition(':')
+                    intestazioni[nome.strip().lower()] = valore.strip()
+
+                try:
+                    lunghezza = int(intestazioni.get('content-length', 0) or 0)
+                except ValueError:
+                    lunghezza = -1
+                if lunghezza < 0:
+                    await self._rispondi(writer, 400, {'errore': 'Content-Length non valido'}, chiudi=True)
+                    break
+                if lunghezza > MAX_CORPO:
+                    await self._rispondi(writer, 413, {'errore': 'Corpo troppo grande'}, chiudi=True)
+                    break
+                corpo = await reader.readexactly(lunghezza) if lunghezza else b''
+
+                chiudi = intestazioni.get('connection', '').lower() == 'close'
+                stato, risposta = await self._instrada(metodo, percorso, corpo)
+                await self._rispondi(writer, stato, risposta, chiudi)
+                if chiudi:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _instrada(self, metodo, percorso, corpo):
+        if percorso == '/raccomandazione':
+            if metodo != 'POST':
+                return 405, {'errore': 'Usare POST'}
+            try:
+                valori = _valori_da_json(json.loads(corpo or b'null'))
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {'errore': f"Input non valido: {e}"}
+            try:
+                return 200, await self.batcher.valuta(valori)
+            except Exception as e:
+                return 500, {'errore': str(e)}
+
+        if percorso == '/stato':
+            stato = dict(self.batcher.statistiche)
+            stato['dimensione_media_batch'] = stato['richieste'] / max(1, stato['batch'])
+            stato['uptime_s'] = time.time() - self.avvio
+            if self.batcher.app.cache is not None:
+                stato['cache'] = self.batcher.app.cache.statistiche()
+            if self.batcher.app.flotta is not None:
+                stato['flotta'] = self.batcher.app.flotta.statistiche()
+            return 200, stato
+
+        if percorso == '/metriche':
+            return 200, self.batcher.app.strumenti.formato_prometheus()
+
+        return 404, {'errore': f"Percorso sconosciuto: {percorso}"}
+
+    async def _rispondi(self, writer, stato, dati, chiudi=False):
+        if isinstance(dati, str):
+            corpo, tipo = dati.encode(), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            corpo, tipo = json.dumps(dati, ensure_ascii=False).encode(), 'application/json; charset=utf-8'
+        testa = (f"HTTP/1.1 {stato} {STATI.get(stato, '')}\r\n"
+                 f"Content-Type: {tipo}\r\n"
+                 f"Content-Length: {len(corpo)}\r\n"
+                 f"Connection: {'close' if chiudi else 'keep-alive'}\r\n\r\n")
+        writer.write(testa.encode() + corpo)
+        await writer.drain()
+
+    async def servi(self, host=HOST, porta=PORTA):
+        self.batcher.avvia()
+        if self.batcher.app.flotta is not None:
+            self._task_flotta = asyncio.get_running_loop().create_task(self._ciclo_flotta())
+        server = await asyncio.start_server(self.gestisci, host, porta)
+        print(f"[SERVIZIO] In ascolto su http://{host}:{porta} "
+              f"(batch max {self.batcher.max_batch}, attesa max {self.batcher.max_attesa * 1000:.0f} ms)")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AgroSmart Advisor - servizio HTTP/JSON con micro-batching")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--porta', type=int, default=PORTA)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max-attesa-ms', type=float, default=MAX_ATTESA_MS)
+    parser.add_argument('--cache-voci', type=int, default=MAX_VOCI,
+                        help="Esiti memorizzati per input quantizzati (0 = cache disattivata)")
+    parser.add_argument('--cache-ttl', type=float, default=None, help="Scadenza delle voci in secondi")
+    parser.add_argument('--recovery-top-k', type=int, default=None,
+                        help="Alternative della stessa famiglia ordinate per probabilità RF (le prime k)")
+    parser.add_argument('--droni', type=int, default=0,
+                        help="Droni della flotta: i lotti critici vanno in coda invece dell'A* sincrono (0 = disattivata)")
+    parser.add_argument('--intervallo-flotta-s', type=float, default=INTERVALLO_FLOTTA_S,
+                        help="Secondi tra due assegnazioni delle missioni in coda")
+    parser.add_argument('--modello-base', action='store_true',
+                        help="Ignora gli aggiornamenti online salvati e usa il modello addestrato sul dataset")
+    args = parser.parse_args()
+
+    cache = None
+    if args.cache_voci > 0:
+        cache = CacheRaccomandazioni(COLONNE_INPUT, max_voci=args.cache_voci, ttl_s=args.cache_ttl)
+
+    flotta = None
+    if args.droni > 0:
+        from flotta_droni import SchedulerFlotta
+        flotta = SchedulerFlotta(droni=args.droni)
+
+    # Motore nativo: un solo controllo dei vincoli vettoriale per batch
+    app = AgroSmartAI(motore_nativo=True, strumentazione=Strumentazione(abilitata=True), cache=cache,
+                      recovery_top_k=args.recovery_top_k, flotta=flotta)
+    app.train_models(DATASET_PATH, online=not args.modello_base)
+
+    servizio = ServizioRaccomandazioni(app, args.max_batch, args.max_attesa_ms, args.intervallo_flotta_s)
+    try:
+        asyncio.run(servizio.servi(args.host, args.porta))
+    except KeyboardInterrupt:
+        print("\n[SERVIZIO] Arresto.")
+    finally:
+        if flotta is not None:
+            flotta.chiudi()
+
+
+if __name__ == "__main__":
+    main()
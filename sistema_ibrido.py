@@ -1,102 +1,540 @@
-import pandas as pd
+import sys
 import numpy as np
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-from pyswip import Prolog
-from pianificazione_drone import a_star_search, mappa_agricola, euristica
-from diagnosi_bayesiana import DiagnosticaFitopatologica
+from motore_regole import MotoreRegole
+from pool_prolog import valida_lotto_prolog
+from strumentazione import Strumentazione
+from alberi_compilati import AlberiCompilati
+from cache_raccomandazioni import CacheRaccomandazioni
+
+# I sottosistemi pesanti (pandas, sklearn, pgmpy, SWI-Prolog, pianificazione drone)
+# sono importati al primo uso: l'import del modulo non ha effetti collaterali e le
+# invocazioni brevi (CLI, worker, servizio) non pagano ciò che non usano.
+# Misura: python benchmark_import.py
 
 # --- CONFIGURAZIONE SISTEMA ---
 DATASET_PATH = 'Train_Dataset_Clean.csv'
 KB_PATH = 'kb_agricola.pl'
 
+# Iperparametri predefiniti dei modelli (fanno parte della chiave della cache dei modelli);
+# se ricerca_iperparametri.py --salva ha scritto iperparametri.json, si usano quelli.
+PARAMETRI_DT = {'random_state': 42, 'max_depth': 10}
+PARAMETRI_RF = {'n_estimators': 50, 'random_state': 42}
+
+# Ordine delle feature atteso dai modelli (stesse colonne del dataset)
+COLONNE_INPUT = ['N', 'P', 'K', 'pH', 'rainfall', 'temperature']
+
+# Fino a questa dimensione il Random Forest è valutato con il motore compilato
+# (alberi_compilati.py); oltre, l'attraversamento Cython di sklearn è più veloce.
+MAX_RIGHE_COMPILATE = 256
+
+# Colonne della tabella prodotta da reasoning_batch
+COLONNE_ESITO = ['coltura', 'confidenza', 'valida', 'alternativa', 'missione_drone',
+                 'costo_percorso', 'p_malattia', 'p_stress', 'decisione']
+# Colonna aggiuntiva con il recovery probabilistico: [(coltura, probabilità RF)] in ordine
+COLONNA_CLASSIFICA = 'alternative_classificate'
+
 class AgroSmartAI:
-    def __init__(self):
+    def __init__(self, motore_nativo=False, pool_prolog=None, strumentazione=None, cache=None,
+                 recovery_top_k=None, flotta=None):
+        """
+        motore_nativo=True abilita il motore NumPy compilato dalla KB (motore_regole.py)
+        per la validazione batch, al posto dei round-trip pyswip riga per riga.
+        pool_prolog: un PoolProlog (pool_prolog.py) per distribuire la validazione
+        Prolog del batch su più processi.
+        strumentazione: una Strumentazione (strumentazione.py) che raccoglie le latenze
+        per fase; di default è disattivata e non aggiunge costi misurabili.
+        cache: True (o una CacheRaccomandazioni già configurata) per memorizzare gli
+        esiti per input quantizzati; si svuota da sola quando cambiano i modelli o le
+        no-fly zone (imposta_no_fly_zone).
+        recovery_top_k: se impostato, il recovery semantico ordina le alternative della
+        stessa famiglia per probabilità del Random Forest (già calcolata) e ne riporta
+        le prime k in COLONNA_CLASSIFICA; 'alternativa' diventa la più probabile invece
+        della prima soluzione Prolog.
+        flotta: uno SchedulerFlotta (flotta_droni.py); le ispezioni dei lotti critici
+        vanno in coda con priorità pari al rischio di malattia e sono pianificate e
+        assegnate ai droni dallo scheduler, invece dell'A* sincrono a un solo drone.
+        L'assegnazione avviene solo quando il chiamante invoca flotta.esegui()
+        (servizio_http.py --droni lo fa periodicamente).
+        """
         self.model_dt = None
         self.model_rf = None
-        self.le = LabelEncoder()
-        self.prolog = Prolog()
-        self.diagnostica = DiagnosticaFitopatologica()
-        
-        print(f"[INIT] Caricamento Knowledge Base da '{KB_PATH}'...")
-        self.prolog.consult(KB_PATH)
+        self.alberi_rf = None
+        self.versione_modelli = 0
+        self.le = None
+        self._prolog = None
+        self._diagnostica = None
+        self.motore = MotoreRegole(KB_PATH) if motore_nativo else None
+        self.pool_prolog = pool_prolog
+        self.strumenti = strumentazione if strumentazione is not None else Strumentazione()
+        self.cache = CacheRaccomandazioni(COLONNE_INPUT) if cache is True else (cache or None)
+        self.recovery_top_k = recovery_top_k
+        self._motore_classifica = None
+        self.flotta = flotta
+        # Lotti etichettati recenti (feature, nomi coltura) riusati dagli aggiornamenti online
+        self._recenti = None
+        self._chiave_modelli = None   # artefatto di cache_modelli da cui provengono i modelli
+        self._aggiornamenti = 0
+        self.colonne_esito = COLONNE_ESITO + ([COLONNA_CLASSIFICA] if recovery_top_k else [])
+
+    @property
+    def prolog(self):
+        """Motore SWI-Prolog con la KB consultata, avviato al primo uso."""
+        if self._prolog is None:
+            from pyswip import Prolog
+            print(f"[INIT] Caricamento Knowledge Base da '{KB_PATH}'...")
+            self._prolog = Prolog()
+            self._prolog.consult(KB_PATH)
+        return self._prolog
+
+    @property
+    def diagnostica(self):
+        """
+        Rete bayesiana (pgmpy) compilata al primo uso: serve solo per le missioni drone.
+        Usa le CPT apprese dai log (diagnosi_cpt.json) se presenti.
+        """
+        if self._diagnostica is None:
+            from diagnosi_bayesiana import carica_diagnostica
+            self._diagnostica = carica_diagnostica(compilata=True)
+        return self._diagnostica
 
-    def train_models(self, csv_path):
+    def train_models(self, csv_path, usa_cache=True, parametri_dt=None, parametri_rf=None, online=False):
         """
         Addestra DUE modelli per confronto: Decision Tree (interpretabile) e Random Forest (robusto).
+        Con usa_cache=True i modelli (e il LabelEncoder) vengono salvati una volta in
+        cache_modelli e ricaricati ai riavvii successivi: si riaddestra solo se cambiano
+        il contenuto del dataset o gli iperparametri.
+        parametri_dt / parametri_rf: iperparametri espliciti; se omessi si usano quelli
+        scelti dalla ricerca (iperparametri.json) oppure PARAMETRI_DT / PARAMETRI_RF.
+        online: con True riparte dall'ultimo aggiornamento online salvato da aggiorna_modelli
+        per questo dataset e questi iperparametri (se esiste); di default si usa il modello
+        addestrato sul solo dataset, anche se sono stati salvati aggiornamenti.
         """
-        print("[ML] Avvio addestramento modelli...")
+        from cache_modelli import (chiave_artefatto, carica_modelli, salva_modelli,
+                                   aggiornamenti_salvati, chiave_aggiornamento)
+        from ricerca_iperparametri import carica_iperparametri
+
+        scelti_dt, scelti_rf = carica_iperparametri(PARAMETRI_DT, PARAMETRI_RF)
+        parametri_dt = parametri_dt if parametri_dt is not None else scelti_dt
+        parametri_rf = parametri_rf if parametri_rf is not None else scelti_rf
+        chiave = None
         try:
-            df = pd.read_csv(csv_path)
-            X = df.drop(columns=['Crop'])
-            y = df['Crop']
+            if usa_cache:
+                chiave = chiave_artefatto(csv_path, {'dt': parametri_dt, 'rf': parametri_rf})
+                salvati = aggiornamenti_salvati(chiave) if online else []
+                caricata = chiave_aggiornamento(chiave, salvati[-1]) if salvati else chiave
+                modelli = carica_modelli(caricata)
+                if modelli is not None:
+                    self.model_dt, self.model_rf, self.le = modelli['dt'], modelli['rf'], modelli['le']
+                    self.alberi_rf = AlberiCompilati.da_modello(self.model_rf)
+                    self.versione_modelli += 1
+                    self._recenti = modelli.get('recenti')
+                    self._aggiornamenti = modelli.get('aggiornamenti', 0)
+                    self._chiave_modelli = chiave
+                    extra = f", {self._aggiornamenti} aggiornamenti online" if self._aggiornamenti else ""
+                    print(f"[ML] Modelli caricati dalla cache (chiave {caricata}{extra}).")
+                    return
+
+            from sklearn.tree import DecisionTreeClassifier
+            from sklearn.ensemble import RandomForestClassifier
+            from sklearn.preprocessing import LabelEncoder
+            from caricamento_dati import carica_dataset, separa_feature_target
+
+            print("[ML] Avvio addestramento modelli...")
+            df = carica_dataset(csv_path)
+            X, y = separa_feature_target(df)
             
+            self.le = LabelEncoder()
             y_encoded = self.le.fit_transform(y)
             
             # 1. Decision Tree (White Box)
-            self.model_dt = DecisionTreeClassifier(random_state=42, max_depth=10)
+            self.model_dt = DecisionTreeClassifier(**parametri_dt)
             self.model_dt.fit(X, y_encoded)
             
             # 2. Random Forest (Black Box - Ensemble)
-            self.model_rf = RandomForestClassifier(n_estimators=50, random_state=42)
+            self.model_rf = RandomForestClassifier(**parametri_rf)
             self.model_rf.fit(X, y_encoded)
+            self.alberi_rf = AlberiCompilati.da_modello(self.model_rf)
+            self.versione_modelli += 1
+            self._recenti = None
+            self._aggiornamenti = 0
+            self._chiave_modelli = chiave
             
             print("[ML] Modelli addestrati. Useremo Random Forest per la predizione principale.")
+
+            if usa_cache:
+                salva_modelli(chiave, {'dt': self.model_dt, 'rf': self.model_rf, 'le': self.le})
             
         except FileNotFoundError:
             print(f"[ERROR] File dataset non trovato: {csv_path}")
 
+    def aggiorna_modelli(self, dati, etichette, n_alberi=None, max_alberi=None, salva=True):
+        """
+        Aggiornamento incrementale con nuovi lotti etichettati (es. dagli agronomi),
+        senza riaddestrare da zero: al Random Forest si aggiungono alberi addestrati
+        sui nuovi lotti più quelli recenti (al massimo MAX_CAMPIONI_RECENTI), e con
+        max_alberi si ritirano i più vecchi. Il costo dipende dai dati nuovi, non dallo storico.
+        Colture mai viste estendono il LabelEncoder: gli alberi esistenti (RF e DT)
+        vengono rimappati sulla nuova codifica senza cambiare le loro predizioni.
+        Gli esiti in cache sono invalidati (nuova versione dei modelli).
+        Con salva=True (e modelli provenienti da cache_modelli) modelli aggiornati e lotti
+        recenti sono salvati in un artefatto proprio (chiave_aggiornamento), sostituendo
+        il precedente: train_models(online=True) lo ricarica al prossimo avvio, mentre
+        l'artefatto del dataset resta intatto. Se cambia il dataset (o gli iperparametri)
+        si riaddestra da zero senza di essi.
+        """
+        import copy
+        import pandas as pd
+        from aggiornamento_online import (estendi_codifica, rimappa_modello, cresci_foresta,
+                                          ALBERI_PER_AGGIORNAMENTO, MAX_CAMPIONI_RECENTI)
+
+        X = self._prepara_input(dati)
+        etichette = np.asarray(etichette, dtype=object)
+        # Si lavora su copie: chi sta servendo richieste usa i modelli attuali fino allo scambio
+        model_rf, model_dt, le = copy.deepcopy(self.model_rf), self.model_dt, self.le
+
+        le_esteso, posizioni = estendi_codifica(le, etichette)
+        if len(le_esteso.classes_) != len(le.classes_):
+            nuove = sorted(set(le_esteso.classes_) - set(le.classes_))
+            print(f"[ML] Nuove colture nel LabelEncoder: {', '.join(nuove)}")
+            rimappa_modello(model_rf, posizioni, len(le_esteso.classes_))
+            model_dt = rimappa_modello(copy.deepcopy(model_dt), posizioni, len(le_esteso.classes_))
+            le = le_esteso
+
+        if self._recenti is not None:
+            X = pd.concat([self._recenti[0], X], ignore_index=True)
+            etichette = np.concatenate([self._recenti[1], etichette])
+        X, etichette = X.iloc[-MAX_CAMPIONI_RECENTI:], etichette[-MAX_CAMPIONI_RECENTI:]
+
+        cresci_foresta(model_rf, X, le.transform(etichette), n_alberi or ALBERI_PER_AGGIORNAMENTO,
+                       max_alberi, seed=(model_rf.random_state or 0) + self.versione_modelli)
+        alberi_rf = AlberiCompilati.da_modello(model_rf)
+
+        self.model_rf, self.model_dt, self.le, self.alberi_rf = model_rf, model_dt, le, alberi_rf
+        self._recenti = (X, etichette)
+        self._aggiornamenti += 1
+        self.versione_modelli += 1
+        print(f"[ML] Random Forest aggiornato con {len(X)} lotti recenti: "
+              f"{len(model_rf.estimators_)} alberi, {len(le.classes_)} colture.")
+
+        if salva and self._chiave_modelli is not None:
+            from cache_modelli import salva_aggiornamento
+            chiave = salva_aggiornamento(self._chiave_modelli, {'dt': model_dt, 'rf': model_rf, 'le': le,
+                                                                'recenti': self._recenti,
+                                                                'aggiornamenti': self._aggiornamenti})
+            print(f"[ML] Aggiornamento salvato nella cache dei modelli (chiave {chiave}).")
+
+    def _recovery_probabilistico(self, X, proba):
+        """
+        Alternative ordinate per probabilità RF (motore_regole.alternative_classificate):
+        un solo passo vettoriale per tutti i lotti. Restituisce (alternativa, classifica)
+        per riga, con classifica = [(coltura, probabilità)] (vuota se nessun candidato).
+        """
+        motore = self.motore if self.motore is not None else self._motore_recovery()
+        classi = self.le.classes_[self.alberi_rf.classes_]
+        nomi, punteggi = motore.alternative_classificate(X, proba, classi, k=self.recovery_top_k)
+        classifiche = [[] for _ in range(len(nomi))]
+        for i in np.flatnonzero(~np.isnan(punteggi[:, 0])):
+            classifiche[i] = [(c, float(p)) for c, p in zip(nomi[i], punteggi[i]) if c is not None]
+        return nomi[:, 0], classifiche
+
+    def _motore_recovery(self):
+        """Motore nativo usato solo per il recovery probabilistico (validazione invariata)."""
+        if self._motore_classifica is None:
+            self._motore_classifica = MotoreRegole(KB_PATH)
+        return self._motore_classifica
+
+    def versione_cache(self):
+        """Versione di modelli + vincoli KB a runtime: se cambia, gli esiti in cache non sono più validi."""
+        from pianificazione_drone import versione_vincoli
+        return (self.versione_modelli, versione_vincoli())
+
     def reasoning_pipeline(self, n, p, k, ph, rain, temp):
         """
         Pipeline Neuro-Simbolica Avanzata:
         ML (Random Forest) -> Prolog (Validazione) -> Prolog (Recovery) -> A* -> Bayes
+        Restituisce un dizionario con l'esito (stesse chiavi di COLONNE_ESITO).
+        Con la cache attiva, letture equivalenti dopo la quantizzazione riusano l'esito.
         """
+        self.strumenti.conta('richieste')
+        if self.cache is None:
+            return self._esegui_pipeline(n, p, k, ph, rain, temp)
+
+        versione = self.versione_cache()
+        chiave = self.cache.chiavi([n, p, k, ph, rain, temp])[0]
+        esito = self.cache.ottieni(chiave, versione)
+        if esito is not None:
+            self.strumenti.conta('cache_hit')
+            print(f"\n[CACHE] Lettura già analizzata: '{esito['coltura']}' "
+                  f"(valida: {esito['valida']}, alternativa: {esito['alternativa']}).")
+            return dict(esito)
+
+        esito = self._esegui_pipeline(n, p, k, ph, rain, temp)
+        if self._memorizzabile(esito):
+            self.cache.inserisci(chiave, dict(esito), versione)
+        return esito
+
+    def _memorizzabile(self, esito):
+        """
+        Con la flotta, l'esito di un lotto critico accoda una missione (effetto
+        collaterale): non va in cache, così una nuova lettura accoda una nuova ispezione.
+        """
+        return self.flotta is None or not isinstance(esito.get('missione_drone'), str)
+
+    def _esegui_pipeline(self, n, p, k, ph, rain, temp):
+        """Corpo della pipeline (senza cache): stampa i passaggi e restituisce l'esito."""
+        esito = dict.fromkeys(self.colonne_esito)
+
         # --- FASE 1: PREDIZIONE ML ---
         input_data = [[n, p, k, ph, rain, temp]]
         
         # Usiamo Random Forest per maggiore accuratezza
-        pred_idx = self.model_rf.predict(input_data)[0]
-        prediction_name = self.le.inverse_transform([pred_idx])[0]
-        probabilita = np.max(self.model_rf.predict_proba(input_data))
+        # (motore compilato: un solo attraversamento per predizione e confidenza)
+        with self.strumenti.fase('predizione_rf'):
+            proba = self.alberi_rf.predict_proba(input_data)[0]
+            pred_idx = self.alberi_rf.classes_[np.argmax(proba)]
+            prediction_name = self.le.inverse_transform([pred_idx])[0]
+            probabilita = np.max(proba)
+        esito['coltura'] = prediction_name
+        esito['confidenza'] = probabilita
         
         print(f"\n[AI] Random Forest suggerisce: '{prediction_name}' (Confidenza: {probabilita:.2f})")
 
         # --- FASE 2: RAGIONAMENTO ONTOLOGICO ---
         lotto_id = "lotto_corrente"
-        list(self.prolog.query(f"retractall(dati_lotto({lotto_id},_,_,_,_,_,_))"))
-        list(self.prolog.query(f"assertz(dati_lotto({lotto_id}, {n}, {p}, {k}, {ph}, {rain}, {temp}))"))
+        with self.strumenti.fase('prolog_assert'):
+            list(self.prolog.query(f"retractall(dati_lotto({lotto_id},_,_,_,_,_,_))"))
+            list(self.prolog.query(f"assertz(dati_lotto({lotto_id}, {n}, {p}, {k}, {ph}, {rain}, {temp}))"))
         
         # Validazione
         query_val = f"valida_raccomandazione({lotto_id}, {prediction_name})"
-        is_valid = list(self.prolog.query(query_val))
+        with self.strumenti.fase('prolog_validazione'):
+            is_valid = list(self.prolog.query(query_val))
+        esito['valida'] = bool(is_valid)
 
         if is_valid:
             print(f">>> [PROLOG] VALIDATO. La coltura '{prediction_name}' rispetta i vincoli.")
         else:
             print(f">>> [PROLOG] CONFLITTO! '{prediction_name}' viola i vincoli bio-climatici.")
+            self.strumenti.conta('conflitti')
             
             # --- FASE 3: SEMANTIC RECOVERY (Novità rispetto a prima) ---
             print("    [RECOVERY] Avvio ricerca ontologica di alternative nella stessa famiglia...")
-            query_alt = f"suggerisci_alternativa({lotto_id}, {prediction_name}, Alternativa)"
-            alternative = list(self.prolog.query(query_alt))
+            if self.recovery_top_k:
+                # Candidati della stessa famiglia ordinati per la probabilità RF già calcolata
+                with self.strumenti.fase('recovery_semantico'):
+                    migliori, classifiche = self._recovery_probabilistico(input_data, [proba])
+                esito[COLONNA_CLASSIFICA] = classifiche[0]
+                alternative = [{'Alternativa': migliori[0]}] if classifiche[0] else []
+                for coltura, p_alt in classifiche[0]:
+                    print(f"    [RECOVERY] {coltura:<14} (probabilità RF: {p_alt:.2f})")
+            else:
+                query_alt = f"suggerisci_alternativa({lotto_id}, {prediction_name}, Alternativa)"
+                with self.strumenti.fase('recovery_semantico'):
+                    alternative = list(self.prolog.query(query_alt))
             
             if alternative:
+                self.strumenti.conta('recovery_riusciti')
                 # Deduplichiamo e prendiamo la prima
                 nuova_coltura = alternative[0]['Alternativa']
+                esito['alternativa'] = nuova_coltura
                 print(f"    [ADVISOR] Suggerimento Sostitutivo: '{nuova_coltura}'.")
                 print(f"              (Motivo: È della stessa famiglia di '{prediction_name}' ma adatta al terreno)")
-                return # Problema risolto col ragionamento
+                return esito # Problema risolto col ragionamento
             else:
                 print("    [ADVISOR] Nessuna alternativa tassonomica trovata. Situazione critica.")
-                self.activate_drone_protocol(rain)
+                esito.update(self.activate_drone_protocol(rain))
+
+        return esito
+
+    def reasoning_batch(self, dati):
+        """
+        Versione batch della pipeline per interi campi (es. i lotti di una notte).
+        Input: DataFrame con le colonne di COLONNE_INPUT oppure array (N, 6).
+        Esegue UN solo predict_proba vettoriale, poi validazione/recovery (vettoriale
+        con il motore nativo, altrimenti Prolog riga per riga) senza stampe.
+        Restituisce un DataFrame con le colonne di COLONNE_ESITO, allineato
+        all'indice dell'input.
+        Con la cache attiva solo le righe non ancora viste (dopo la quantizzazione)
+        attraversano la pipeline.
+        """
+        import pandas as pd
+        X = self._prepara_input(dati)
+        self.strumenti.conta('richieste', len(X))
+        if self.cache is None or X.empty:
+            return self._esegui_batch(X)
+
+        versione = self.versione_cache()
+        chiavi = self.cache.chiavi(X.to_numpy())
+        trovati = [self.cache.ottieni(chiave, versione) for chiave in chiavi]
+        mancanti = [i for i, esito in enumerate(trovati) if esito is None]
+        self.strumenti.conta('cache_hit', len(chiavi) - len(mancanti))
+        if len(mancanti) == len(chiavi):
+            calcolati = self._esegui_batch(X)
+        elif mancanti:
+            calcolati = self._esegui_batch(X.iloc[mancanti])
+        else:
+            calcolati = None
+
+        if calcolati is not None:
+            for i, esito in zip(mancanti, calcolati.to_dict('records')):
+                if self._memorizzabile(esito):
+                    self.cache.inserisci(chiavi[i], esito, versione)
+                trovati[i] = esito
+            if len(mancanti) == len(chiavi):
+                return calcolati
+
+        # dtype=object: i valori restano quelli calcolati (es. costi interi non diventano float)
+        esiti = pd.DataFrame([[esito[c] for c in self.colonne_esito] for esito in trovati],
+                             index=X.index, columns=self.colonne_esito, dtype=object)
+        return esiti.astype({'confidenza': float, 'valida': bool})
+
+    def _esegui_batch(self, X):
+        """Corpo di reasoning_batch (senza cache) su un DataFrame già normalizzato."""
+        import pandas as pd
+        if X.empty:
+            return pd.DataFrame(index=X.index, columns=self.colonne_esito, dtype=object)
+
+        # --- FASE 1: PREDIZIONE ML (un solo passaggio su tutto il blocco) ---
+        with self.strumenti.fase('predizione_rf'):
+            if len(X) <= MAX_RIGHE_COMPILATE:
+                proba = self.alberi_rf.predict_proba(X.to_numpy())
+            else:
+                proba = self.model_rf.predict_proba(X)
+            pred_idx = self.model_rf.classes_[np.argmax(proba, axis=1)]
+            colture = self.le.inverse_transform(pred_idx)
+
+        esiti = pd.DataFrame(index=X.index, columns=self.colonne_esito, dtype=object)
+        esiti['coltura'] = colture
+        esiti['confidenza'] = proba.max(axis=1)
+
+        # --- FASI 2-3: VALIDAZIONE E RECOVERY ---
+        # Nei percorsi Prolog validazione e recovery avvengono nello stesso round-trip
+        # per lotto, quindi sono misurate insieme come 'prolog_validazione'.
+        if self.motore is not None:
+            # Un solo passo vettoriale sulle maschere compilate dalla KB
+            with self.strumenti.fase('prolog_validazione'):
+                validi = self.motore.valida(X.to_numpy(), colture)
+            if not self.recovery_top_k:
+                with self.strumenti.fase('recovery_semantico'):
+                    alternative = self.motore.suggerisci_alternativa(X.to_numpy(), colture)
+        elif self.pool_prolog is not None:
+            # Validazione Prolog distribuita sui processi worker
+            with self.strumenti.fase('prolog_validazione'):
+                validi, alternative = self.pool_prolog.valida_batch(X.itertuples(index=False, name=None), colture)
+        else:
+            lotto_id = "lotto_batch"
+            with self.strumenti.fase('prolog_validazione'):
+                validi, alternative = zip(*(self._valida_lotto(lotto_id, valori, coltura)
+                                            for valori, coltura in zip(X.itertuples(index=False, name=None), colture)))
+
+        esiti['valida'] = np.asarray(validi, dtype=bool)
+        if self.recovery_top_k:
+            # Stessa probabilità della FASE 1: il recovery di migliaia di conflitti è un solo passo
+            with self.strumenti.fase('recovery_semantico'):
+                alternative, classifiche = self._recovery_probabilistico(X.to_numpy(), proba)
+            esiti[COLONNA_CLASSIFICA] = pd.Series(classifiche, index=X.index, dtype=object)
+        esiti['alternativa'] = np.asarray(alternative, dtype=object)
+        self.strumenti.conta('conflitti', int((~esiti['valida']).sum()))
+        self.strumenti.conta('recovery_riusciti', int(esiti['alternativa'].notna().sum()))
+
+        # --- FASE 4: DRONE + DIAGNOSI PER I LOTTI CRITICI ---
+        # Critici = conflitto senza alternativa tassonomica
+        critici = (~esiti['valida'] & esiti['alternativa'].isna()).to_numpy()
+        if critici.any():
+            self.strumenti.conta('missioni_drone', int(critici.sum()))
+            if self.flotta is not None:
+                rain = X['rainfall'].to_numpy()[critici]
+                with self.strumenti.fase('diagnosi_bayesiana'):
+                    p_mal, p_stress = self.diagnostica.stima_rischio_array(
+                        macchie=0, giallo=1, pioggia_mm=rain, umidita_pct=rain*0.8
+                    )
+                esiti.loc[critici, 'missione_drone'] = [
+                    f"in coda #{self.flotta.accoda(priorita=p)}" for p in p_mal]
+                esiti.loc[critici, 'p_malattia'] = p_mal
+                esiti.loc[critici, 'p_stress'] = p_stress
+                esiti.loc[critici, 'decisione'] = np.where(p_mal > p_stress, 'fungicida', 'irrigazione')
+                return esiti
+            # Il percorso del drone non dipende dal lotto: lo calcoliamo una volta sola
+            from pianificazione_drone import a_star_search, mappa_agricola, euristica
+            with self.strumenti.fase('a_star'):
+                path, cost = a_star_search(mappa_agricola, 'Stazione_Ricarica', 'Lotto_Critico',
+                                           euristica, verbose=False)
+            esiti.loc[critici, 'costo_percorso'] = cost
+            if path:
+                rain = X['rainfall'].to_numpy()[critici]
+                with self.strumenti.fase('diagnosi_bayesiana'):
+                    p_mal, p_stress = self.diagnostica.stima_rischio_array(
+                        macchie=0, giallo=1, pioggia_mm=rain, umidita_pct=rain*0.8
+                    )
+                esiti.loc[critici, 'missione_drone'] = ' -> '.join(path)
+                esiti.loc[critici, 'p_malattia'] = p_mal
+                esiti.loc[critici, 'p_stress'] = p_stress
+                esiti.loc[critici, 'decisione'] = np.where(p_mal > p_stress, 'fungicida', 'irrigazione')
+
+        return esiti
+
+    def _prepara_input(self, dati):
+        """Normalizza l'input batch in un DataFrame con le colonne di COLONNE_INPUT."""
+        import pandas as pd
+        if isinstance(dati, pd.DataFrame):
+            return dati[COLONNE_INPUT]
+        return pd.DataFrame(np.asarray(dati).reshape(-1, len(COLONNE_INPUT)), columns=COLONNE_INPUT)
+
+    def _valida_lotto(self, lotto_id, valori, coltura):
+        """
+        Validazione + recovery Prolog di un singolo lotto, senza stampe.
+        Restituisce (valida, alternativa) con alternativa=None se assente.
+        """
+        return valida_lotto_prolog(self.prolog, lotto_id, valori, coltura)
+
+    def _esito_drone(self, path, cost, rain_val):
+        """Esito della missione drone + diagnosi bayesiana (senza stampe)."""
+        if not path:
+            return {'missione_drone': None, 'costo_percorso': cost}
+
+        with self.strumenti.fase('diagnosi_bayesiana'):
+            p_mal, p_stress = self.diagnostica.stima_rischio(
+                macchie=0, giallo=1, pioggia_mm=rain_val, umidita_pct=rain_val*0.8
+            )
+        return {
+            'missione_drone': ' -> '.join(path),
+            'costo_percorso': cost,
+            'p_malattia': p_mal,
+            'p_stress': p_stress,
+            'decisione': 'fungicida' if p_mal > p_stress else 'irrigazione',
+        }
+
+    def _accoda_missione(self, rain_val):
+        """Diagnosi immediata; l'ispezione va nella coda della flotta con priorità = rischio malattia."""
+        with self.strumenti.fase('diagnosi_bayesiana'):
+            p_mal, p_stress = self.diagnostica.stima_rischio(
+                macchie=0, giallo=1, pioggia_mm=rain_val, umidita_pct=rain_val*0.8
+            )
+        id_missione = self.flotta.accoda(priorita=p_mal)
+        print(f"          [FLOTTA] Missione #{id_missione} in coda (priorità {p_mal:.2f}, "
+              f"{self.flotta.in_coda()} in attesa).")
+        print(f"          [BAYES] Stress Idrico: {p_stress:.2%}, Malattia: {p_mal:.2%}")
+        return {
+            'missione_drone': f"in coda #{id_missione}",
+            'costo_percorso': None,
+            'p_malattia': p_mal,
+            'p_stress': p_stress,
+            'decisione': 'fungicida' if p_mal > p_stress else 'irrigazione',
+        }
 
     def activate_drone_protocol(self, rain_val):
         """
         Gestisce la missione del drone se il ragionamento fallisce o rileva anomalie.
+        Restituisce l'esito della missione (percorso, costo, rischi, decisione).
         """
+        from pianificazione_drone import a_star_search, mappa_agricola, euristica
         print("\n[MISSION] Attivazione Drone per ispezione fisica...")
-        path, cost = a_star_search(mappa_agricola, 'Stazione_Ricarica', 'Lotto_Critico', euristica)
+        self.strumenti.conta('missioni_drone')
+        if self.flotta is not None:
+            return self._accoda_missione(rain_val)
+        with self.strumenti.fase('a_star'):
+            path, cost = a_star_search(mappa_agricola, 'Stazione_Ricarica', 'Lotto_Critico', euristica)
+        esito = self._esito_drone(path, cost, rain_val)
         
         if path:
             print(f"          Pathfinding A*: {' -> '.join(path)} (Costo: {cost}m)")
@@ -105,10 +543,8 @@ class AgroSmartAI:
             print("          [CAM] Rilevamento: Foglie Gialle diffuse.")
             
             # --- FASE 4: DIAGNOSI PROBABILISTICA ---
-            # Bayes usa i dati meteo reali
-            p_mal, p_stress = self.diagnostica.stima_rischio(
-                macchie=0, giallo=1, pioggia_mm=rain_val, umidita_pct=rain_val*0.8
-            )
+            # Bayes usa i dati meteo reali (calcolato in _esito_drone)
+            p_mal, p_stress = esito['p_malattia'], esito['p_stress']
             print(f"          [BAYES] Stress Idrico: {p_stress:.2%}, Malattia: {p_mal:.2%}")
             
             if p_mal > p_stress:
@@ -118,9 +554,11 @@ class AgroSmartAI:
         else:
             print("          [ERROR] Percorso bloccato (No-Fly Zones attive).")
 
+        return esito
+
 def main():
     app = AgroSmartAI()
-    app.train_models(DATASET_PATH)
+    app.train_models(DATASET_PATH, online=True)
     
     print("\n" + "="*50)
     print(" BENVENUTO IN AGRO-SMART ADVISOR")
@@ -154,5 +592,39 @@ def main():
 
     print("\nGrazie per aver usato AgroSmart Advisor.")
 
+def main_batch(input_csv, output_csv, metriche_path=None):
+    """
+    Modalità batch non interattiva: python sistema_ibrido.py <input.csv> <output.csv> [metriche]
+    Valuta tutte le righe del CSV in input e salva la tabella degli esiti.
+    Il CSV viene letto e scritto a blocchi: anche export più grandi della RAM.
+    Con 'metriche_path' abilita la strumentazione e salva le latenze per fase
+    (formato Prometheus se il file termina in .prom, altrimenti snapshot JSON).
+    """
+    from caricamento_dati import leggi_a_blocchi
+    app = AgroSmartAI(strumentazione=Strumentazione(abilitata=metriche_path is not None))
+    app.train_models(DATASET_PATH)
+
+    print(f"[BATCH] Analisi dei lotti da '{input_csv}'...")
+    n_lotti = n_conflitti = n_missioni = 0
+    for i, blocco in enumerate(leggi_a_blocchi(input_csv)):
+        esiti = app.reasoning_batch(blocco)
+        esiti.to_csv(output_csv, mode='w' if i == 0 else 'a', header=(i == 0))
+        n_lotti += len(esiti)
+        n_conflitti += int((~esiti['valida']).sum())
+        n_missioni += int(esiti['missione_drone'].notna().sum())
+
+    print(f"[BATCH] Completato: {n_lotti} lotti, {n_conflitti} conflitti, "
+          f"{n_missioni} missioni drone. Esiti in '{output_csv}'.")
+
+    if metriche_path is not None:
+        if metriche_path.endswith('.prom'):
+            app.strumenti.esporta_prometheus(metriche_path)
+        else:
+            app.strumenti.esporta_json(metriche_path)
+        print(f"[BATCH] Metriche per fase in '{metriche_path}'.")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) in (3, 4):
+        main_batch(*sys.argv[1:])
+    else:
+        main()
\ No newline at end of file
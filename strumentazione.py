@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# --- CONFIGURAZIONE ---
+# Limiti superiori (secondi) dei bucket degli istogrammi di latenza
+LIMITI_ISTOGRAMMA = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+PREFISSO_METRICHE = 'agrosmart'
+
+# Contesto vuoto condiviso: con la strumentazione disattivata ogni fase costa
+# una chiamata di metodo e un 'with' su un oggetto che non fa nulla.
+_NULLO = nullcontext()
+
+
+class _Istogramma:
+    """Istogramma cumulativo a bucket fissi (stesso modello dei histogram Prometheus)."""
+
+    def __init__(self, limiti):
+        self.limiti = limiti
+        self.conteggi = [0] * (len(limiti) + 1)  # ultimo bucket = +Inf
+        self.somma = 0.0
+        self.totale = 0
+
+    def osserva(self, valore):
+        self.conteggi[bisect_left(self.limiti, valore)] += 1
+        self.somma += valore
+        self.totale += 1
+
+    def cumulativi(self):
+        parziale, risultato = 0, []
+        for conteggio in self.conteggi:
+            parziale += conteggio
+            risultato.append(parziale)
+        return risultato
+
+
+class _Cronometro:
+    """Context manager che misura una fase e notifica la strumentazione all'uscita."""
+
+    __slots__ = ('strumentazione', 'nome', 'inizio')
+
+    def __init__(self, strumentazione, nome):
+        self.strumentazione = strumentazione
+        self.nome = nome
+
+    def __enter__(self):
+        self.inizio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.strumentazione.osserva(self.nome, time.perf_counter() - self.inizio)
+        return False
+
+
+class Strumentazione:
+    """
+    Hook di strumentazione per le fasi della pipeline:
+        with strumenti.fase('predizione_rf'):
+            ...
+    Alimenta contatori e istogrammi di latenza per fase, inoltra ogni misura ai
+    sink registrati (funzioni sink(fase, durata_s)) ed esporta in formato
+    Prometheus (text exposition) o come snapshot JSON.
+    Disattivata di default: in quel caso fase() restituisce un contesto vuoto.
+    """
+
+    def __init__(self, abilitata=False, limiti=LIMITI_ISTOGRAMMA):
+        self.abilitata = abilitata
+        self.limiti = tuple(limiti)
+        self.istogrammi = {}
+        self.contatori = {}
+        self.sink = []
+        self._lock = threading.Lock()
+
+    def abilita(self, abilitata=True):
+        self.abilitata = abilitata
+        return self
+
+    def registra_sink(self, sink):
+        """Registra una funzione sink(fase, durata_s) chiamata a ogni misura."""
+        self.sink.append(sink)
+        return sink
+
+    def fase(self, nome):
+        """Context manager che cronometra la fase 'nome' (no-op se disattivata)."""
+        if not self.abilitata:
+            return _NULLO
+        return _Cronometro(self, nome)
+
+    def osserva(self, nome, durata):
+        with self._lock:
+            istogramma = self.istogrammi.get(nome)
+            if istogramma is None:
+                istogramma = self.istogrammi[nome] = _Istogramma(self.limiti)
+            istogramma.osserva(durata)
+        for sink in self.sink:
+            sink(nome, durata)
+
+    def conta(self, evento, n=1):
+        """Incrementa il contatore 'evento' (no-op se disattivata)."""
+        if not self.abilitata:
+            return
+        with self._lock:
+            self.contatori[evento] = self.contatori.get(evento, 0) + n
+
+    def azzera(self):
+        with self._lock:
+            self.istogrammi.clear()
+            self.contatori.clear()
+
+    # --- ESPORTAZIONE ---
+
+    def snapshot(self):
+        """Stato corrente come dizionario serializzabile in JSON."""
+        with self._lock:
+            return {
+                'timestamp': time.time(),
+                'contatori': dict(self.contatori),
+                'fasi': {
+                    nome: {
+                        'conteggio': h.totale,
+                        'somma_s': h.somma,
+                        'media_s': h.somma / h.totale if h.totale else 0.0,
+                        'bucket': dict(zip([str(l) for l in self.limiti] + ['+Inf'], h.cumulativi())),
+                    }
+                    for nome, h in self.istogrammi.items()
+                },
+            }
+
+    def formato_prometheus(self):
+        """Metriche nel formato di esposizione testuale di Prometheus."""
+        p = PREFISSO_METRICHE
+        righe = [f"# HELP {p}_fase_durata_secondi Durata delle fasi della pipeline.",
+                 f"# TYPE {p}_fase_durata_secondi histogram"]
+        with self._lock:
+            for nome, h in sorted(self.istogrammi.items()):
+                for limite, cumulato in zip([repr(l) for l in self.limiti] + ['+Inf'], h.cumulativi()):
+                    righe.append(f'{p}_fase_durata_secondi_bucket{{fase="{nome}",le="{limite}"}} {cumulato}')
+                righe.append(f'{p}_fase_durata_secondi_sum{{fase="{nome}"}} {h.somma!r}')
+                righe.append(f'{p}_fase_durata_secondi_count{{fase="{nome}"}} {h.totale}')
+
+            righe += [f"# HELP {p}_eventi_total Eventi contati dalla pipeline.",
+                      f"# TYPE {p}_eventi_total counter"]
+            for evento, valore in sorted(self.contatori.items()):
+                righe.append(f'{p}_eventi_total{{evento="{evento}"}} {valore}')
+        return '\n'.join(righe) + '\n'
+
+    def esporta_prometheus(self, path):
+        """
+        Scrive le metriche in un file .prom (es. per il textfile collector di node_exporter).
+        Scrittura su file temporaneo + rename: chi legge non vede mai un file a metà.
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.formato_prometheus())
+        os.replace(tmp, path)
+
+    def esporta_json(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
@@ -1,27 +1,35 @@
-import pandas as pd
+import argparse
+import json
+import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
 from sklearn.preprocessing import LabelEncoder
 import os
+from caricamento_dati import carica_dataset, separa_feature_target, leggi_a_blocchi, COLONNA_TARGET
 
 # --- CONFIGURAZIONE ---
 TRAIN_FILE = 'Train_Dataset_Clean.csv'
 TEST_FILE = 'test dataset.csv'
 OUTPUT_DIR = 'grafici_per_relazione'  # Cartella di destinazione
+CHUNK_STREAMING = 100_000    # Righe del test set lette e predette per blocco (modalità streaming)
 
 # Assicuriamoci che la cartella esista
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
 
-def main():
+def main(modello=None, dpi=None):
+    """
+    modello: Decision Tree già addestrato sul training set (es. condiviso da
+    genera_report.py); se None viene addestrato qui.
+    """
     print("--- AVVIO VALUTAZIONE FINALE (HOLD-OUT TEST) ---")
 
     # 1. Caricamento dei Dataset
     try:
-        df_train = pd.read_csv(TRAIN_FILE)
-        df_test = pd.read_csv(TEST_FILE)
+        df_train = carica_dataset(TRAIN_FILE)
+        df_test = carica_dataset(TEST_FILE)
         
         print(f"[INFO] Dataset caricati.")
         print(f"       Training Set: {df_train.shape[0]} righe")
@@ -31,16 +39,9 @@ def main():
         print(f"[ERROR] File non trovato: {e}")
         return
 
-    # 2. Pre-processing
-    for df in [df_train, df_test]:
-        if 'Unnamed: 0' in df.columns:
-            df.drop(columns=['Unnamed: 0'], inplace=True)
-
-    X_train = df_train.drop(columns=['Crop'])
-    y_train = df_train['Crop']
-
-    X_test = df_test.drop(columns=['Crop'])
-    y_test = df_test['Crop']
+    # 2. Pre-processing (la colonna 'Unnamed: 0' è già scartata in caricamento)
+    X_train, y_train = separa_feature_target(df_train)
+    X_test, y_test = separa_feature_target(df_test)
 
     # 3. Encoding
     le = LabelEncoder()
@@ -54,9 +55,13 @@ def main():
         return
 
     # 4. Addestramento
-    print("[INFO] Addestramento del Decision Tree sul 100% del Training Set...")
-    model = DecisionTreeClassifier(random_state=42)
-    model.fit(X_train, y_train_encoded)
+    if modello is not None:
+        print("[INFO] Uso del Decision Tree già addestrato sul Training Set.")
+        model = modello
+    else:
+        print("[INFO] Addestramento del Decision Tree sul 100% del Training Set...")
+        model = DecisionTreeClassifier(random_state=42)
+        model.fit(X_train, y_train_encoded)
 
     # 5. Predizione
     print("[INFO] Calcolo delle predizioni sul Test Set...")
@@ -70,29 +75,179 @@ def main():
 
     # --- SALVATAGGIO REPORT (TXT) ---
     report = classification_report(y_test_encoded, y_pred, target_names=le.classes_)
-    
+    salva_report(report)
+
+    # --- SALVATAGGIO MATRICE DI CONFUSIONE (PNG) ---
+    cm = confusion_matrix(y_test_encoded, y_pred)
+    salva_matrice_confusione(cm, le.classes_, dpi)
+    print("--- VALUTAZIONE COMPLETATA ---")
+
+
+def salva_report(report):
     report_path = os.path.join(OUTPUT_DIR, "report_classificazione_finale.txt")
     with open(report_path, "w") as f:
         f.write(report)
     print(f"[INFO] Report salvato in '{report_path}'.")
 
-    # --- SALVATAGGIO MATRICE DI CONFUSIONE (PNG) ---
-    cm = confusion_matrix(y_test_encoded, y_pred)
-    
+
+def salva_matrice_confusione(cm, classi, dpi=None):
     plt.figure(figsize=(14, 12))
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                xticklabels=le.classes_, yticklabels=le.classes_)
+                xticklabels=classi, yticklabels=classi)
     
     plt.title('Matrice di Confusione - Valutazione Finale')
     plt.ylabel('Classe Reale (Verità)')
     plt.xlabel('Classe Predetta dal Modello')
     
     img_path = os.path.join(OUTPUT_DIR, 'matrice_confusione_finale.png')
-    plt.savefig(img_path)
+    plt.savefig(img_path, dpi=dpi)
     plt.close() # Chiude la figura
     
     print(f"[INFO] Grafico salvato in '{img_path}'.")
+
+
+# --- VALUTAZIONE IN STREAMING (test set più grande della RAM) ---
+
+def metriche_da_matrice(cm):
+    """
+    Metriche per classe dalla matrice di confusione accumulata (righe = reali,
+    colonne = predette): precision, recall, f1, support (0 dove non definite,
+    come sklearn con zero_division), più accuratezza e medie macro/pesata.
+    """
+    cm = np.asarray(cm, dtype=np.int64)
+    veri_positivi = np.diag(cm).astype(float)
+    predetti, supporto = cm.sum(axis=0), cm.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predetti > 0, veri_positivi / predetti, 0.0)
+        recall = np.where(supporto > 0, veri_positivi / supporto, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    # Classi presenti nei reali o nelle predizioni (come unique_labels di sklearn)
+    presenti = (predetti + supporto) > 0
+    totale = int(supporto.sum())
+    pesi = supporto[presenti] / totale if totale else np.zeros(presenti.sum())
+    medie = {
+        'macro avg': [m[presenti].mean() for m in (precision, recall, f1)],
+        'weighted avg': [float(m[presenti] @ pesi) for m in (precision, recall, f1)],
+    }
+    return {
+        'precision': precision, 'recall': recall, 'f1': f1, 'support': supporto, 'presenti': presenti,
+        'accuratezza': float(veri_positivi.sum() / totale) if totale else 0.0,
+        'totale': totale, 'medie': medie,
+    }
+
+
+def report_da_matrice(cm, classi, cifre=2):
+    """Testo nello stesso formato di sklearn.metrics.classification_report, dalla matrice accumulata."""
+    m = metriche_da_matrice(cm)
+    nomi = [str(c) for c, presente in zip(classi, m['presenti']) if presente]
+    larghezza = max(len(n) for n in nomi + ['weighted avg'])
+    intestazioni = ["precision", "recall", "f1-score", "support"]
+    formato_riga = "{:>{larghezza}s} " + " {:>9.{cifre}f}" * 3 + " {:>9}\n"
+
+    report = ("{:>{larghezza}s} " + " {:>9}" * 4).format("", *intestazioni, larghezza=larghezza) + "\n\n"
+    for i in np.flatnonzero(m['presenti']):
+        report += formato_riga.format(str(classi[i]), m['precision'][i], m['recall'][i], m['f1'][i],
+                                      int(m['support'][i]), larghezza=larghezza, cifre=cifre)
+    report += "\n"
+    report += ("{:>{larghezza}s} " + " {:>9.{cifre}}" * 2 + " {:>9.{cifre}f}" + " {:>9}\n").format(
+        "accuracy", "", "", m['accuratezza'], m['totale'], larghezza=larghezza, cifre=cifre)
+    for nome, valori in m['medie'].items():
+        report += formato_riga.format(nome, *valori, m['totale'], larghezza=larghezza, cifre=cifre)
+    return report
+
+
+def valuta_a_blocchi(model, le, test_path, chunksize=CHUNK_STREAMING, log_path=None):
+    """
+    Legge il test set a blocchi, predice ogni blocco e accumula la matrice di
+    confusione: in memoria restano solo il blocco corrente e la matrice (classi x classi).
+    Dopo ogni blocco stampa le metriche cumulative e, con 'log_path', le aggiunge in JSONL.
+    Le righe con colture non viste in addestramento sono contate e saltate.
+    Restituisce (matrice di confusione, righe saltate).
+    """
+    n_classi = len(le.classes_)
+    cm = np.zeros((n_classi, n_classi), dtype=np.int64)
+    saltate = 0
+    log = open(log_path, 'w') if log_path else None
+    try:
+        for i, blocco in enumerate(leggi_a_blocchi(test_path, chunksize), start=1):
+            etichette = blocco[COLONNA_TARGET].astype(str).to_numpy()
+            note = np.isin(etichette, le.classes_)
+            saltate += int((~note).sum())
+            if not note.any():
+                continue
+            X_blocco, _ = separa_feature_target(blocco[note])
+            y_reale = le.transform(etichette[note])
+            y_pred = model.predict(X_blocco)
+            cm += np.bincount(y_reale * n_classi + y_pred, minlength=n_classi * n_classi).reshape(n_classi, n_classi)
+
+            m = metriche_da_matrice(cm)
+            print(f"[STREAM] Blocco {i}: {m['totale']} righe valutate, accuratezza cumulativa "
+                  f"{m['accuratezza']:.4f}, macro F1 {m['medie']['macro avg'][2]:.4f}")
+            if log is not None:
+                log.write(json.dumps({'blocco': i, 'righe': m['totale'], 'saltate': saltate,
+                                      'accuratezza': m['accuratezza'],
+                                      'macro_f1': float(m['medie']['macro avg'][2]),
+                                      'weighted_f1': float(m['medie']['weighted avg'][2])}) + "\n")
+                log.flush()
+    finally:
+        if log is not None:
+            log.close()
+    return cm, saltate
+
+
+def main_streaming(modello=None, dpi=None, chunksize=CHUNK_STREAMING):
+    """
+    Valutazione hold-out in streaming: stessi output di main() (report e matrice di
+    confusione), calcolati da una matrice di confusione accumulata blocco per blocco,
+    senza mai tenere in memoria tutte le predizioni. Metriche intermedie in
+    OUTPUT_DIR/metriche_intermedie.jsonl.
+    """
+    print(f"--- AVVIO VALUTAZIONE FINALE IN STREAMING (blocchi da {chunksize} righe) ---")
+    if not os.path.exists(TEST_FILE):
+        print(f"[ERROR] File non trovato: {TEST_FILE}")
+        return
+
+    try:
+        X_train, y_train = separa_feature_target(carica_dataset(TRAIN_FILE))
+    except FileNotFoundError as e:
+        print(f"[ERROR] File non trovato: {e}")
+        return
+
+    le = LabelEncoder()
+    y_train_encoded = le.fit_transform(y_train)
+    if modello is not None:
+        print("[INFO] Uso del Decision Tree già addestrato sul Training Set.")
+        model = modello
+    else:
+        print("[INFO] Addestramento del Decision Tree sul 100% del Training Set...")
+        model = DecisionTreeClassifier(random_state=42)
+        model.fit(X_train, y_train_encoded)
+
+    log_path = os.path.join(OUTPUT_DIR, 'metriche_intermedie.jsonl')
+    cm, saltate = valuta_a_blocchi(model, le, TEST_FILE, chunksize, log_path)
+    if saltate:
+        print(f"[WARNING] {saltate} righe del Test Set con classi non viste nel Training Set (saltate).")
+
+    m = metriche_da_matrice(cm)
+    print("-" * 50)
+    print(f"ACCURATEZZA FINALE (Test Set): {m['accuratezza']:.4f}")
+    print("-" * 50)
+
+    salva_report(report_da_matrice(cm, le.classes_))
+    # Come confusion_matrix di sklearn: solo le classi comparse nei reali o nelle predizioni
+    presenti = m['presenti']
+    salva_matrice_confusione(cm[np.ix_(presenti, presenti)], le.classes_[presenti], dpi)
+    print(f"[INFO] Metriche intermedie in '{log_path}'.")
     print("--- VALUTAZIONE COMPLETATA ---")
 
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Valutazione finale sul test set (hold-out)")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Legge e valuta il test set a blocchi (test set più grandi della RAM)")
+    parser.add_argument('--chunk', type=int, default=CHUNK_STREAMING, help="Righe per blocco in streaming")
+    args = parser.parse_args()
+    if args.streaming:
+        main_streaming(chunksize=args.chunk)
+    else:
+        main()
\ No newline at end of file
@@ -1,32 +1,32 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.model_selection import cross_val_score, StratifiedKFold
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
 from sklearn.naive_bayes import GaussianNB
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 import os
+from caricamento_dati import carica_dataset, separa_feature_target
+from motore_valutazione import valuta_modelli
+from ricerca_iperparametri import carica_iperparametri
 
 # Creazione cartella output se non esiste
 OUTPUT_DIR = 'grafici_per_relazione'
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
 
-def main():
+def main(dpi=300):
     print("--- VALUTAZIONE COMPARATIVA MODELLI ---")
     
     # 1. Caricamento Dati
     try:
-        df = pd.read_csv('Train_Dataset_Clean.csv')
+        df = carica_dataset('Train_Dataset_Clean.csv')
     except FileNotFoundError:
         print("[ERRORE] File 'Train_Dataset_Clean.csv' non trovato. Assicurati di averlo nella cartella.")
         return
 
-    X = df.drop(columns=['Crop'])
-    y = df['Crop']
+    X, y = separa_feature_target(df)
     
     # 2. Encoding (Corretto: usiamo un nome univoco)
     le = LabelEncoder()
@@ -37,29 +37,31 @@ def main():
     X_scaled = scaler.fit_transform(X)
     
     # 4. Definizione Modelli
+    # SVM richiede dati scalati, gli altri usano X originale (o scalato, va bene uguale per alberi)
+    # Gli alberi usano gli iperparametri scelti da ricerca_iperparametri.py, se salvati
+    parametri_dt, parametri_rf = carica_iperparametri({'random_state': 42},
+                                                      {'n_estimators': 50, 'random_state': 42})
     models = [
-        ('Decision Tree', DecisionTreeClassifier(random_state=42)),
-        ('Random Forest', RandomForestClassifier(n_estimators=50, random_state=42)),
-        ('Naive Bayes', GaussianNB()),
-        ('SVM (RBF)', SVC(kernel='rbf', probability=True))
+        ('Decision Tree', DecisionTreeClassifier(**parametri_dt), 'originale'),
+        ('Random Forest', RandomForestClassifier(**parametri_rf), 'originale'),
+        ('Naive Bayes', GaussianNB(), 'originale'),
+        ('SVM (RBF)', SVC(kernel='rbf', probability=True), 'scalata')
     ]
     
+    # 5. Cross Validation (10-Fold): job (modello, fold) in parallelo su tutti i core,
+    # punteggi per fold in cache su disco -> si ricalcolano solo i modelli nuovi o modificati
+    print("[CV] Valutazione in parallelo (i fold già calcolati vengono letti da cache)...")
+    punteggi = valuta_modelli(models, {'originale': X.to_numpy(), 'scalata': X_scaled}, y_encoded,
+                              n_splits=10, seed=42)
+    
     results = []
     names = []
     
     print(f"{'Modello':<20} | {'Accuratezza':<10} | {'Std Dev':<10}")
     print("-" * 45)
     
-    # 5. Cross Validation
-    kfold = StratifiedKFold(n_splits=10, shuffle=True, random_state=42)
-    
-    for name, model in models:
-        # SVM richiede dati scalati, gli altri usano X originale (o scalato, va bene uguale per alberi)
-        data_to_use = X_scaled if name == 'SVM (RBF)' else X
-        
-        # Qui usiamo 'y_encoded' che ora è definita correttamente sopra
-        cv_results = cross_val_score(model, data_to_use, y_encoded, cv=kfold, scoring='accuracy')
-        
+    for name, _, _ in models:
+        cv_results = punteggi[name]
         results.append(cv_results)
         names.append(name)
         
@@ -68,13 +70,13 @@ def main():
     # 6. Generazione Grafico
     plt.figure(figsize=(12, 6))
     sns.boxplot(data=results, palette="Set3")
-    plt.xticks(range(4), names)
+    plt.xticks(range(len(names)), names)
     plt.title('Confronto Prestazioni Modelli (10-Fold CV)', fontsize=15)
     plt.ylabel('Accuratezza')
     plt.xlabel('Algoritmo')
     
     outfile = os.path.join(OUTPUT_DIR, '7_confronto_modelli.png')
-    plt.savefig(outfile, dpi=300)
+    plt.savefig(outfile, dpi=dpi)
     plt.close() # Chiude la figura per liberare memoria
     print(f"\n[GRAPH] Grafico comparativo salvato in: {outfile}")
 
@@ -1,13 +1,12 @@
-import pandas as pd
 from sklearn.tree import DecisionTreeClassifier, export_text, export_graphviz
 import matplotlib.pyplot as plt
 from sklearn import tree
+from caricamento_dati import carica_dataset, separa_feature_target
 
-def main():
+def main(dpi=None):
     # 1. Carichiamo il dataset pulito che abbiamo salvato prima
-    df = pd.read_csv('Train_Dataset_Clean.csv')
-    X = df.drop(columns=['Crop'])
-    y = df['Crop']
+    df = carica_dataset('Train_Dataset_Clean.csv')
+    X, y = separa_feature_target(df)
 
     # 2. Addestriamo un albero "semplice" per poterlo leggere (max_depth=3)
     # Se l'albero è troppo profondo, le regole diventano illeggibili per un umano
@@ -24,7 +23,8 @@ def main():
                    fontsize=12)
     
     plt.title("Rappresentazione Semplificata della Conoscenza (Decision Tree)")
-    plt.savefig('albero_decisionale.png')
+    plt.savefig('albero_decisionale.png', dpi=dpi)
+    plt.close()  # main gira anche nei worker di genera_report: nessuna figura lasciata aperta
     print("Immagine 'albero_decisionale.png' generata con successo!")
 
     # 4. Estrazione delle regole in formato testo